@@ -3,336 +3,562 @@ from entities.admin import Admin
 from entities.product import Product
 from datetime import datetime
 import csv
-import random
+import math
+import os
+import time
 from backend.utils.exceptions import DuplicateEmailException, DatabaseException
+from backend.utils.catalog_cache import catalog_cache
+from backend.DAO.id_allocator import IdAllocator, format_product_id
 class AdminDAO:
-    def __init__(self, conn):
-        self.conn = conn
-    def is_admin_id_exists(self, admin_id: int) -> bool:
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM Admin WHERE admin_id=?", (admin_id,))
-            return cursor.fetchone() is not None
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while checking admin ID: " + str(e))
+    def __init__(self, db):
+        self.db = db
+        self.product_ids = IdAllocator.for_sequence(db, "product", block_size=1000)
     def register_admin(self, admin: Admin):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM Customer WHERE email=?", (admin.email,))
-            if cursor.fetchone():
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM Customer WHERE email=?", (admin.email,))
+                if cursor.fetchone():
+                    cursor.close()
+                    raise DuplicateEmailException("Admin email already exists in Customer records.")
+                cursor.execute("""
+                    INSERT INTO Admin (admin_id, email, password)
+                    VALUES (?, ?, ?)
+                    """, (admin.admin_id, admin.email, admin.password))
+                cursor.execute("INSERT INTO Login VALUES (?,?,?,?,?,?,?,?)", 
+                    (admin.admin_id, None, None, None, admin.password, 'N', 'Admin', 'Active'))
+                conn.commit()
                 cursor.close()
-                raise DuplicateEmailException("Admin email already exists in Customer records.")
-            cursor.execute("""
-                INSERT INTO Admin (admin_id, email, password)
-                VALUES (?, ?, ?)
-                """, (admin.admin_id, admin.email, admin.password))
-            cursor.execute("INSERT INTO Login VALUES (?,?,?,?,?,?,?,?)", 
-                (admin.admin_id, None, None, None, admin.password, 'N', 'Admin', 'Active'))
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.IntegrityError:
-            raise DuplicateEmailException("Admin email already exists.")
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while creating admin: " + str(e))
-    def login_admin(self, email, password):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT admin_id, password FROM Admin WHERE email=?", (email,))
-            row = cursor.fetchone()
-            if not row:
-                raise DatabaseException("Invalid email or password.")
-            admin_id, stored_password = row
-            if stored_password != password:
-                raise DatabaseException("Invalid email or password.")
-            now = datetime.now().isoformat()
-            cursor.execute("UPDATE Login SET last_login=?, is_now_logged_in='Y' WHERE id=?", (now, admin_id))
-            self.conn.commit()
-            return admin_id
-        except sqlite3.Error as e:
-            raise DatabaseException("Login failed: " + str(e))
-        finally:
-            cursor.close()
-    def logout_admin(self, admin_id: int):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT is_now_logged_in FROM Login WHERE id=?", (admin_id,))
-            row = cursor.fetchone()
-            if not row or row[0] != "Y":
+            except sqlite3.IntegrityError:
+                raise DuplicateEmailException("Admin email already exists.")
+            except sqlite3.Error as e:
+                raise DatabaseException("Database error while creating admin: " + str(e))
+    def get_admin_credentials(self, email):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT admin_id, password FROM Admin WHERE email=?", (email,))
+                row = cursor.fetchone()
+                if not row:
+                    raise DatabaseException("Invalid email or password.")
+                return row
+            except sqlite3.Error as e:
+                raise DatabaseException("Login failed: " + str(e))
+            finally:
                 cursor.close()
-                raise DatabaseException("Admin is not logged in.")
-
-            now = datetime.now().isoformat()
-            cursor.execute(
-                "UPDATE Login SET last_logout=?, is_now_logged_in='N' WHERE id=?",
-                (now, admin_id),
-            )
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.Error as e:
-            raise DatabaseException("Logout failed: " + str(e))
-    def force_logout_all_admins(self):
-        try:
-            cursor = self.conn.cursor()
-            now = datetime.now().isoformat()
-            cursor.execute(
-                "UPDATE Login SET last_logout=?, is_now_logged_in='N' WHERE is_now_logged_in='Y'",
-                (now,)
-            )
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to force logout admins: " + str(e))
-    def get_first_half_logged_in_customers(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT id FROM Login WHERE is_now_logged_in = 'Y' AND userType='Customer'")
-            all_logged_in = [row[0] for row in cursor.fetchall()]
-            if len(all_logged_in) <= 1:
-                return all_logged_in
-            half_count = len(all_logged_in) // 2
-            cursor.close()
-            return all_logged_in[:half_count]
-        except sqlite3.Error as e:
-            raise DatabaseException("Error fetching logged-in customers: " + str(e))
+    def upgrade_admin_password(self, admin_id, old_password, new_hash):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE Admin SET password = ? WHERE admin_id = ? AND password = ?",
+                               (new_hash, admin_id, old_password))
+                if cursor.rowcount:
+                    cursor.execute("""
+                        UPDATE Login
+                        SET old_password = CASE WHEN old_password = ? THEN ? ELSE old_password END,
+                            updated_password = CASE WHEN updated_password = ? THEN ? ELSE updated_password END
+                        WHERE id = ? AND userType = 'Admin'
+                    """, (old_password, new_hash, old_password, new_hash, admin_id))
+                conn.commit()
+                cursor.close()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to upgrade password: " + str(e))
     def update_customer_names_by_country(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                UPDATE Customer
-                SET name = 'US_' || name
-                WHERE LOWER(address) LIKE '%us%' AND name NOT LIKE 'US_%'
-            """)
-            cursor.execute("""
-                UPDATE Customer
-                SET name = 'IN_' || name
-                WHERE LOWER(address) LIKE '%india%' AND name NOT LIKE 'IN_%'
-            """)
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.Error as e:
-            raise DatabaseException("Database update error: " + str(e))
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE Customer
+                    SET name = 'US_' || name
+                    WHERE LOWER(address) LIKE '%us%' AND name NOT LIKE 'US_%'
+                """)
+                cursor.execute("""
+                    UPDATE Customer
+                    SET name = 'IN_' || name
+                    WHERE LOWER(address) LIKE '%india%' AND name NOT LIKE 'IN_%'
+                """)
+                conn.commit()
+                cursor.close()
+            except sqlite3.Error as e:
+                raise DatabaseException("Database update error: " + str(e))
     def get_all_customers(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT customer_id, name, email, address, contact_number FROM Customer")
-            rows = cursor.fetchall()
-            cursor.close()
-            customers = [
-                {
-                    "customer_id": row[0],
-                    "name": row[1],
-                    "email": row[2],
-                    "address": row[3],
-                    "contact_number": row[4],
-                }
-                for row in rows
-            ]
-            return customers
-        except sqlite3.Error as e:
-            raise DatabaseException("Error fetching customers: " + str(e))
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT customer_id, name, email, address, contact_number FROM Customer")
+                rows = cursor.fetchall()
+                cursor.close()
+                customers = [
+                    {
+                        "customer_id": row[0],
+                        "name": row[1],
+                        "email": row[2],
+                        "address": row[3],
+                        "contact_number": row[4],
+                    }
+                    for row in rows
+                ]
+                return customers
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching customers: " + str(e))
     def get_customer_by_email(self, email: str):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT customer_id, name, email, address, contact_number
-                FROM Customer
-                WHERE email = ?
-            """, (email,))
-            customer = cursor.fetchone()
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT customer_id, name, email, address, contact_number
+                    FROM Customer
+                    WHERE email = ?
+                """, (email,))
+                customer = cursor.fetchone()
+                cursor.close()
 
-            if not customer:
-                return None
+                if not customer:
+                    return None
 
-            return {
-                "customer_id": customer[0],
-                "name": customer[1],
-                "email": customer[2],
-                "address": customer[3],
-                "contact_number": customer[4]
-            }
+                return {
+                    "customer_id": customer[0],
+                    "name": customer[1],
+                    "email": customer[2],
+                    "address": customer[3],
+                    "contact_number": customer[4]
+                }
 
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to fetch customer by email: " + str(e))
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch customer by email: " + str(e))
     def add_product(self, product: Product):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT INTO Product (product_id, name, description, company_name, price, quantity)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (product.product_id, product.name, product.description, product.company_name, product.price, product.quantity))
-            self.conn.commit()
-            cursor.close()
-            return "Product added successfully."
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to add product: " + str(e))
-    def update_product(self, current_name, new_name=None, description=None, company_name=None, price=None, quantity=None):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM Product WHERE name = ?", (current_name,))
-            row = cursor.fetchone()
-            if not row:
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO Product (product_id, name, description, company_name, price, quantity)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (product.product_id, product.name, product.description, product.company_name, product.price, product.quantity))
+                conn.commit()
                 cursor.close()
-                return f"No product found with name '{current_name}'."
+                catalog_cache.invalidate()
+                return "Product added successfully."
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to add product: " + str(e))
+    def update_product(self, current_name, new_name=None, description=None, company_name=None, price=None, quantity=None):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM Product WHERE name = ?", (current_name,))
+                row = cursor.fetchone()
+                if not row:
+                    cursor.close()
+                    return f"No product found with name '{current_name}'."
 
-            existing = {
-                "product_id": row[0],
-                "name": row[1],
-                "description": row[2],
-                "company_name": row[3],
-                "price": row[4],
-                "quantity": row[5]
-            }
-            final_name = new_name if new_name else existing["name"]
-            final_description = description if description else existing["description"]
-            final_company = company_name if company_name else existing["company_name"]
-            final_price = price if price is not None else existing["price"]
-            final_qty = quantity if quantity is not None else existing["quantity"]
+                existing = {
+                    "product_id": row[0],
+                    "name": row[1],
+                    "description": row[2],
+                    "company_name": row[3],
+                    "price": row[4],
+                    "quantity": row[5]
+                }
+                final_name = new_name if new_name else existing["name"]
+                final_description = description if description else existing["description"]
+                final_company = company_name if company_name else existing["company_name"]
+                final_price = price if price is not None else existing["price"]
+                final_qty = quantity if quantity is not None else existing["quantity"]
 
-            cursor.execute("""
-                UPDATE Product
-                SET name = ?, description = ?, company_name = ?, price = ?, quantity = ?
-                WHERE product_id = ?
-            """, (final_name, final_description, final_company, final_price, final_qty, existing["product_id"]))
+                cursor.execute("""
+                    UPDATE Product
+                    SET name = ?, description = ?, company_name = ?, price = ?, quantity = ?
+                    WHERE product_id = ?
+                """, (final_name, final_description, final_company, final_price, final_qty, existing["product_id"]))
 
-            self.conn.commit()
-            cursor.close()
+                conn.commit()
+                cursor.close()
+                catalog_cache.invalidate()
 
-            return "Product updated successfully."
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to update product: " + str(e))
+                return "Product updated successfully."
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to update product: " + str(e))
     def generate_product_id(self):
-        digits = [str(random.randint(0, 9)) for _ in range(10)]
-        return f"{digits[0]}-{''.join(digits[1:5])}-{''.join(digits[5:9])}-{digits[9]}"
-    def bulk_upload_products(self, csv_file):
-        try:
-            cursor = self.conn.cursor()
-            with open(csv_file, newline='', encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    product_id = self.generate_product_id()
-                    cursor.execute("""
-                        INSERT INTO Product (product_id, name, description, company_name, price, quantity, reserved, image_path)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        product_id,
-                        row["name"],
-                        row["description"],
-                        row["company_name"],
-                        float(row["price"]),
-                        int(row["quantity"]),
-                        row.get("reserved", 0),
-                        row["image_path"]
-                    ))
-            self.conn.commit()
-            cursor.close()
-            print("Bulk product upload successful")
-        except (sqlite3.Error, FileNotFoundError, KeyError, ValueError) as e:
-            raise DatabaseException("Bulk upload failed: " + str(e))
-    def get_highest_priced_product(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT product_id, name, description, company_name, price, quantity, reserved
-                FROM Product
-                ORDER BY price DESC
-                LIMIT 1
-            """)
-            product = cursor.fetchone()
-            cursor.close()
+        return format_product_id(self.product_ids.next_id())
+    REQUIRED_CSV_COLUMNS = ("name", "description", "company_name", "price", "quantity", "image_path")
+    def _parse_product_row(self, row):
+        """Validate one CSV row into an insert tuple (product_id filled in later)."""
+        if None in row:
+            raise ValueError("too many fields")
+        name = (row.get("name") or "").strip()
+        if not name:
+            raise ValueError("name is required")
+        price = float(row.get("price") or "")
+        if not math.isfinite(price):
+            raise ValueError("price must be a finite number")
+        if price < 0:
+            raise ValueError("price must not be negative")
+        quantity = int(row.get("quantity") or "")
+        if quantity < 0:
+            raise ValueError("quantity must not be negative")
+        reserved = int(row.get("reserved") or 0)
+        if reserved < 0:
+            raise ValueError("reserved must not be negative")
+        if reserved > quantity:
+            raise ValueError("reserved must not exceed quantity")
+        return (name, row.get("description"), row.get("company_name"), price, quantity, reserved, row.get("image_path"))
+    def _upsert_product_chunk(self, conn, chunk):
+        """Upsert one chunk keyed by product name. Returns (inserted, updated)."""
+        by_name = {}
+        for product in chunk:
+            by_name[product[0]] = product
+        names = list(by_name)
+        placeholders = ", ".join("?" for _ in names)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT name FROM Product WHERE name IN ({placeholders})", names)
+        existing = {row[0] for row in cursor.fetchall()}
+        new_products = [product for name, product in by_name.items() if name not in existing]
+        # IDs are reserved before this chunk's write transaction opens.
+        product_ids = self.product_ids.next_ids(len(new_products)) if new_products else []
+        inserts = [
+            (format_product_id(product_id), *product)
+            for product_id, product in zip(product_ids, new_products)
+        ]
+        # Reserved stock belongs to live carts, so a re-import never resets it.
+        cursor.executemany("""
+            UPDATE Product
+            SET description = ?, company_name = ?, price = ?, quantity = ?, image_path = ?
+            WHERE name = ?
+        """, [
+            (description, company, price, quantity, image_path, name)
+            for name, description, company, price, quantity, _, image_path in by_name.values()
+            if name in existing
+        ])
+        cursor.executemany("""
+            INSERT INTO Product (product_id, name, description, company_name, price, quantity, reserved, image_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, inserts)
+        conn.commit()
+        cursor.close()
+        return len(inserts), len(by_name) - len(inserts)
+    def bulk_upload_products(self, csv_file, chunk_size=5000, error_report=None):
+        """
+        Stream a product CSV into the catalog, upserting by product name.
 
-            if not product:
-                return None  
+        Rows are read and written ``chunk_size`` at a time, one transaction
+        per chunk, so memory stays bounded for any file size. Rows that fail
+        validation are written to ``error_report`` (default
+        ``<csv_file>.errors.csv``) instead of aborting the import.
+        """
+        error_report = error_report or csv_file + ".errors.csv"
+        summary = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "error_report": None}
+        if os.path.exists(error_report):
+            os.remove(error_report)
+        started = time.perf_counter()
+        errors_file = None
+        errors_writer = None
+        with self.db.connection() as conn:
+            try:
+                with open(csv_file, newline='', encoding="utf-8") as file:
+                    reader = csv.DictReader(file)
+                    missing = [c for c in self.REQUIRED_CSV_COLUMNS if c not in (reader.fieldnames or [])]
+                    if missing:
+                        raise DatabaseException("Bulk upload failed: missing columns " + ", ".join(missing))
+                    chunk = []
+                    # Line 1 is the header, so data rows start at 2.
+                    for line_number, row in enumerate(reader, start=2):
+                        summary["rows"] += 1
+                        try:
+                            chunk.append(self._parse_product_row(row))
+                        except ValueError as e:
+                            summary["failed"] += 1
+                            if errors_writer is None:
+                                errors_file = open(error_report, "w", newline='', encoding="utf-8")
+                                errors_writer = csv.writer(errors_file)
+                                errors_writer.writerow(["line", "error", *reader.fieldnames])
+                                summary["error_report"] = error_report
+                            errors_writer.writerow([line_number, str(e), *(row.get(c) for c in reader.fieldnames)])
+                        if len(chunk) >= chunk_size:
+                            inserted, updated = self._upsert_product_chunk(conn, chunk)
+                            summary["inserted"] += inserted
+                            summary["updated"] += updated
+                            chunk = []
+                            elapsed = time.perf_counter() - started
+                            print(f"Imported {summary['rows']} rows ({summary['rows'] / elapsed:,.0f} rows/s)")
+                    if chunk:
+                        inserted, updated = self._upsert_product_chunk(conn, chunk)
+                        summary["inserted"] += inserted
+                        summary["updated"] += updated
+                summary["seconds"] = time.perf_counter() - started
+                print(f"Bulk product upload finished: {summary['rows']} rows in {summary['seconds']:.1f}s "
+                      f"({summary['rows'] / summary['seconds'] if summary['seconds'] else 0:,.0f} rows/s)")
+                return summary
+            except (sqlite3.Error, OSError, UnicodeDecodeError, csv.Error) as e:
+                conn.rollback()
+                raise DatabaseException("Bulk upload failed: " + str(e))
+            finally:
+                if errors_file:
+                    errors_file.close()
+                catalog_cache.invalidate()
+    def get_products_for_images(self, after, limit, force=False):
+        """
+        (product_id, image_path) after ``after`` in product_id order whose
+        variants are missing or were built from a different image_path.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT product_id, image_path FROM Product
+                    WHERE product_id > ? AND image_path IS NOT NULL AND image_path != ''
+                      AND (? OR image_variants IS NULL OR json_extract(image_variants, '$.source') IS NOT image_path)
+                    ORDER BY product_id
+                    LIMIT ?
+                """, (after, 1 if force else 0, limit))
+                rows = cursor.fetchall()
+                cursor.close()
+                return rows
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch products for image generation: " + str(e))
+    def set_product_image_variants(self, updates):
+        """Store (image_variants JSON, product_id) pairs in one transaction."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.executemany("UPDATE Product SET image_variants = ? WHERE product_id = ?", updates)
+                conn.commit()
+                cursor.close()
+                catalog_cache.invalidate()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to store image variants: " + str(e))
+    def get_highest_priced_product(self):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT product_id, name, description, company_name, price, quantity, reserved
+                    FROM Product
+                    ORDER BY price DESC
+                    LIMIT 1
+                """)
+                product = cursor.fetchone()
+                cursor.close()
 
-            return {
-                "product_id": product[0],
-                "name": product[1],
-                "description": product[2],
-                "company_name": product[3],
-                "price": product[4],
-                "quantity": product[5],
-            }
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to fetch highest priced product: " + str(e))
-    def display_all_products(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM Product")
-            products = cursor.fetchall()
-            cursor.close()
+                if not product:
+                    return None  
 
-            # Convert the results to a list of dictionaries
-            product_list = []
-            for product in products:
-                product_dict = {
+                return {
                     "product_id": product[0],
                     "name": product[1],
                     "description": product[2],
                     "company_name": product[3],
                     "price": product[4],
                     "quantity": product[5],
-                    "reserved": product[6],
-                    "image_path": product[8]
                 }
-                product_list.append(product_dict)
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch highest priced product: " + str(e))
+    def display_all_products(self):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM Product")
+                products = cursor.fetchall()
+                cursor.close()
+
+                # Convert the results to a list of dictionaries
+                product_list = []
+                for product in products:
+                    product_dict = {
+                        "product_id": product[0],
+                        "name": product[1],
+                        "description": product[2],
+                        "company_name": product[3],
+                        "price": product[4],
+                        "quantity": product[5],
+                        "reserved": product[6],
+                        "image_path": product[8]
+                    }
+                    product_list.append(product_dict)
 
-            return product_list if product_list else None
-        except sqlite3.Error as e:
-            raise Exception(f"Error fetching products: {str(e)}")
+                return product_list if product_list else None
+            except sqlite3.Error as e:
+                raise Exception(f"Error fetching products: {str(e)}")
     def get_all_transactions(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT t.transaction_id, t.customer_id, c.name,
-                    t.product_id, t.no_of_items, t.total_amount
-                FROM Transactions t
-                JOIN Customer c ON t.customer_id = c.customer_id
-                ORDER BY t.total_amount DESC
-                """)
-            rows = cursor.fetchall()
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT t.transaction_id, t.customer_id, c.name,
+                        t.product_id, t.no_of_items, t.total_amount
+                    FROM Transactions t
+                    JOIN Customer c ON t.customer_id = c.customer_id
+                    ORDER BY t.total_amount DESC
+                    """)
+                rows = cursor.fetchall()
+                cursor.close()
 
-            transactions = []
-            for row in rows:
-                transactions.append({
-                    "transaction_id": row[0],
-                    "customer_id": row[1],
-                    "customer_name": row[2],
-                    "product_id": row[3],
-                    "no_of_items": row[4],
-                    "total_amount": row[5],
-                })
-            return transactions
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to fetch transactions: " + str(e))
+                transactions = []
+                for row in rows:
+                    transactions.append({
+                        "transaction_id": row[0],
+                        "customer_id": row[1],
+                        "customer_name": row[2],
+                        "product_id": row[3],
+                        "no_of_items": row[4],
+                        "total_amount": row[5],
+                    })
+                return transactions
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch transactions: " + str(e))
 
-    def get_successful_orders_with_transactions(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT DISTINCT
-                    c.customer_id,
-                    c.name        AS customer_name,
-                    c.email,
-                    c.address,
-                    c.contact_number,
-                    t.transaction_id,
-                    p.name        AS product_name,
-                    t.no_of_items
+    RANKED_TRANSACTION_COLUMNS = """
+        t.transaction_id, t.customer_id, c.name, t.product_id, t.no_of_items, t.total_amount
+    """
+    @staticmethod
+    def _transaction_dict(row):
+        return {
+            "transaction_id": row[0],
+            "customer_id": row[1],
+            "customer_name": row[2],
+            "product_id": row[3],
+            "no_of_items": row[4],
+            "total_amount": row[5],
+        }
+    def get_top_transactions(self, limit=10, offset=0):
+        """Highest transactions first; walks idx_transactions_amount and stops after ``limit`` rows."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT {self.RANKED_TRANSACTION_COLUMNS}
                     FROM Transactions t
-                    JOIN Customer c
-                    ON c.customer_id = t.customer_id
-                    JOIN Product p
-                    ON p.product_id = t.product_id
-                    JOIN "Order" o
-                    ON o.customer_id = t.customer_id
-                    AND o.product_id  = t.product_id
-                    AND o.status = 'PLACED'
-                    ORDER BY t.transaction_id DESC
-                """)
-            rows = cursor.fetchall()
-            cursor.close()
-            return rows
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to fetch successful orders: " + str(e))
+                    JOIN Customer c ON t.customer_id = c.customer_id
+                    ORDER BY t.total_amount DESC, t.transaction_id DESC
+                    LIMIT ? OFFSET ?
+                    """, (limit, offset))
+                rows = cursor.fetchall()
+                cursor.close()
+                return [self._transaction_dict(row) for row in rows]
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch top transactions: " + str(e))
+    def get_nth_highest_transaction(self, n):
+        transactions = self.get_top_transactions(limit=1, offset=n - 1)
+        return transactions[0] if transactions else None
+    def get_top_transactions_per_customer(self, per_customer=3, customer_id=None):
+        """
+        The ``per_customer`` highest transactions of every customer (or of one
+        customer). Each customer's slice is a LIMIT seek on
+        idx_transactions_customer_amount, so the cost follows the number of
+        customers rather than the size of Transactions.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                where, params = ("WHERE c.customer_id = ?", [customer_id]) if customer_id is not None else ("", [])
+                cursor.execute(f"""
+                    SELECT {self.RANKED_TRANSACTION_COLUMNS},
+                        ROW_NUMBER() OVER (
+                            PARTITION BY t.customer_id
+                            ORDER BY t.total_amount DESC, t.transaction_id DESC
+                        ) AS rank
+                    FROM Customer c
+                    JOIN Transactions t ON t.transaction_id IN (
+                        SELECT transaction_id FROM Transactions
+                        WHERE customer_id = c.customer_id
+                        ORDER BY total_amount DESC, transaction_id DESC
+                        LIMIT ?
+                    )
+                    {where}
+                    ORDER BY t.customer_id, rank
+                    """, [per_customer] + params)
+                rows = cursor.fetchall()
+                cursor.close()
+                return [{**self._transaction_dict(row), "rank": row[6]} for row in rows]
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch top transactions per customer: " + str(e))
+
+    def get_sales_dashboard(self, top=5):
+        """
+        Store-wide totals plus the best-selling products and customers, read
+        from the sales summary tables; the transaction log is never scanned.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT units_sold, revenue, order_count FROM SalesTotals WHERE id = 1")
+                totals = cursor.fetchone() or (0, 0.0, 0)
+                cursor.execute("""
+                    SELECT s.product_id, p.name, s.units_sold, s.revenue, s.order_count
+                    FROM ProductSales s
+                    LEFT JOIN Product p ON p.product_id = s.product_id
+                    ORDER BY s.revenue DESC
+                    LIMIT ?
+                """, (top,))
+                products = cursor.fetchall()
+                cursor.execute("""
+                    SELECT s.customer_id, c.name, s.units_bought, s.revenue, s.order_count, s.last_order_at
+                    FROM CustomerSales s
+                    LEFT JOIN Customer c ON c.customer_id = s.customer_id
+                    ORDER BY s.revenue DESC
+                    LIMIT ?
+                """, (top,))
+                customers = cursor.fetchall()
+                cursor.close()
+                return {
+                    "totals": {
+                        "units_sold": totals[0],
+                        "revenue": round(totals[1], 2),
+                        "order_count": totals[2],
+                    },
+                    "top_products": [
+                        {
+                            "product_id": row[0],
+                            "name": row[1],
+                            "units_sold": row[2],
+                            "revenue": round(row[3], 2),
+                            "order_count": row[4],
+                        }
+                        for row in products
+                    ],
+                    "top_customers": [
+                        {
+                            "customer_id": row[0],
+                            "name": row[1],
+                            "units_bought": row[2],
+                            "revenue": round(row[3], 2),
+                            "order_count": row[4],
+                            "last_order_at": row[5],
+                        }
+                        for row in customers
+                    ],
+                }
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch sales dashboard: " + str(e))
+
+    def get_successful_orders_with_transactions(self):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT
+                        c.customer_id,
+                        c.name        AS customer_name,
+                        c.email,
+                        c.address,
+                        c.contact_number,
+                        t.transaction_id,
+                        p.name        AS product_name,
+                        t.no_of_items
+                        FROM Transactions t
+                        JOIN Customer c
+                        ON c.customer_id = t.customer_id
+                        JOIN Product p
+                        ON p.product_id = t.product_id
+                        JOIN "Order" o
+                        ON o.order_header_id = t.order_header_id
+                        AND o.product_id  = t.product_id
+                        AND o.status = 'PLACED'
+                        ORDER BY t.transaction_id DESC
+                    """)
+                rows = cursor.fetchall()
+                cursor.close()
+                return rows
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch successful orders: " + str(e))
     
\ No newline at end of file
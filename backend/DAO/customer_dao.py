@@ -1,578 +1,950 @@
 from datetime import datetime
+import re
 import sqlite3
+import time
 from entities.customer import Customer
 from entities.product import Product
 from entities.unverified_user import UnverifiedUser
 from backend.utils.exceptions import DuplicateEmailException, DatabaseException
+from backend.utils.catalog_cache import catalog_cache
+# Seconds a cart keeps its reserved stock after the customer's last cart change.
+DEFAULT_RESERVATION_TTL = 30 * 60
 class CustomerDAO:
-    def __init__(self,conn):
-        self.conn=conn
-    def is_customer_id_exists(self, customer_id: int) -> bool:
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM Customer WHERE customer_id=?", (customer_id,))
-            return cursor.fetchone() is not None
-        
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while checking customer ID: " + str(e))
+    def __init__(self, db, reservation_ttl=DEFAULT_RESERVATION_TTL):
+        self.db = db
+        self.reservation_ttl = reservation_ttl
+    def _reserve_stock(self, cursor, product_id, units, product_name):
+        """
+        Move ``units`` from quantity to reserved (negative units move them
+        back) as one conditional UPDATE, so the stock check and the change
+        cannot be split by another writer.
+        """
+        cursor.execute("""
+            UPDATE Product
+            SET quantity = quantity - ?, reserved = reserved + ?
+            WHERE product_id = ? AND quantity >= ? AND reserved >= -?
+        """, (units, units, product_id, units, units))
+        if cursor.rowcount != 1:
+            raise DatabaseException(f"Not enough stock available for {product_name}.")
+    def _touch_cart(self, cursor, customer_id):
+        """Push the reservation expiry of every line in the customer's cart out by the TTL."""
+        cursor.execute("""
+            UPDATE "Order" SET reserved_until = ?
+            WHERE customer_id = ? AND status = 'IN_CART'
+        """, (time.time() + self.reservation_ttl, customer_id))
+    def _read_stock_state(self, cursor, product_id):
+        """Stock of one product plus the catalog version, read inside the caller's transaction."""
+        cursor.execute("""
+            SELECT p.quantity, p.reserved, v.version
+            FROM Product p, CatalogVersion v
+            WHERE p.product_id = ? AND v.id = 1
+        """, (product_id,))
+        return cursor.fetchone()
+    def _patch_catalog_cache(self, product_id, state):
+        quantity, reserved, version = state
+        catalog_cache.update_product(product_id, version, quantity=quantity, reserved=reserved)
     def insert_or_update(self, user: UnverifiedUser):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO UnverifiedUsers (email, name, password, address, contact, otp_code)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user.email, user.name, user.password, user.address, user.contact, user.otp_code))
-            self.conn.commit()
-        except sqlite3.Error as e:
-            raise DatabaseException("Error inserting unverified user: " + str(e))
-        finally:
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT OR REPLACE INTO UnverifiedUsers (email, name, password, address, contact, otp_code)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (user.email, user.name, user.password, user.address, user.contact, user.otp_code))
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Error inserting unverified user: " + str(e))
+            finally:
+                cursor.close()
     def get_user(self, email):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT email, name, password, address, contact, otp_code FROM UnverifiedUsers WHERE email=?", (email,))
-            row = cursor.fetchone()
-            if not row:
-                return None
-            return UnverifiedUser(*row)
-        except sqlite3.Error as e:
-            raise DatabaseException("Error fetching unverified user: " + str(e))
-        finally:
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT email, name, password, address, contact, otp_code FROM UnverifiedUsers WHERE email=?", (email,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                return UnverifiedUser(*row)
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching unverified user: " + str(e))
+            finally:
+                cursor.close()
     def delete_user(self, email):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM UnverifiedUsers WHERE email=?", (email,))
-            self.conn.commit()
-        except sqlite3.Error as e:
-            raise DatabaseException("Error deleting unverified user: " + str(e))
-        finally:
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("DELETE FROM UnverifiedUsers WHERE email=?", (email,))
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Error deleting unverified user: " + str(e))
+            finally:
+                cursor.close()
     def insert_customer(self,customer:Customer):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-            INSERT INTO Customer (customer_id, name, email, password, address, contact_number)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (customer.customer_id, customer.name, customer.email, customer.password, customer.address, customer.contact_number))
-            cursor.execute("INSERT INTO Login VALUES (?,?,?,?,?,?,?,?)",
-            (customer.customer_id, None, None, None,customer.password, 'N', 'Customer', 'Active'))
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.IntegrityError:
-            raise DuplicateEmailException("Email already exists in the system.")
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while inserting customer: " + str(e))
-    def login_customer(self, email, password):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT customer_id,name, password FROM Customer WHERE email = ?", (email,))
-            row = cursor.fetchone()
-            if not row:
-                raise DatabaseException("Invalid email or password.")
-
-            customer_id, name, stored_password = row
-            if stored_password != password:
-                raise DatabaseException("Invalid email or password.")
-            cursor.execute("SELECT status, is_now_logged_in FROM Login WHERE id=?", (customer_id,))
-            login_row = cursor.fetchone()
-            if not login_row:
-                raise DatabaseException("Login record missing for customer.")
-            status, is_logged_in = login_row
-            if status != "Active":
-                raise DatabaseException("Account is inactive. Please restore your account before logging in.")
-            if is_logged_in == "Y":
-                raise DatabaseException("This customer is already logged in.")
-            now = datetime.now().isoformat()
-            cursor.execute(
-                "UPDATE Login SET last_login=?, is_now_logged_in='Y' WHERE id=?",
-                (now, customer_id)
-            )
-            self.conn.commit()
-            return customer_id, name
-
-        except sqlite3.Error as e:
-            raise DatabaseException("Login failed: " + str(e))
-        finally:
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO Customer (customer_id, name, email, password, address, contact_number)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (customer.customer_id, customer.name, customer.email, customer.password, customer.address, customer.contact_number))
+                cursor.execute("INSERT INTO Login VALUES (?,?,?,?,?,?,?,?)",
+                (customer.customer_id, None, None, None,customer.password, 'N', 'Customer', 'Active'))
+                conn.commit()
+                cursor.close()
+            except sqlite3.IntegrityError:
+                raise DuplicateEmailException("Email already exists in the system.")
+            except sqlite3.Error as e:
+                raise DatabaseException("Database error while inserting customer: " + str(e))
+    def get_customer_credentials(self, email):
+        """(customer_id, name, stored password, Login status); the service verifies the password."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT c.customer_id, c.name, c.password, l.status
+                    FROM Customer c
+                    LEFT JOIN Login l ON l.id = c.customer_id AND l.userType = 'Customer'
+                    WHERE c.email = ?
+                """, (email,))
+                row = cursor.fetchone()
+                if not row:
+                    raise DatabaseException("Invalid email or password.")
+                return row
+            except sqlite3.Error as e:
+                raise DatabaseException("Login failed: " + str(e))
+            finally:
+                cursor.close()
+    def upgrade_customer_password(self, customer_id, old_password, new_hash):
+        """
+        Replace a plaintext or outdated password with ``new_hash``, including
+        the copies kept in Login. Skipped if the password changed meanwhile.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE Customer SET password = ? WHERE customer_id = ? AND password = ?",
+                               (new_hash, customer_id, old_password))
+                if cursor.rowcount:
+                    cursor.execute("""
+                        UPDATE Login
+                        SET old_password = CASE WHEN old_password = ? THEN ? ELSE old_password END,
+                            updated_password = CASE WHEN updated_password = ? THEN ? ELSE updated_password END
+                        WHERE id = ? AND userType = 'Customer'
+                    """, (old_password, new_hash, old_password, new_hash, customer_id))
+                conn.commit()
+                cursor.close()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to upgrade password: " + str(e))
     def email_exists(self, email: str) -> bool:
         """
         Check if a customer email already exists in the Customer table.
         """
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM Customer WHERE email=?", (email,))
-            return cursor.fetchone() is not None
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while checking email existence: " + str(e))
-        finally:
-            cursor.close()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM Customer WHERE email=?", (email,))
+                return cursor.fetchone() is not None
+            except sqlite3.Error as e:
+                raise DatabaseException("Database error while checking email existence: " + str(e))
+            finally:
+                cursor.close()
     def login_with_google(self, id, email, name, google_id, picture_url=None):
         """
         Insert or update a customer when they log in with Google.
         """
-        try:
-            cursor = self.conn.cursor()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
 
-            # Check if customer already exists
-            cursor.execute("SELECT customer_id FROM Customer WHERE email = ?", (email,))
-            row = cursor.fetchone()
+                # Check if customer already exists
+                cursor.execute("SELECT customer_id FROM Customer WHERE email = ?", (email,))
+                row = cursor.fetchone()
 
-            if row:
-                customer_id = row[0]
-                # Update login info
-                now = datetime.now().isoformat()
-                cursor.execute("""
-                    UPDATE Login
-                    SET last_login=?, is_now_logged_in='Y'
-                    WHERE id=? AND userType='Customer'
-                """, (now, customer_id))
-            else:
-                # Create new customer
-                cursor.execute("""
-                    INSERT INTO Customer (customer_id,name, email, password, address, contact_number)
-                    VALUES (?,?, ?, NULL, NULL, NULL)
-                """, (id, name, email))
+                if row:
+                    customer_id = row[0]
+                else:
+                    # Create new customer
+                    cursor.execute("""
+                        INSERT INTO Customer (customer_id,name, email, password, address, contact_number)
+                        VALUES (?,?, ?, NULL, NULL, NULL)
+                    """, (id, name, email))
                 
-                customer_id = id
-                # Insert login record
-                now = datetime.now().isoformat()
-                cursor.execute("""
-                    INSERT INTO Login (id, last_login, is_now_logged_in, userType, status)
-                    VALUES (?, ?, 'Y', 'Customer', 'Active')
-                """, (customer_id, now))
-
-            self.conn.commit()
-            cursor.close()
-            return customer_id
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Google login failed: " + str(e))
-    def logout_customer(self, customer_id: int):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT is_now_logged_in FROM Login WHERE id=?", (customer_id,))
-            login_row = cursor.fetchone()
-            if not login_row or login_row[0] != "Y":
-                raise DatabaseException("Customer is not logged in.")
-
-            now = datetime.now().isoformat()
-            cursor.execute(
-                "UPDATE Login SET last_logout=?, is_now_logged_in='N' WHERE id=?",
-                (now, customer_id),
-            )
-            self.conn.commit()
-            cursor.close()
-        except sqlite3.Error as e:
-            raise DatabaseException("Logout failed: " + str(e))
-    def force_logout_everywhere(self, email: str):
-        try:
-            cur = self.conn.cursor()
-            cur.execute("SELECT customer_id FROM Customer WHERE email=?", (email,))
-            row = cur.fetchone()
-            if not row:
-                raise DatabaseException("Email does not exist.")
-            customer_id = row[0]
-
-            now = datetime.now().isoformat()
-            cur.execute(
-                "UPDATE Login SET last_logout=?, is_now_logged_in='N' WHERE id=?",
-                (now, customer_id)
-            )
-            self.conn.commit()
-        except sqlite3.Error as e:
-            raise DatabaseException("Force logout failed: " + str(e))
-        finally:
-            cur.close()  
+                    customer_id = id
+                    # Insert login record; the service marks the session online.
+                    cursor.execute("""
+                        INSERT INTO Login (id, is_now_logged_in, userType, status)
+                        VALUES (?, 'N', 'Customer', 'Active')
+                    """, (customer_id,))
+
+                conn.commit()
+                cursor.close()
+                return customer_id
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Google login failed: " + str(e))
+    def get_customer_id_by_email(self, email: str):
+        with self.db.connection() as conn:
+            try:
+                cur = conn.cursor()
+                cur.execute("SELECT customer_id FROM Customer WHERE email=?", (email,))
+                row = cur.fetchone()
+                if not row:
+                    raise DatabaseException("Email does not exist.")
+                return row[0]
+            except sqlite3.Error as e:
+                raise DatabaseException("Customer lookup failed: " + str(e))
+            finally:
+                cur.close()
     def get_customer_by_id(self, customer_id):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT * FROM Customer WHERE customer_id = ?", (customer_id,))
-            customer_data = cursor.fetchone()
-            if not customer_data:
-                return None
-            return {
-                'customer_id': customer_data[0],
-                'name': customer_data[1],
-                'email': customer_data[2],
-                'password': customer_data[3],
-                'address': customer_data[4],
-                'contact_number': customer_data[5]
-            }
-        except sqlite3.Error as e:
-            raise DatabaseException("Error fetching customer details: " + str(e))
-        finally:
-            cursor.close()
-    def get_product_by_name(self, name):
-        """Fetch product details by product name."""
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT product_id, name, description, company_name, price, quantity, reserved, customer_id, image_path
-                FROM Product
-                WHERE name = ?
-            """, (name,))
-            row = cursor.fetchone()
-            if row:
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM Customer WHERE customer_id = ?", (customer_id,))
+                customer_data = cursor.fetchone()
+                if not customer_data:
+                    return None
                 return {
-                    "product_id": row[0],
-                    "name": row[1],
-                    "description": row[2],
-                    "company_name": row[3],
-                    "price": row[4],
-                    "quantity": row[5],
-                    "reserved": row[6],
-                    "customer_id": row[7],
-                    "image_path": row[8],
+                    'customer_id': customer_data[0],
+                    'name': customer_data[1],
+                    'email': customer_data[2],
+                    'password': customer_data[3],
+                    'address': customer_data[4],
+                    'contact_number': customer_data[5]
                 }
-            return None
-        except sqlite3.Error as e:
-            raise DatabaseException(f"Database error: {str(e)}")
-        except DatabaseException as e:
-            raise DatabaseException(f"Unexpected error in DAO: {str(e)}")
-        finally:
-            cursor.close()
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching customer details: " + str(e))
+            finally:
+                cursor.close()
+    def get_product_by_name(self, name):
+        """Fetch product details by product name."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT product_id, name, description, company_name, price, quantity, reserved, customer_id, image_path, image_variants
+                    FROM Product
+                    WHERE name = ?
+                """, (name,))
+                row = cursor.fetchone()
+                if row:
+                    return Product(*row).to_dict()
+                return None
+            except sqlite3.Error as e:
+                raise DatabaseException(f"Database error: {str(e)}")
+            except DatabaseException as e:
+                raise DatabaseException(f"Unexpected error in DAO: {str(e)}")
+            finally:
+                cursor.close()
+    def get_catalog_version(self):
+        with self.db.connection() as conn:
+            try:
+                row = conn.execute("SELECT version FROM CatalogVersion WHERE id = 1").fetchone()
+                return row[0] if row else 0
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching catalog version: " + str(e))
     def view_product_catalog(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT * FROM Product WHERE quantity > 0
-            """)
-            rows = cursor.fetchall()
-
-            products = [
-                Product(
-                    product_id=row[0],
-                    name=row[1],
-                    description=row[2],
-                    company_name=row[3],
-                    price=row[4],
-                    quantity=row[5],
-                    reserved=row[6],
-                    customer_id=row[7],
-                    image_path=row[8]
-                )
-                for row in rows
-            ]
-            cursor.close()
-            return products
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT * FROM Product WHERE quantity > 0
+                """)
+                rows = cursor.fetchall()
+
+                products = [
+                    Product(
+                        product_id=row[0],
+                        name=row[1],
+                        description=row[2],
+                        company_name=row[3],
+                        price=row[4],
+                        quantity=row[5],
+                        reserved=row[6],
+                        customer_id=row[7],
+                        image_path=row[8],
+                        image_variants=row[9]
+                    )
+                    for row in rows
+                ]
+                cursor.close()
+                return products
+
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching product catalog: " + str(e))
+    def view_product_catalog_page(self, limit, sort="name", descending=False, after=None,
+                                  company_name=None, min_price=None, max_price=None):
+        """
+        One page of the in-stock catalog using keyset pagination.
 
-        except sqlite3.Error as e:
-            raise DatabaseException("Error fetching product catalog: " + str(e))
+        ``after`` is the (sort value, product_id) of the last row of the
+        previous page. Rows are located by seeking the matching catalog index,
+        so every page costs the same regardless of depth.
+        """
+        if sort not in ("name", "price"):
+            raise DatabaseException(f"Unsupported sort column '{sort}'.")
+        conditions = ["quantity > 0"]
+        params = []
+        if company_name:
+            conditions.append("company_name = ?")
+            params.append(company_name)
+        if min_price is not None:
+            conditions.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price <= ?")
+            params.append(max_price)
+        if after is not None:
+            conditions.append(f"({sort}, product_id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        params.append(limit)
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"""
+                    SELECT product_id, name, description, company_name, price, quantity, reserved, customer_id, image_path, image_variants
+                    FROM Product
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY {sort} {direction}, product_id {direction}
+                    LIMIT ?
+                """, tuple(params))
+                rows = cursor.fetchall()
+                cursor.close()
+                return [Product(*row) for row in rows]
+            except sqlite3.Error as e:
+                raise DatabaseException("Error fetching product catalog page: " + str(e))
+    def _match_expression(self, text, prefix_last=False):
+        """Turn free text into a safe FTS5 query: every word is quoted, so user input never reaches the query syntax."""
+        words = re.findall(r"\w+", text)
+        if not words:
+            return None
+        terms = ['"' + word + '"' for word in words]
+        if prefix_last:
+            terms[-1] += "*"
+        return " ".join(terms)
+    def search_products(self, text, limit):
+        """Rank in-stock products by bm25 over name, company and description."""
+        expression = self._match_expression(text)
+        if not expression:
+            return []
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT p.product_id, p.name, p.description, p.company_name, p.price,
+                        p.quantity, p.reserved, p.customer_id, p.image_path, p.image_variants
+                    FROM ProductSearch s
+                    JOIN Product p ON p.rowid = s.rowid
+                    WHERE ProductSearch MATCH ? AND p.quantity > 0
+                    ORDER BY s.rank
+                    LIMIT ?
+                """, (expression, limit))
+                rows = cursor.fetchall()
+                cursor.close()
+                return [Product(*row) for row in rows]
+            except sqlite3.Error as e:
+                raise DatabaseException("Product search failed: " + str(e))
+    def autocomplete_product_names(self, prefix, limit):
+        """
+        Product names whose words start with the typed prefix. Results are
+        not ranked, which lets FTS5 stop after the first ``limit`` matches
+        from its prefix index instead of scoring every candidate.
+        """
+        expression = self._match_expression(prefix, prefix_last=True)
+        if not expression:
+            return []
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT DISTINCT p.name
+                    FROM ProductSearch s
+                    JOIN Product p ON p.rowid = s.rowid
+                    WHERE ProductSearch MATCH ? AND p.quantity > 0
+                    LIMIT ?
+                """, ("name : (" + expression + ")", limit))
+                names = [row[0] for row in cursor.fetchall()]
+                cursor.close()
+                return names
+            except sqlite3.Error as e:
+                raise DatabaseException("Product autocomplete failed: " + str(e))
     def add_product_to_cart(self, customer_id, product_name, quantity):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT product_id, quantity FROM Product WHERE name = ?", (product_name,))
-            result = cursor.fetchone()
-            if not result:
-                raise DatabaseException(f"Product '{product_name}' not found.")
-            product_id, available_quantity = result
-
-            if available_quantity < quantity:
-                raise DatabaseException(f"Not enough stock available for {product_name}.")
-            cursor.execute("""
-                SELECT order_id FROM "Order"
-                WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
-            """, (customer_id, product_id))
-            order = cursor.fetchone()
-
-            if order:
-                raise DatabaseException(
-                    f"Product '{product_name}' already exists in your cart. "
-                    f"Please use the 'Update Cart' option instead."
-                )
-            cursor.execute("""
-                INSERT INTO "Order" (customer_id, product_id, quantity, status)
-                VALUES (?, ?, ?, 'IN_CART')
-            """, (customer_id, product_id, quantity))
-            cursor.execute("""
-                UPDATE Product
-                SET quantity = quantity - ?, reserved = reserved + ?
-                WHERE product_id = ?
-            """, (quantity, quantity, product_id))
-
-            self.conn.commit()
-            cursor.close()
-            return f"Product '{product_name}' added to cart successfully."
-
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Error adding product to cart: " + str(e))    
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT product_id, quantity FROM Product WHERE name = ?", (product_name,))
+                result = cursor.fetchone()
+                if not result:
+                    raise DatabaseException(f"Product '{product_name}' not found.")
+                product_id, available_quantity = result
+
+                if available_quantity < quantity:
+                    raise DatabaseException(f"Not enough stock available for {product_name}.")
+                cursor.execute("""
+                    SELECT order_id FROM "Order"
+                    WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
+                """, (customer_id, product_id))
+                order = cursor.fetchone()
+
+                if order:
+                    raise DatabaseException(
+                        f"Product '{product_name}' already exists in your cart. "
+                        f"Please use the 'Update Cart' option instead."
+                    )
+                # The check above is only a fast path; this conditional
+                # decrement is what stops two buyers taking the same units.
+                self._reserve_stock(cursor, product_id, quantity, product_name)
+                # Re-checked under the write lock the decrement just took, so
+                # two concurrent adds cannot both create a cart line.
+                cursor.execute("""
+                    INSERT INTO "Order" (customer_id, product_id, quantity, status)
+                    SELECT ?, ?, ?, 'IN_CART'
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM "Order"
+                        WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
+                    )
+                """, (customer_id, product_id, quantity, customer_id, product_id))
+                if cursor.rowcount != 1:
+                    raise DatabaseException(
+                        f"Product '{product_name}' already exists in your cart. "
+                        f"Please use the 'Update Cart' option instead."
+                    )
+                self._touch_cart(cursor, customer_id)
+                state = self._read_stock_state(cursor, product_id)
+
+                conn.commit()
+                cursor.close()
+                self._patch_catalog_cache(product_id, state)
+                return f"Product '{product_name}' added to cart successfully."
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Error adding product to cart: " + str(e))    
     def update_cart_item(self, customer_id, product_name, new_quantity):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT product_id, quantity, reserved FROM Product WHERE name = ?", (product_name,))
-            product = cursor.fetchone()
-            if not product:
-                raise DatabaseException(f"Product '{product_name}' not found")
-            product_id, available_quantity, reserved_quantity = product
-            cursor.execute("""
-                SELECT order_id, quantity
-                FROM "Order"
-                WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
-            """, (customer_id, product_id))
-            order = cursor.fetchone()
-            if not order:
-                raise DatabaseException(f"Product '{product_name}' not found in cart for customer {customer_id}")
-            order_id, old_quantity = order
-            diff = new_quantity - old_quantity   
-            if diff > 0 and available_quantity < diff:
-                raise DatabaseException(f"Not enough stock available to increase {product_name} to {new_quantity}")
-
-            cursor.execute("""
-                UPDATE "Order"
-                SET quantity = ?
-                WHERE order_id = ?
-            """, (new_quantity, order_id))
-            cursor.execute("""
-                UPDATE Product
-                SET quantity = quantity - ?,
-                    reserved = reserved + ?
-                WHERE product_id = ?
-            """, (diff, diff, product_id))
-
-            self.conn.commit()
-            return f"Cart updated: {product_name} → quantity {new_quantity}"
-
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to update cart item: " + str(e))
-
-        finally:
-            cursor.close()
-    def delete_cart_item(self, customer_id, product_name):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT product_id FROM Product WHERE name = ?", (product_name,))
-            product = cursor.fetchone()
-            if not product:
-                raise DatabaseException(f"Product '{product_name}' not found.")
-            product_id = product[0]
-            cursor.execute("""
-                SELECT order_id, quantity FROM "Order"
-                WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
-            """, (customer_id, product_id))
-            order = cursor.fetchone()
-            if not order:
-                raise DatabaseException(f"Product '{product_name}' not found in cart.")
-            order_id, qty_in_cart = order
-            cursor.execute("DELETE FROM 'Order' WHERE order_id = ?", (order_id,))
-            cursor.execute("""
-                UPDATE Product
-                SET quantity = quantity + ?, reserved = reserved - ?
-                WHERE product_id = ?
-            """, (qty_in_cart, qty_in_cart, product_id))
-            self.conn.commit()
-            cursor.close()
-            return f"Product '{product_name}' removed from cart. Stock updated."
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to delete cart item: " + str(e))
-    def place_order(self, customer_id):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT o.order_id, o.product_id, o.quantity,
-                    p.name, p.price, p.company_name, p.description
-            FROM "Order" o
-            JOIN Product p ON o.product_id = p.product_id
-            WHERE o.customer_id = ? AND o.status = 'IN_CART'
-            """, (customer_id,))
-            cart_items = cursor.fetchall()
-
-            if not cart_items:
-                raise DatabaseException("Cart is empty. Cannot place order.")
-
-            total_amount = 0
-            total_items = 0
-            for _, _, qty_in_cart, _, price, _, _ in cart_items:
-                total_amount += qty_in_cart * price
-                total_items += qty_in_cart
-            for order_id, product_id, qty_in_cart, product_name, price, company, desc in cart_items:
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT product_id, quantity, reserved FROM Product WHERE name = ?", (product_name,))
+                product = cursor.fetchone()
+                if not product:
+                    raise DatabaseException(f"Product '{product_name}' not found")
+                product_id, available_quantity, reserved_quantity = product
+                cursor.execute("""
+                    SELECT order_id, quantity
+                    FROM "Order"
+                    WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
+                """, (customer_id, product_id))
+                order = cursor.fetchone()
+                if not order:
+                    raise DatabaseException(f"Product '{product_name}' not found in cart for customer {customer_id}")
+                order_id, old_quantity = order
+                diff = new_quantity - old_quantity   
+                if diff > 0 and available_quantity < diff:
+                    raise DatabaseException(f"Not enough stock available to increase {product_name} to {new_quantity}")
+
                 cursor.execute("""
                     UPDATE "Order"
-                    SET status = 'PLACED'
-                    WHERE order_id = ?
-                """, (order_id,))
+                    SET quantity = ?
+                    WHERE order_id = ? AND status = 'IN_CART' AND quantity = ?
+                """, (new_quantity, order_id, old_quantity))
+                if cursor.rowcount != 1:
+                    raise DatabaseException(f"Cart item '{product_name}' changed concurrently; please retry.")
+                self._reserve_stock(cursor, product_id, diff, product_name)
+                self._touch_cart(cursor, customer_id)
+                state = self._read_stock_state(cursor, product_id)
+
+                conn.commit()
+                self._patch_catalog_cache(product_id, state)
+                return f"Cart updated: {product_name} → quantity {new_quantity}"
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to update cart item: " + str(e))
+
+            finally:
+                cursor.close()
+    def delete_cart_item(self, customer_id, product_name):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT product_id FROM Product WHERE name = ?", (product_name,))
+                product = cursor.fetchone()
+                if not product:
+                    raise DatabaseException(f"Product '{product_name}' not found.")
+                product_id = product[0]
+                cursor.execute("""
+                    SELECT order_id, quantity FROM "Order"
+                    WHERE customer_id = ? AND product_id = ? AND status = 'IN_CART'
+                """, (customer_id, product_id))
+                order = cursor.fetchone()
+                if not order:
+                    raise DatabaseException(f"Product '{product_name}' not found in cart.")
+                order_id, qty_in_cart = order
+                cursor.execute("""
+                    DELETE FROM "Order" WHERE order_id = ? AND status = 'IN_CART' AND quantity = ?
+                """, (order_id, qty_in_cart))
+                if cursor.rowcount != 1:
+                    raise DatabaseException(f"Cart item '{product_name}' changed concurrently; please retry.")
+                self._reserve_stock(cursor, product_id, -qty_in_cart, product_name)
+                self._touch_cart(cursor, customer_id)
+                state = self._read_stock_state(cursor, product_id)
+                conn.commit()
+                cursor.close()
+                self._patch_catalog_cache(product_id, state)
+                return f"Product '{product_name}' removed from cart. Stock updated."
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to delete cart item: " + str(e))
+    def apply_cart_batch(self, customer_id, operations):
+        """
+        Apply a list of add/update/delete cart operations in one transaction.
 
+        Stock and the customer's current cart lines for every product named in
+        the batch are read with a single query under BEGIN IMMEDIATE, the
+        operations are validated in order against that snapshot, and only the
+        net change per product is written back with executemany. Invalid
+        operations are reported and skipped; the rest are still applied.
+        """
+        names = list({op.get("product_name") for op in operations if isinstance(op.get("product_name"), str)})
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                state = {}
+                if names:
+                    placeholders = ", ".join("?" for _ in names)
+                    cursor.execute(f"""
+                        SELECT p.name, p.product_id, p.quantity, o.order_id, o.quantity
+                        FROM Product p
+                        LEFT JOIN "Order" o
+                            ON o.product_id = p.product_id
+                            AND o.customer_id = ?
+                            AND o.status = 'IN_CART'
+                        WHERE p.name IN ({placeholders})
+                    """, (customer_id, *names))
+                    for name, product_id, available, order_id, in_cart in cursor.fetchall():
+                        state.setdefault(name, {
+                            "product_id": product_id,
+                            "available": available,
+                            "order_id": order_id,
+                            "initial": in_cart,
+                            "in_cart": in_cart,
+                        })
+
+                results = []
+                for index, op in enumerate(operations):
+                    action = op.get("op")
+                    name = op.get("product_name")
+                    quantity = op.get("quantity")
+                    item = state.get(name) if isinstance(name, str) else None
+                    result = {"index": index, "op": action, "product_name": name}
+                    error = None
+                    if action not in ("add", "update", "delete"):
+                        error = f"Unsupported operation '{action}'."
+                    elif not isinstance(name, str) or not name:
+                        error = "product_name must be a non-empty string."
+                    elif item is None:
+                        error = f"Product '{name}' not found."
+                    elif action != "delete" and (isinstance(quantity, bool) or not isinstance(quantity, int)
+                                                 or quantity <= 0):
+                        error = "Quantity must be a positive integer."
+                    elif action == "add" and item["in_cart"] is not None:
+                        error = (f"Product '{name}' already exists in your cart. "
+                                 f"Please use the 'Update Cart' option instead.")
+                    elif action != "add" and item["in_cart"] is None:
+                        error = f"Product '{name}' not found in cart."
+                    elif action != "delete" and quantity - (item["in_cart"] or 0) > item["available"]:
+                        error = f"Not enough stock available for {name}."
+                    if error:
+                        result.update(status="error", message=error)
+                        results.append(result)
+                        continue
+                    if action == "delete":
+                        item["available"] += item["in_cart"]
+                        item["in_cart"] = None
+                        result.update(status="success", message=f"Product '{name}' removed from cart.")
+                    else:
+                        item["available"] -= quantity - (item["in_cart"] or 0)
+                        item["in_cart"] = quantity
+                        result.update(status="success", message=f"{name} → quantity {quantity}")
+                    results.append(result)
+
+                inserts, updates, deletes, stock = [], [], [], []
+                for item in state.values():
+                    before = item["initial"] or 0
+                    after = item["in_cart"] or 0
+                    if item["initial"] is None and item["in_cart"] is not None:
+                        inserts.append((customer_id, item["product_id"], after))
+                    elif item["initial"] is not None and item["in_cart"] is None:
+                        deletes.append((item["order_id"],))
+                    elif item["initial"] is not None and after != before:
+                        updates.append((after, item["order_id"]))
+                    if after != before:
+                        delta = after - before
+                        stock.append((delta, delta, item["product_id"], delta, delta))
+                if inserts:
+                    cursor.executemany("""
+                        INSERT INTO "Order" (customer_id, product_id, quantity, status)
+                        VALUES (?, ?, ?, 'IN_CART')
+                    """, inserts)
+                if updates:
+                    cursor.executemany('UPDATE "Order" SET quantity = ? WHERE order_id = ?', updates)
+                if deletes:
+                    cursor.executemany('DELETE FROM "Order" WHERE order_id = ?', deletes)
+                if stock:
+                    cursor.executemany("""
+                        UPDATE Product
+                        SET quantity = quantity - ?, reserved = reserved + ?
+                        WHERE product_id = ? AND quantity >= ? AND reserved >= -?
+                    """, stock)
+                    if cursor.rowcount != len(stock):
+                        raise DatabaseException("Stock changed while the cart batch was applied; please retry.")
+                if inserts or updates or deletes:
+                    self._touch_cart(cursor, customer_id)
+                conn.commit()
+                cursor.close()
+                if stock:
+                    catalog_cache.invalidate()
+                return results
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to apply cart batch: " + str(e))
+    def release_expired_reservations(self, batch_size=500, now=None):
+        """
+        Expire up to ``batch_size`` abandoned cart lines and return their stock.
+
+        The lines are marked EXPIRED and the units go back from reserved to
+        quantity with one UPDATE ... FROM over the batch, grouped per product.
+        Returns ``(lines, units)`` released; (0, 0) once nothing is due.
+        """
+        now = time.time() if now is None else now
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
                 cursor.execute("""
+                    SELECT order_id, quantity FROM "Order"
+                    WHERE status = 'IN_CART' AND reserved_until <= ?
+                    ORDER BY reserved_until
+                    LIMIT ?
+                """, (now, batch_size))
+                expired = cursor.fetchall()
+                if not expired:
+                    conn.rollback()
+                    return 0, 0
+                order_ids = [order_id for order_id, _ in expired]
+                placeholders = ", ".join("?" for _ in order_ids)
+                cursor.execute(f"""
                     UPDATE Product
-                    SET reserved = reserved - ?
-                    WHERE product_id = ?
-                """, (qty_in_cart, product_id))
+                    SET quantity = quantity + released.units,
+                        reserved = reserved - released.units
+                    FROM (
+                        SELECT product_id, SUM(quantity) AS units
+                        FROM "Order"
+                        WHERE order_id IN ({placeholders})
+                        GROUP BY product_id
+                    ) AS released
+                    WHERE Product.product_id = released.product_id
+                """, order_ids)
+                cursor.execute(f"""
+                    UPDATE "Order" SET status = 'EXPIRED'
+                    WHERE order_id IN ({placeholders})
+                """, order_ids)
+                conn.commit()
+                cursor.close()
+                catalog_cache.invalidate()
+                return len(expired), sum(quantity for _, quantity in expired)
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to release expired reservations: " + str(e))
+    def _record_sales(self, cursor, customer_id, order_header_id, total_amount, total_items, placed_at):
+        """Fold one placed order into the sales summary tables (caller holds the transaction)."""
+        cursor.execute("""
+            INSERT INTO ProductSales (product_id, units_sold, revenue, order_count)
+            SELECT product_id, SUM(quantity), SUM(quantity * unit_price), 1
+            FROM "Order"
+            WHERE order_header_id = ?
+            GROUP BY product_id
+            ON CONFLICT(product_id) DO UPDATE SET
+                units_sold = units_sold + excluded.units_sold,
+                revenue = revenue + excluded.revenue,
+                order_count = order_count + 1
+        """, (order_header_id,))
+        cursor.execute("""
+            INSERT INTO CustomerSales (customer_id, units_bought, revenue, order_count, last_order_at)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(customer_id) DO UPDATE SET
+                units_bought = units_bought + excluded.units_bought,
+                revenue = revenue + excluded.revenue,
+                order_count = order_count + 1,
+                last_order_at = excluded.last_order_at
+        """, (customer_id, total_items, total_amount, placed_at))
+        cursor.execute("""
+            INSERT INTO SalesTotals (id, units_sold, revenue, order_count)
+            VALUES (1, ?, ?, 1)
+            ON CONFLICT(id) DO UPDATE SET
+                units_sold = units_sold + excluded.units_sold,
+                revenue = revenue + excluded.revenue,
+                order_count = order_count + 1
+        """, (total_items, total_amount))
+    def place_order(self, customer_id):
+        """
+        Check out the customer's cart as one order header plus its lines.
 
+        The write lock is taken once with BEGIN IMMEDIATE, and the statement
+        count is fixed regardless of cart size: the lines are flagged with one
+        UPDATE ... WHERE order_id IN (...), stock and ledger rows are derived
+        from those lines with set-based statements.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
                 cursor.execute("""
-                    INSERT INTO Transactions (customer_id, product_id, total_amount, no_of_items)
+                    SELECT o.order_id, o.product_id, o.quantity,
+                        p.name, p.price, p.company_name, p.description
+                FROM "Order" o
+                JOIN Product p ON o.product_id = p.product_id
+                WHERE o.customer_id = ? AND o.status = 'IN_CART'
+                """, (customer_id,))
+                cart_items = cursor.fetchall()
+
+                if not cart_items:
+                    raise DatabaseException("Cart is empty. Cannot place order.")
+
+                placed_at = datetime.now().isoformat()
+                total_amount = 0
+                total_items = 0
+                for _, _, qty_in_cart, _, price, _, _ in cart_items:
+                    total_amount += qty_in_cart * price
+                    total_items += qty_in_cart
+
+                cursor.execute("""
+                    INSERT INTO OrderHeader (customer_id, total_amount, no_of_items, placed_at)
                     VALUES (?, ?, ?, ?)
-                """, (customer_id, product_id, qty_in_cart * price, qty_in_cart))
+                """, (customer_id, total_amount, total_items, placed_at))
+                order_header_id = cursor.lastrowid
 
-            self.conn.commit()
-            cursor.close()
+                order_ids = [item[0] for item in cart_items]
+                placeholders = ", ".join("?" for _ in order_ids)
+                cursor.execute(f"""
+                    UPDATE "Order"
+                    SET status = 'PLACED',
+                        order_header_id = ?,
+                        unit_price = (SELECT price FROM Product WHERE product_id = "Order".product_id)
+                    WHERE order_id IN ({placeholders})
+                """, (order_header_id, *order_ids))
+                cursor.execute("""
+                    UPDATE Product
+                    SET reserved = reserved - o.units
+                    FROM (
+                        SELECT product_id, SUM(quantity) AS units
+                        FROM "Order"
+                        WHERE order_header_id = ?
+                        GROUP BY product_id
+                    ) AS o
+                    WHERE o.product_id = Product.product_id
+                """, (order_header_id,))
+                cursor.execute("""
+                    INSERT INTO Transactions (customer_id, product_id, total_amount, no_of_items, order_header_id)
+                    SELECT customer_id, product_id, quantity * unit_price, quantity, order_header_id
+                    FROM "Order"
+                    WHERE order_header_id = ?
+                    ORDER BY order_id
+                """, (order_header_id,))
+                self._record_sales(cursor, customer_id, order_header_id, total_amount, total_items, placed_at)
+
+                conn.commit()
+                cursor.close()
+                catalog_cache.invalidate()
+
+                invoice = {
+                    "customer_id": customer_id,
+                    "order_header_id": order_header_id,
+                    "items": [
+                        {
+                            "order_id": order_id,
+                            "product_name": product_name,
+                            "company": company,
+                            "description": desc,
+                            "price": price,
+                            "quantity": qty_in_cart,
+                            "total": qty_in_cart * price
+                        }
+                        for order_id, _, qty_in_cart, product_name, price, company, desc in cart_items
+                    ],
+                    "grand_total": total_amount,
+                    "total_items": total_items
+                }
+                return invoice
+
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to place order: " + str(e))
+    def view_order_history(self, customer_id, limit=20, before=None):
+        """
+        Newest-first page of a customer's orders with their lines.
 
-            invoice = {
-                "customer_id": customer_id,
-                "items": [
-                    {
+        Headers are paged on (customer_id, order_header_id) and lines are
+        joined through their order_header_id link, so each page is one
+        indexed query and repeat purchases of a product never multiply rows.
+        ``before`` is the order_header_id the previous page ended on.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                WITH page AS (
+                    SELECT order_header_id, total_amount, no_of_items, placed_at
+                    FROM OrderHeader
+                    WHERE customer_id = ? AND order_header_id < ?
+                    ORDER BY order_header_id DESC
+                    LIMIT ?
+                )
+                SELECT page.order_header_id, page.total_amount, page.no_of_items, page.placed_at,
+                    o.order_id, p.name, o.quantity, o.status, o.unit_price
+                FROM page
+                LEFT JOIN "Order" o ON o.order_header_id = page.order_header_id
+                LEFT JOIN Product p ON p.product_id = o.product_id
+                ORDER BY page.order_header_id DESC, o.order_id
+                """, (customer_id, before if before is not None else 2 ** 63 - 1, limit))
+
+                rows = cursor.fetchall()
+                cursor.close()
+                if not rows and before is None:
+                    return f"No order history found for customer {customer_id}."
+
+                history = {}
+                for header_id, total_amount, no_of_items, placed_at, order_id, product_name, quantity, status, price in rows:
+                    if header_id not in history:
+                        history[header_id] = {
+                            "order_header_id": header_id,
+                            "placed_at": placed_at,
+                            "total_amount": total_amount,
+                            "no_of_items": no_of_items,
+                            "orders": []
+                        }
+                    if order_id is None:
+                        continue
+                    history[header_id]["orders"].append({
                         "order_id": order_id,
                         "product_name": product_name,
-                        "company": company,
-                        "description": desc,
+                        "quantity": quantity,
                         "price": price,
-                        "quantity": qty_in_cart,
-                        "total": qty_in_cart * price
-                    }
-                    for order_id, _, qty_in_cart, product_name, price, company, desc in cart_items
-                ],
-                "grand_total": total_amount,
-                "total_items": total_items
-            }
-            return invoice
-
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to place order: " + str(e))
-    def view_order_history(self, customer_id):
-        try:
-            cursor = self.conn.cursor()
-
-            cursor.execute("""
-            SELECT t.transaction_id, t.total_amount, t.no_of_items,
-                o.order_id, p.name, o.quantity, o.status, p.price
-            FROM Transactions t
-            JOIN "Order" o ON o.product_id = t.product_id AND o.customer_id = t.customer_id
-            JOIN Product p ON o.product_id = p.product_id
-            WHERE o.customer_id = ? AND o.status = 'PLACED'
-            ORDER BY t.transaction_id, o.order_id 
-            """, (customer_id,))
-
-            rows = cursor.fetchall()
-            if not rows:
-                return f"No order history found for customer {customer_id}."
-
-            history = {}
-            for txn_id, total_amount, no_of_items, order_id, product_name, quantity, status, price in rows:
-                if txn_id not in history:
-                    history[txn_id] = {
-                        "transaction_id": txn_id,
-                        "total_amount": total_amount,
-                        "no_of_items": no_of_items,
-                        "orders": []
-                    }
-                history[txn_id]["orders"].append({
-                    "order_id": order_id,
-                    "product_name": product_name,
-                    "quantity": quantity,
-                    "price": price,
-                    "status": status,
-                    "line_total": quantity * price
-                })
-            cursor.close()
-            return list(history.values())
-
-        except sqlite3.Error as e:
-            raise DatabaseException("Failed to fetch order history: " + str(e))
+                        "status": status,
+                        "line_total": quantity * price if price is not None else None
+                    })
+                return list(history.values())
+
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to fetch order history: " + str(e))
     def emailExists(self,email):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("SELECT 1 FROM Customer WHERE email=?", (email,))
-            return cursor.fetchone() is not None
-        except sqlite3.Error as e:
-            raise DatabaseException("Database error while checking email existence: " + str(e))
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM Customer WHERE email=?", (email,))
+                return cursor.fetchone() is not None
+            except sqlite3.Error as e:
+                raise DatabaseException("Database error while checking email existence: " + str(e))
       
     def update_customer_details(self, customer_id, name=None, email=None, password=None, address=None, contact_number=None):
-        try:
-            cursor = self.conn.cursor()
-            updates = []
-            params = []
-            if name:
-                updates.append("name = ?")
-                params.append(name)
-            if email:
-                if self.emailExists(email):
-                    raise DuplicateEmailException(f"Email {email} is already in use.")
-                updates.append("email = ?")
-                params.append(email)
-            if password:
-                cursor.execute("SELECT password FROM Customer WHERE customer_id = ?", (customer_id,))
-                row = cursor.fetchone()
-                current_password = row[0]
-                updates.append("password = ?")
-                params.append(password)
-
-            if address:
-                updates.append("address = ?")
-                params.append(address)
-            if contact_number:
-                updates.append("contact_number = ?")
-                params.append(contact_number)
-
-            if not updates:
-                return "No details provided to update."
-
-            query = f"UPDATE Customer SET {', '.join(updates)} WHERE customer_id = ?"
-            params.append(customer_id)
-            cursor.execute(query, tuple(params))
-
-            if cursor.rowcount == 0:
-                return f"Customer {customer_id} not found."
-            if password:
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                updates = []
+                params = []
+                if name:
+                    updates.append("name = ?")
+                    params.append(name)
+                if email:
+                    if self.emailExists(email):
+                        raise DuplicateEmailException(f"Email {email} is already in use.")
+                    updates.append("email = ?")
+                    params.append(email)
+                if password:
+                    cursor.execute("SELECT password FROM Customer WHERE customer_id = ?", (customer_id,))
+                    row = cursor.fetchone()
+                    current_password = row[0]
+                    updates.append("password = ?")
+                    params.append(password)
+
+                if address:
+                    updates.append("address = ?")
+                    params.append(address)
+                if contact_number:
+                    updates.append("contact_number = ?")
+                    params.append(contact_number)
+
+                if not updates:
+                    return "No details provided to update."
+
+                query = f"UPDATE Customer SET {', '.join(updates)} WHERE customer_id = ?"
+                params.append(customer_id)
+                cursor.execute(query, tuple(params))
+
+                if cursor.rowcount == 0:
+                    return f"Customer {customer_id} not found."
+                if password:
+                    cursor.execute("""
+                        UPDATE Login
+                        SET old_password = ?,
+                            updated_password = ?
+                        WHERE id = ?
+                    """, (current_password, password, customer_id))
+
+                conn.commit()
+                cursor.close()
+                return f"Customer {customer_id} details updated successfully."
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to update customer details: " + str(e))
+    def soft_delete_customer(self, customer_id):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
                 cursor.execute("""
                     UPDATE Login
-                    SET old_password = ?,
-                        updated_password = ?
-                    WHERE id = ?
-                """, (current_password, password, customer_id))
-
-            self.conn.commit()
-            cursor.close()
-            return f"Customer {customer_id} details updated successfully."
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to update customer details: " + str(e))
-    def soft_delete_customer(self, customer_id):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                UPDATE Login
-                SET status = 'Inactive'
-                WHERE id = ? AND userType = 'Customer'
-            """, (customer_id,))
-
-            self.conn.commit()
-
-            if cursor.rowcount == 0:
-                return f"No active customer found with ID {customer_id}."
-            cursor.close()
-            return f"Customer {customer_id} account has been deactivated (soft delete)."
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to soft delete customer account: " + str(e))
+                    SET status = 'Inactive'
+                    WHERE id = ? AND userType = 'Customer'
+                """, (customer_id,))
+
+                conn.commit()
+
+                if cursor.rowcount == 0:
+                    return f"No active customer found with ID {customer_id}."
+                cursor.close()
+                return f"Customer {customer_id} account has been deactivated (soft delete)."
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to soft delete customer account: " + str(e))
     def restore_customer(self, email):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute("""
-                SELECT l.status, c.customer_id
-                FROM Login l
-                JOIN Customer c ON l.id = c.customer_id
-                WHERE c.email = ? AND l.userType = 'Customer'
-            """, (email,))
-            row = cursor.fetchone()
-
-            if not row:
-                return f"No customer account found with email {email}."
-
-            current_status, customer_id = row
-            if current_status == "Active":
-                raise DatabaseException(f"Customer {email} account is already active.")
-            cursor.execute("""
-                UPDATE Login
-                SET status = 'Active'
-                WHERE id = ? AND userType = 'Customer'
-            """, (customer_id,))
-
-            self.conn.commit()
-            cursor.close()
-            return "Customer account has been restored successfully."
-        except sqlite3.Error as e:
-            self.conn.rollback()
-            raise DatabaseException("Failed to restore customer account: " + str(e))
\ No newline at end of file
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT l.status, c.customer_id
+                    FROM Login l
+                    JOIN Customer c ON l.id = c.customer_id
+                    WHERE c.email = ? AND l.userType = 'Customer'
+                """, (email,))
+                row = cursor.fetchone()
+
+                if not row:
+                    return f"No customer account found with email {email}."
+
+                current_status, customer_id = row
+                if current_status == "Active":
+                    raise DatabaseException(f"Customer {email} account is already active.")
+                cursor.execute("""
+                    UPDATE Login
+                    SET status = 'Active'
+                    WHERE id = ? AND userType = 'Customer'
+                """, (customer_id,))
+
+                conn.commit()
+                cursor.close()
+                return "Customer account has been restored successfully."
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to restore customer account: " + str(e))
\ No newline at end of file
@@ -1,12 +1,140 @@
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 
 from backend.utils.exceptions import DatabaseException
+from backend.utils.metrics import TimedConnection
 class DBConnection:
-    def __init__(self, db_name="grocery_store.db"):
+    """
+    Bounded pool of SQLite connections.
+
+    DAOs check a connection out with ``with db.connection() as conn:``. A thread
+    that already holds a connection gets the same one back, so nested DAO calls
+    share a single transaction instead of taking a second pool slot.
+    """
+    def __init__(self, db_name=None, pool_size=5, timeout=30.0):
+        # GROCERY_DB_PATH points the whole app at another database file
+        # (benchmarks and scratch runs use a throwaway copy).
+        self.db_name = db_name or os.getenv("GROCERY_DB_PATH", "grocery_store.db")
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._peak_in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        # Open the first connection eagerly so a bad path fails at startup.
+        self._idle.put(self._open())
+        self._created = 1
+
+    def _open(self):
         try:
-            self.conn = sqlite3.connect(db_name,check_same_thread=False)
+            conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                                   factory=TimedConnection)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
         except sqlite3.Error as e:
             raise DatabaseException("Database connection failed: " + str(e))
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._created < self.pool_size
+            if can_open:
+                # Reserve the slot before opening outside the lock.
+                self._created += 1
+        if can_open:
+            try:
+                return self._open()
+            except DatabaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise DatabaseException(
+                f"Timed out after {self.timeout}s waiting for a database connection."
+            )
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._waits += 1
+            self._wait_time += waited
+        return conn
+
+    def _release(self, conn):
+        # Anything left uncommitted by the DAO is discarded, never leaked to
+        # the next borrower.
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped; the slot is reopened on demand.
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Check a connection out of the pool for the duration of the block."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._peak_in_use = max(self._peak_in_use, self._in_use)
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            with self._lock:
+                self._in_use -= 1
+            self._release(conn)
+
+    def stats(self):
+        """Pool utilisation counters."""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "open": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "peak_in_use": self._peak_in_use,
+                "utilisation": self._in_use / self.pool_size if self.pool_size else 0.0,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "avg_wait_ms": (self._wait_time / self._waits * 1000) if self._waits else 0.0,
+                "timeouts": self._timeouts,
+            }
 
-    def get_connection(self):
-        return self.conn
\ No newline at end of file
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
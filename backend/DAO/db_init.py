@@ -1,94 +1,367 @@
 import sqlite3
+from datetime import datetime
 from backend.utils.exceptions import DatabaseException
-class DBInitializer:
-    def __init__(self, conn):
-        self.conn = conn
+from backend.DAO.customer_dao import DEFAULT_RESERVATION_TTL
+
+def rebuild_sales_aggregates(conn):
+    """Recompute the sales summary tables from OrderHeader and Transactions."""
+    conn.execute("DELETE FROM ProductSales")
+    conn.execute("""
+        INSERT INTO ProductSales (product_id, units_sold, revenue, order_count)
+        SELECT product_id, SUM(no_of_items), SUM(total_amount), COUNT(DISTINCT order_header_id)
+        FROM Transactions
+        GROUP BY product_id
+    """)
+    conn.execute("DELETE FROM CustomerSales")
+    conn.execute("""
+        INSERT INTO CustomerSales (customer_id, units_bought, revenue, order_count, last_order_at)
+        SELECT customer_id, SUM(no_of_items), SUM(total_amount), COUNT(*), MAX(placed_at)
+        FROM OrderHeader
+        GROUP BY customer_id
+    """)
+    conn.execute("""
+        INSERT OR REPLACE INTO SalesTotals (id, units_sold, revenue, order_count)
+        SELECT 1, COALESCE(SUM(no_of_items), 0), COALESCE(SUM(total_amount), 0), COUNT(*)
+        FROM OrderHeader
+    """)
 
+# Ordered schema migrations: (version, description, steps). A step is either a
+# SQL string or a callable taking the connection. Applied versions are
+# recorded in schema_version, so existing databases only run what they lack.
+MIGRATIONS = [
+    (1, "Index hot-path lookups", [
+        'CREATE INDEX IF NOT EXISTS idx_product_name ON Product(name)',
+        'CREATE INDEX IF NOT EXISTS idx_order_customer_status_product ON "Order"(customer_id, status, product_id)',
+        'CREATE INDEX IF NOT EXISTS idx_login_id ON Login(id)',
+        'CREATE INDEX IF NOT EXISTS idx_transactions_customer ON Transactions(customer_id)',
+    ]),
+    (2, "Track a catalog version for cache invalidation", [
+        """CREATE TABLE IF NOT EXISTS CatalogVersion (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO CatalogVersion (id, version) VALUES (1, 0)",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_insert_version AFTER INSERT ON Product
+        BEGIN UPDATE CatalogVersion SET version = version + 1 WHERE id = 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_update_version AFTER UPDATE ON Product
+        BEGIN UPDATE CatalogVersion SET version = version + 1 WHERE id = 1; END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_delete_version AFTER DELETE ON Product
+        BEGIN UPDATE CatalogVersion SET version = version + 1 WHERE id = 1; END""",
+    ]),
+    (3, "Index keyset pagination over the in-stock catalog", [
+        "CREATE INDEX IF NOT EXISTS idx_product_catalog_name ON Product(name, product_id) WHERE quantity > 0",
+        "CREATE INDEX IF NOT EXISTS idx_product_catalog_price ON Product(price, product_id) WHERE quantity > 0",
+        "CREATE INDEX IF NOT EXISTS idx_product_catalog_company_name ON Product(company_name, name, product_id) WHERE quantity > 0",
+        "CREATE INDEX IF NOT EXISTS idx_product_catalog_company_price ON Product(company_name, price, product_id) WHERE quantity > 0",
+    ]),
+    # External-content FTS5 index keyed on Product's rowid. Product has no
+    # INTEGER PRIMARY KEY, so run DBInitializer.rebuild_search_index() after
+    # a VACUUM, which may renumber those rowids.
+    (4, "Full-text product search", [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS ProductSearch USING fts5(
+            name, description, company_name,
+            content='Product', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )""",
+        "INSERT INTO ProductSearch(ProductSearch, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_search_insert AFTER INSERT ON Product
+        BEGIN
+            INSERT INTO ProductSearch (rowid, name, description, company_name)
+            VALUES (new.rowid, new.name, new.description, new.company_name);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_search_delete AFTER DELETE ON Product
+        BEGIN
+            INSERT INTO ProductSearch (ProductSearch, rowid, name, description, company_name)
+            VALUES ('delete', old.rowid, old.name, old.description, old.company_name);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS trg_product_search_update AFTER UPDATE OF name, description, company_name ON Product
+        BEGIN
+            INSERT INTO ProductSearch (ProductSearch, rowid, name, description, company_name)
+            VALUES ('delete', old.rowid, old.name, old.description, old.company_name);
+            INSERT INTO ProductSearch (rowid, name, description, company_name)
+            VALUES (new.rowid, new.name, new.description, new.company_name);
+        END""",
+        "INSERT INTO ProductSearch(ProductSearch) VALUES ('rebuild')",
+    ]),
+    # Legacy checkouts wrote one Transactions row per cart line and nothing
+    # tying it to its "Order" row. Each becomes its own header, and the n-th
+    # transaction for a (customer, product) pair is linked to the n-th placed
+    # line for that pair, which is the order the old code inserted them in.
+    (5, "Order headers for set-based checkout", [
+        """CREATE TABLE IF NOT EXISTS OrderHeader (
+            order_header_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            total_amount REAL NOT NULL,
+            no_of_items INTEGER NOT NULL,
+            placed_at TEXT,
+            FOREIGN KEY(customer_id) REFERENCES Customer(customer_id)
+        )""",
+        'ALTER TABLE "Order" ADD COLUMN order_header_id INTEGER REFERENCES OrderHeader(order_header_id)',
+        'ALTER TABLE "Order" ADD COLUMN unit_price REAL',
+        "ALTER TABLE Transactions ADD COLUMN order_header_id INTEGER REFERENCES OrderHeader(order_header_id)",
+        """INSERT INTO OrderHeader (order_header_id, customer_id, total_amount, no_of_items)
+        SELECT transaction_id, customer_id, total_amount, no_of_items FROM Transactions""",
+        "UPDATE Transactions SET order_header_id = transaction_id",
+        """UPDATE "Order"
+        SET order_header_id = pairs.transaction_id,
+            unit_price = pairs.unit_price
+        FROM (
+            SELECT o.order_id, t.transaction_id, t.total_amount * 1.0 / t.no_of_items AS unit_price
+            FROM (
+                SELECT transaction_id, customer_id, product_id, total_amount, no_of_items,
+                    ROW_NUMBER() OVER (PARTITION BY customer_id, product_id ORDER BY transaction_id) AS rn
+                FROM Transactions
+            ) t
+            JOIN (
+                SELECT order_id, customer_id, product_id,
+                    ROW_NUMBER() OVER (PARTITION BY customer_id, product_id ORDER BY order_id) AS rn
+                FROM "Order"
+                WHERE status = 'PLACED'
+            ) o ON o.customer_id = t.customer_id AND o.product_id = t.product_id AND o.rn = t.rn
+        ) AS pairs
+        WHERE "Order".order_id = pairs.order_id""",
+        'CREATE INDEX IF NOT EXISTS idx_order_header ON "Order"(order_header_id)',
+        "CREATE INDEX IF NOT EXISTS idx_order_header_customer ON OrderHeader(customer_id, order_header_id)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_order_header ON Transactions(order_header_id)",
+    ]),
+    (6, "Persisted email outbox", [
+        """CREATE TABLE IF NOT EXISTS EmailOutbox (
+            email_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            recipient TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDING' CHECK(status IN ('PENDING','SENT','FAILED')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            sent_at TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_email_outbox_due ON EmailOutbox(status, next_attempt_at)",
+    ]),
+    # Customer and admin IDs share the Login.id space, so they draw from one
+    # 'user' sequence. It starts above the old random 10000-99999 range and
+    # the product sequence above every existing product number, so
+    # sequential IDs can never collide with rows that are already there.
+    (7, "Central ID sequences", [
+        """CREATE TABLE IF NOT EXISTS IdSequence (
+            name TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )""",
+        """INSERT OR IGNORE INTO IdSequence (name, next_value)
+        SELECT 'user', MAX(
+            99999,
+            COALESCE((SELECT MAX(customer_id) FROM Customer), 0),
+            COALESCE((SELECT MAX(admin_id) FROM Admin), 0),
+            COALESCE((SELECT MAX(id) FROM Login), 0)
+        ) + 1""",
+        """INSERT OR IGNORE INTO IdSequence (name, next_value)
+        SELECT 'product', COALESCE(MAX(CAST(REPLACE(product_id, '-', '') AS INTEGER)), 0) + 1
+        FROM Product""",
+    ]),
+    (8, "Indexes for ranked transaction reports", [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_amount ON Transactions(total_amount DESC, transaction_id DESC)",
+        """CREATE INDEX IF NOT EXISTS idx_transactions_customer_amount
+        ON Transactions(customer_id, total_amount DESC, transaction_id DESC)""",
+    ]),
+    # Summary tables kept current by CustomerDAO.place_order in the same
+    # transaction as the order; rebuild_sales_aggregates recomputes them.
+    (9, "Sales aggregate tables", [
+        """CREATE TABLE IF NOT EXISTS ProductSales (
+            product_id TEXT PRIMARY KEY,
+            units_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS CustomerSales (
+            customer_id INTEGER PRIMARY KEY,
+            units_bought INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            last_order_at TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS SalesTotals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            units_sold INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            order_count INTEGER NOT NULL DEFAULT 0
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_product_sales_revenue ON ProductSales(revenue DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_sales_revenue ON CustomerSales(revenue DESC)",
+        rebuild_sales_aggregates,
+    ]),
+    # reserved_until is epoch seconds. Carts that predate it get one default
+    # TTL of grace instead of being swept the moment the upgrade lands.
+    (10, "Expire abandoned cart reservations", [
+        'ALTER TABLE "Order" ADD COLUMN reserved_until REAL',
+        f"""UPDATE "Order" SET reserved_until = CAST(strftime('%s', 'now') AS REAL) + {DEFAULT_RESERVATION_TTL}
+        WHERE status = 'IN_CART'""",
+        """CREATE INDEX IF NOT EXISTS idx_order_reservation_expiry
+        ON "Order"(reserved_until) WHERE status = 'IN_CART'""",
+    ]),
+    # JSON written by AdminService.generate_product_images: the image_path it
+    # was built from plus the published URL of each variant.
+    (11, "Product image variants", [
+        "ALTER TABLE Product ADD COLUMN image_variants TEXT",
+    ]),
+    # PresenceRegistry.refresh() reads only the logged-in rows, in login order.
+    (12, "Index logged-in accounts", [
+        """CREATE INDEX IF NOT EXISTS idx_login_online
+        ON Login(last_login, id, userType) WHERE is_now_logged_in = 'Y'""",
+    ]),
+]
+class DBInitializer:
+    def __init__(self, db):
+        self.db = db
     def create_tables(self):
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS UnverifiedUsers (
-                email TEXT PRIMARY KEY,
-                name TEXT,
-                password TEXT,
-                address TEXT,
-                contact TEXT,
-                otp_code TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )''')
-            cursor.execute('''CREATE TABLE IF NOT EXISTS Customer (
-                customer_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                email TEXT NOT NULL UNIQUE,
-                password TEXT,
-                address TEXT,
-                contact_number TEXT,
-                is_active INTEGER DEFAULT 1
-            )''')
-            # Login table
-            cursor.execute('''CREATE TABLE IF NOT EXISTS Login (
-                id INTEGER NOT NULL,
-                last_login TEXT,
-                last_logout TEXT,
-                updated_password TEXT,
-                old_password TEXT,
-                is_now_logged_in TEXT NOT NULL CHECK(is_now_logged_in IN ('Y','N')),
-                userType TEXT NOT NULL CHECK(userType IN ('Customer','Admin')),
-                status TEXT NOT NULL CHECK(status IN ('Active','Inactive'))
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute('''CREATE TABLE IF NOT EXISTS UnverifiedUsers (
+                    email TEXT PRIMARY KEY,
+                    name TEXT,
+                    password TEXT,
+                    address TEXT,
+                    contact TEXT,
+                    otp_code TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
                 )''')
-            # Product table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Product (
-                product_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                description TEXT,
-                company_name TEXT,
-                price REAL NOT NULL,
-                quantity INTEGER NOT NULL,
-                reserved INTEGER DEFAULT 0,
-                customer_id INTEGER,
-                image_path TEXT,
-                FOREIGN KEY(customer_id) REFERENCES Customer(customer_id)
-            )""")
-            # Order table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS "Order" (
-                    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    customer_id INTEGER NOT NULL,
-                    product_id TEXT NOT NULL,
+                cursor.execute('''CREATE TABLE IF NOT EXISTS Customer (
+                    customer_id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    email TEXT NOT NULL UNIQUE,
+                    password TEXT,
+                    address TEXT,
+                    contact_number TEXT,
+                    is_active INTEGER DEFAULT 1
+                )''')
+                # Login table
+                cursor.execute('''CREATE TABLE IF NOT EXISTS Login (
+                    id INTEGER NOT NULL,
+                    last_login TEXT,
+                    last_logout TEXT,
+                    updated_password TEXT,
+                    old_password TEXT,
+                    is_now_logged_in TEXT NOT NULL CHECK(is_now_logged_in IN ('Y','N')),
+                    userType TEXT NOT NULL CHECK(userType IN ('Customer','Admin')),
+                    status TEXT NOT NULL CHECK(status IN ('Active','Inactive'))
+                    )''')
+                # Product table
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS Product (
+                    product_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    description TEXT,
+                    company_name TEXT,
+                    price REAL NOT NULL,
                     quantity INTEGER NOT NULL,
-                    status TEXT DEFAULT 'IN_CART',
+                    reserved INTEGER DEFAULT 0,
+                    customer_id INTEGER,
+                    image_path TEXT,
+                    FOREIGN KEY(customer_id) REFERENCES Customer(customer_id)
+                )""")
+                # Order table
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS "Order" (
+                        order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        customer_id INTEGER NOT NULL,
+                        product_id TEXT NOT NULL,
+                        quantity INTEGER NOT NULL,
+                        status TEXT DEFAULT 'IN_CART',
+                        FOREIGN KEY(customer_id) REFERENCES Customer(customer_id),
+                        FOREIGN KEY(product_id) REFERENCES Product(product_id)
+                    )
+                """)
+                # Transaction Table
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS Transactions (
+                    transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    customer_id INTEGER NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    total_amount REAL NOT NULL,
+                    no_of_items INTEGER NOT NULL,
                     FOREIGN KEY(customer_id) REFERENCES Customer(customer_id),
                     FOREIGN KEY(product_id) REFERENCES Product(product_id)
                 )
-            """)
-            # Transaction Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Transactions (
-                transaction_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                customer_id INTEGER NOT NULL,
-                product_id INTEGER NOT NULL,
-                total_amount REAL NOT NULL,
-                no_of_items INTEGER NOT NULL,
-                FOREIGN KEY(customer_id) REFERENCES Customer(customer_id),
-                FOREIGN KEY(product_id) REFERENCES Product(product_id)
-            )
-            """)
-            # Admin table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Admin (
-                admin_id INTEGER PRIMARY KEY,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                customer_id INTEGER,
-                product_id INTEGER,
-                transaction_id INTEGER,
-                FOREIGN KEY(customer_id) REFERENCES Customer(customer_id),
-                FOREIGN KEY(product_id) REFERENCES Product(product_id),
-                FOREIGN KEY(transaction_id) REFERENCES Transactions(transaction_id)
-            )
-            """)
+                """)
+                # Admin table
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS Admin (
+                    admin_id INTEGER PRIMARY KEY,
+                    email TEXT UNIQUE NOT NULL,
+                    password TEXT NOT NULL,
+                    customer_id INTEGER,
+                    product_id INTEGER,
+                    transaction_id INTEGER,
+                    FOREIGN KEY(customer_id) REFERENCES Customer(customer_id),
+                    FOREIGN KEY(product_id) REFERENCES Product(product_id),
+                    FOREIGN KEY(transaction_id) REFERENCES Transactions(transaction_id)
+                )
+                """)
 
-            self.conn.commit()
-        except sqlite3.Error as e:
-            raise DatabaseException("Table creation failed: " + str(e))
\ No newline at end of file
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Table creation failed: " + str(e))
+        self.migrate()
+    def get_schema_version(self):
+        with self.db.connection() as conn:
+            try:
+                row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+                return row[0] or 0
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to read schema version: " + str(e))
+    def migrate(self):
+        """Apply pending migrations in order, one transaction per version."""
+        with self.db.connection() as conn:
+            try:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TEXT NOT NULL
+                    )
+                """)
+                conn.commit()
+                current = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()[0] or 0
+                for version, description, steps in MIGRATIONS:
+                    if version <= current:
+                        continue
+                    # BEGIN IMMEDIATE serialises concurrent starters; the
+                    # version is re-checked once the write lock is held.
+                    conn.execute("BEGIN IMMEDIATE")
+                    applied = conn.execute(
+                        "SELECT 1 FROM schema_version WHERE version = ?", (version,)
+                    ).fetchone()
+                    if applied:
+                        conn.rollback()
+                        continue
+                    for step in steps:
+                        if callable(step):
+                            step(conn)
+                        else:
+                            conn.execute(step)
+                    conn.execute(
+                        "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                        (version, description, datetime.now().isoformat())
+                    )
+                    conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Schema migration failed: " + str(e))
+    def rebuild_sales_aggregates(self):
+        with self.db.connection() as conn:
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                rebuild_sales_aggregates(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Sales aggregate rebuild failed: " + str(e))
+    def rebuild_search_index(self):
+        with self.db.connection() as conn:
+            try:
+                conn.execute("INSERT INTO ProductSearch(ProductSearch) VALUES ('rebuild')")
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Search index rebuild failed: " + str(e))
@@ -0,0 +1,84 @@
+import sqlite3
+import time
+from datetime import datetime
+from backend.utils.exceptions import DatabaseException
+class EmailOutboxDAO:
+    def __init__(self, db):
+        self.db = db
+    def enqueue(self, recipient, subject, body):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO EmailOutbox (recipient, subject, body, next_attempt_at)
+                    VALUES (?, ?, ?, ?)
+                """, (recipient, subject, body, time.time()))
+                conn.commit()
+                email_id = cursor.lastrowid
+                cursor.close()
+                return email_id
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to queue email: " + str(e))
+    def claim_due(self, limit, lease_seconds):
+        """
+        Lease up to ``limit`` due messages. Their next attempt is pushed past
+        the lease, so a second sender skips them and a crashed sender's
+        messages come back on their own.
+        """
+        now = time.time()
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("""
+                    SELECT email_id, recipient, subject, body, attempts
+                    FROM EmailOutbox
+                    WHERE status = 'PENDING' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                """, (now, limit))
+                rows = cursor.fetchall()
+                if rows:
+                    cursor.executemany(
+                        "UPDATE EmailOutbox SET next_attempt_at = ? WHERE email_id = ?",
+                        [(now + lease_seconds, row[0]) for row in rows]
+                    )
+                conn.commit()
+                cursor.close()
+                return rows
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to claim queued emails: " + str(e))
+    def mark_sent(self, email_ids):
+        with self.db.connection() as conn:
+            try:
+                now = datetime.now().isoformat()
+                conn.executemany(
+                    "UPDATE EmailOutbox SET status = 'SENT', sent_at = ?, attempts = attempts + 1 WHERE email_id = ?",
+                    [(now, email_id) for email_id in email_ids]
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to mark emails as sent: " + str(e))
+    def mark_failed(self, failures):
+        """``failures`` holds (email_id, error, next_attempt_at or None to give up)."""
+        with self.db.connection() as conn:
+            try:
+                conn.executemany("""
+                    UPDATE EmailOutbox
+                    SET attempts = attempts + 1,
+                        last_error = ?,
+                        status = CASE WHEN ? IS NULL THEN 'FAILED' ELSE 'PENDING' END,
+                        next_attempt_at = COALESCE(?, next_attempt_at)
+                    WHERE email_id = ?
+                """, [(error, retry_at, retry_at, email_id) for email_id, error, retry_at in failures])
+                conn.commit()
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to record email failures: " + str(e))
+    def count_by_status(self):
+        with self.db.connection() as conn:
+            try:
+                rows = conn.execute("SELECT status, COUNT(*) FROM EmailOutbox GROUP BY status").fetchall()
+                return dict(rows)
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to count queued emails: " + str(e))
@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+from backend.utils.exceptions import DatabaseException
+class IdAllocator:
+    """
+    Hands out IDs from a named row of the IdSequence table.
+
+    A process reserves a whole block of values with one UPDATE and then
+    serves IDs from memory, so there is no retry loop and no existence check
+    per ID. Values from a block that is never used are simply skipped.
+
+    Block reservations use a dedicated connection, so call next_id/next_ids
+    before opening a write transaction on the pool, not in the middle of one.
+    """
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, db_name, sequence, block_size=100, timeout=30.0):
+        self.db_name = db_name
+        self.sequence = sequence
+        self.block_size = block_size
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._conn = None
+        self._next = 0
+        self._limit = 0
+
+    @classmethod
+    def for_sequence(cls, db, sequence, block_size=100):
+        """Process-wide allocator for ``sequence``, shared by every DAO on the same database file."""
+        key = (os.path.abspath(db.db_name), sequence)
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(db.db_name, sequence, block_size, db.timeout)
+            return cls._registry[key]
+
+    def _reserve(self, count):
+        size = max(self.block_size, count)
+        try:
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False)
+            cursor = self._conn.cursor()
+            cursor.execute(
+                "UPDATE IdSequence SET next_value = next_value + ? WHERE name = ?",
+                (size, self.sequence)
+            )
+            if cursor.rowcount != 1:
+                raise DatabaseException(f"Unknown ID sequence '{self.sequence}'.")
+            end = cursor.execute(
+                "SELECT next_value FROM IdSequence WHERE name = ?", (self.sequence,)
+            ).fetchone()[0]
+            self._conn.commit()
+            cursor.close()
+        except sqlite3.Error as e:
+            self._conn.rollback()
+            raise DatabaseException("Failed to reserve ID block: " + str(e))
+        except DatabaseException:
+            self._conn.rollback()
+            raise
+        self._next = end - size
+        self._limit = end
+
+    def next_id(self):
+        return self.next_ids(1)[0]
+
+    def next_ids(self, count):
+        with self._lock:
+            if self._limit - self._next < count:
+                self._reserve(count)
+            start = self._next
+            self._next += count
+            return list(range(start, start + count))
+
+MAX_PRODUCT_ID = 9_999_999_999
+
+
+def format_product_id(value):
+    """Render a product sequence value in the d-dddd-dddd-d style product IDs use."""
+    if not 0 <= value <= MAX_PRODUCT_ID:
+        # Wider IDs would silently break the format every client expects.
+        raise DatabaseException(f"Product ID sequence exhausted: {value} does not fit the d-dddd-dddd-d format.")
+    digits = f"{value:010d}"
+    return f"{digits[0]}-{digits[1:5]}-{digits[5:9]}-{digits[9:]}"
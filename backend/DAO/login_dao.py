@@ -0,0 +1,83 @@
+import sqlite3
+from backend.utils.exceptions import DatabaseException
+class LoginDAO:
+    def __init__(self, db):
+        self.db = db
+    def get_logged_in(self):
+        """(id, userType, last_login) of every account Login marks as logged in, oldest login first."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT id, userType, last_login FROM Login
+                    WHERE is_now_logged_in = 'Y'
+                    ORDER BY last_login, id
+                """)
+                rows = cursor.fetchall()
+                cursor.close()
+                return rows
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to load logged-in accounts: " + str(e))
+    def is_logged_in(self, login_id):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT is_now_logged_in FROM Login WHERE id = ?", (login_id,))
+                row = cursor.fetchone()
+                cursor.close()
+                return bool(row) and row[0] == 'Y'
+            except sqlite3.Error as e:
+                raise DatabaseException("Failed to read login state: " + str(e))
+    def logout_if_logged_in(self, login_id, last_logout):
+        """Mark ``login_id`` logged out if Login has it logged in. Returns whether it did."""
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE Login SET is_now_logged_in = 'N', last_logout = ?
+                    WHERE id = ? AND is_now_logged_in = 'Y'
+                """, (last_logout, login_id))
+                changed = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                return changed > 0
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to write login state: " + str(e))
+    def logout_all(self, user_type, last_logout):
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE Login SET is_now_logged_in = 'N', last_logout = ?
+                    WHERE userType = ? AND is_now_logged_in = 'Y'
+                """, (last_logout, user_type))
+                changed = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                return changed
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to write login state: " + str(e))
+    def apply_presence_changes(self, changes):
+        """
+        Write a batch of presence changes, each (id, is_now_logged_in,
+        last_login or None, last_logout or None), with one executemany.
+        None keeps the stored timestamp.
+        """
+        with self.db.connection() as conn:
+            try:
+                cursor = conn.cursor()
+                cursor.executemany("""
+                    UPDATE Login
+                    SET is_now_logged_in = ?,
+                        last_login = COALESCE(?, last_login),
+                        last_logout = COALESCE(?, last_logout)
+                    WHERE id = ?
+                """, [(state, last_login, last_logout, login_id)
+                      for login_id, state, last_login, last_logout in changes])
+                conn.commit()
+                cursor.close()
+            except sqlite3.Error as e:
+                conn.rollback()
+                raise DatabaseException("Failed to write login state: " + str(e))
@@ -2,27 +2,33 @@ from backend.utils.exceptions import DatabaseException,DuplicateEmailException,S
 from backend.DAO.admin_dao import AdminDAO
 from backend.DAO.db_connection import DBConnection
 from backend.DAO.db_init import DBInitializer
-from entities import product
+from backend.DAO.id_allocator import IdAllocator
+from backend.service.presence import PresenceRegistry
+from backend.service.password_pool import password_pool
 from entities.admin import Admin
 from entities.product import Product
-import random
+from backend.utils.images import build_variants, resolve_source
+import json
 import re
 import os
 class AdminService:
     def __init__(self):
-        conn = DBConnection().get_connection()
-        DBInitializer(conn).create_tables()
-        self.dao = AdminDAO(conn)
+        self.db = DBConnection()
+        DBInitializer(self.db).create_tables()
+        self.dao = AdminDAO(self.db)
+        self.user_ids = IdAllocator.for_sequence(self.db, "user")
+        self.presence = PresenceRegistry.for_database(self.db)
+        self.passwords = password_pool
         self.current_admin_id = None
     def generate_admin_id(self):
-        while True:
-            admin_id = random.randint(10000, 99999)  
-            if not self.dao.is_admin_id_exists(admin_id): 
-                return admin_id
+        return self.user_ids.next_id()
     def validate_email(self, email, errors):
         if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
             errors.append("Invalid email format")
     def validate_password(self, password, errors):
+        if not isinstance(password, str):
+            errors.append("Password must be a string.")
+            return
         if len(password) < 6 or len(password) > 12:
             errors.append("Password must be between 6 and 12 characters long.")
         if not re.search(r"[A-Z]", password):
@@ -42,35 +48,50 @@ class AdminService:
             if errors:
                 raise ServiceException("\n".join(errors))
             admin_id=self.generate_admin_id()
-            admin = Admin(admin_id,email,password)
+            admin = Admin(admin_id,email,self.passwords.hash(password))
             self.dao.register_admin(admin)
             print("Admin registered successfully! Your ID:",admin_id)
         except (DuplicateEmailException, DatabaseException, ServiceException) as e:
             raise ServiceException(str(e))
     def login_admin(self, email, password):
         try:
-            admin_id = self.dao.login_admin(email, password)
+            if not isinstance(password, str):
+                raise ServiceException("Invalid email or password.")
+            admin_id, stored_password = self.dao.get_admin_credentials(email)
+            matches, new_hash = self.passwords.verify(password, stored_password)
+            if not matches:
+                raise ServiceException("Invalid email or password.")
+            if new_hash:
+                try:
+                    self.dao.upgrade_admin_password(admin_id, stored_password, new_hash)
+                except DatabaseException as e:
+                    print("Password upgrade failed for admin", admin_id, ":", e)
+            self.presence.login(admin_id, "Admin")
             self.current_admin_id = admin_id
+            return admin_id
         except (DatabaseException, ServiceException) as e:
             raise ServiceException(str(e))
-    def logout_admin(self):
-        if not self.current_admin_id:
+    def logout_admin(self, admin_id=None):
+        admin_id = admin_id or self.current_admin_id
+        if not admin_id:
             raise ServiceException("No admin is logged in.")
-        try:
-            self.dao.logout_admin(self.current_admin_id)
+        if admin_id == self.current_admin_id:
             self.current_admin_id = None
-        except DatabaseException as e:
-            raise ServiceException(str(e))
+        if not self.presence.logout(admin_id):
+            raise ServiceException("Admin is not logged in.")
     def force_logout_all_admins(self):
         try:
-            self.dao.force_logout_all_admins()
+            self.presence.logout_all("Admin")
             self.current_admin_id = None
             return "All admins have been forcefully logged out."
         except Exception as e:
             raise ServiceException(str(e))
     def get_first_half_logged_in(self):
         try:
-            return self.dao.get_first_half_logged_in_customers()
+            logged_in = self.presence.online_ids("Customer")
+            if len(logged_in) <= 1:
+                return logged_in
+            return logged_in[:len(logged_in) // 2]
         except DatabaseException as e:
             raise ServiceException(str(e))
 
@@ -94,8 +115,7 @@ class AdminService:
         except Exception as e:
             raise ServiceException("Error in fetching customer by email: " + str(e))
     def generate_product_id(self):
-        digits = [str(random.randint(0, 9)) for _ in range(10)]
-        return f"{digits[0]}-{''.join(digits[1:5])}-{''.join(digits[5:9])}-{digits[9]}"
+        return self.dao.generate_product_id()
     def add_product(self, name, description, price, quantity, company_name=None):
         try:
             product = Product(
@@ -127,13 +147,60 @@ class AdminService:
         try:
             if not os.path.exists(csv_file):
                 raise ServiceException(f"CSV file '{csv_file}' not found.")
-            self.dao.bulk_upload_products(csv_file)
-            return f"Bulk upload completed successfully from {csv_file}."
+            summary = self.dao.bulk_upload_products(csv_file)
+            message = (f"Bulk upload from {csv_file}: {summary['inserted']} inserted, "
+                       f"{summary['updated']} updated, {summary['failed']} rejected.")
+            if summary["error_report"]:
+                message += f" See {summary['error_report']} for rejected rows."
+            try:
+                images = self.generate_product_images()
+                message += f" Image variants refreshed for {images['products']} products."
+            except ServiceException as e:
+                message += f" Image variants were not refreshed: {e}"
+            return message
 
         except DatabaseException as e:
             raise ServiceException(str(e))
         except Exception as e:
             raise ServiceException("Unexpected error in bulk upload: " + str(e))
+    def generate_product_images(self, force=False, batch_size=500):
+        """
+        Publish the resized and WebP variants of every product image that
+        has none yet or whose image_path changed (every product with
+        ``force``). Products sharing a source file reuse one build.
+        """
+        summary = {"products": 0, "built": 0, "missing": 0, "failed": 0}
+        built = {}
+        after = ""
+        try:
+            while True:
+                rows = self.dao.get_products_for_images(after, batch_size, force)
+                if not rows:
+                    return summary
+                updates = []
+                for product_id, image_path in rows:
+                    source = resolve_source(image_path)
+                    if source is None:
+                        # Recorded with no variants so it is not retried until the path changes.
+                        summary["missing"] += 1
+                        variants = {}
+                    elif source in built:
+                        variants = built[source]
+                    else:
+                        try:
+                            variants = built[source] = build_variants(source)
+                            summary["built"] += 1
+                        except Exception as e:
+                            print(f"Image variants failed for {product_id} ({source}): {e}")
+                            summary["failed"] += 1
+                            continue
+                    updates.append((json.dumps({"source": image_path, "variants": variants}), product_id))
+                if updates:
+                    self.dao.set_product_image_variants(updates)
+                summary["products"] += len(updates)
+                after = rows[-1][0]
+        except DatabaseException as e:
+            raise ServiceException(str(e))
     def display_all_products(self):
         try:
             products = self.dao.display_all_products()
@@ -156,16 +223,53 @@ class AdminService:
         except DatabaseException as e:
             raise ServiceException(str(e))
 
+    def view_top_transactions(self, limit=10, offset=0):
+        try:
+            if limit < 1 or offset < 0:
+                raise ServiceException("Limit must be positive and offset cannot be negative.")
+            return self.dao.get_top_transactions(limit, offset)
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+    def view_nth_highest_transaction(self, n):
+        try:
+            if n < 1:
+                raise ServiceException("Rank must be at least 1.")
+            transaction = self.dao.get_nth_highest_transaction(n)
+            if not transaction:
+                return f"Not enough transactions to find rank {n}."
+            return transaction
+        except DatabaseException as e:
+            raise ServiceException(str(e))
     def view_second_highest_transaction(self):
         try:
-            transactions = self.dao.get_all_transactions()
-            if len(transactions) < 2:
+            transaction = self.dao.get_nth_highest_transaction(2)
+            if not transaction:
                 return "Not enough transactions to find second highest."
-            return transactions[1]  
+            return transaction
         except DatabaseException as e:
             raise ServiceException(str(e))
         except Exception as e:
             raise ServiceException("Unexpected error while fetching second highest transaction: " + str(e))
+    def view_top_transactions_per_customer(self, per_customer=3, customer_id=None):
+        try:
+            if per_customer < 1:
+                raise ServiceException("Transactions per customer must be at least 1.")
+            return self.dao.get_top_transactions_per_customer(per_customer, customer_id)
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+    def get_sales_dashboard(self, top=5):
+        try:
+            if top < 1 or top > 100:
+                raise ServiceException("Top must be between 1 and 100.")
+            return self.dao.get_sales_dashboard(top)
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+    def rebuild_sales_aggregates(self):
+        try:
+            DBInitializer(self.db).rebuild_sales_aggregates()
+            return "Sales aggregates rebuilt from the transaction log."
+        except DatabaseException as e:
+            raise ServiceException(str(e))
     def get_successful_orders_with_transactions(self):
         try:
             rows = self.dao.get_successful_orders_with_transactions()
@@ -1,40 +1,74 @@
 from backend.utils.exceptions import DatabaseException,DuplicateEmailException,ServiceException
 import re
 import random
+import base64
+import json
 from entities.customer import Customer
-from backend.DAO.customer_dao import CustomerDAO
+from backend.DAO.customer_dao import CustomerDAO, DEFAULT_RESERVATION_TTL
+from backend.DAO.email_outbox_dao import EmailOutboxDAO
 from backend.DAO.db_connection import DBConnection
 from backend.DAO.db_init import DBInitializer
+from backend.DAO.id_allocator import IdAllocator
+from backend.utils.catalog_cache import catalog_cache
 from entities.unverified_user import UnverifiedUser
-from flask_mail import Mail, Message
-from flask import current_app as app
+from backend.service.email_outbox import EmailOutboxWorker
+from backend.service.reservation_sweeper import ReservationSweeper
+from backend.service.presence import PresenceRegistry
+from backend.service.password_pool import password_pool
+from flask_mail import Mail
 class CustomerService:
-    def __init__(self,mail:Mail):
-        conn = DBConnection().get_connection()
-        DBInitializer(conn).create_tables()
-        self.dao = CustomerDAO(conn)
+    def __init__(self,mail:Mail, reservation_ttl=DEFAULT_RESERVATION_TTL):
+        self.db = DBConnection()
+        DBInitializer(self.db).create_tables()
+        self.dao = CustomerDAO(self.db, reservation_ttl=reservation_ttl)
+        self.outbox_dao = EmailOutboxDAO(self.db)
+        self.user_ids = IdAllocator.for_sequence(self.db, "user")
+        self.presence = PresenceRegistry.for_database(self.db)
+        self.passwords = password_pool
         self.current_customer_id = None
         self.mail = mail
+        self.email_worker = None
+        self.reservation_sweeper = None
+    def start_email_worker(self, app, **options):
+        self.email_worker = EmailOutboxWorker(app, self.mail, self.outbox_dao, **options)
+        self.email_worker.start()
+        return self.email_worker
+    def start_reservation_sweeper(self, **options):
+        self.reservation_sweeper = ReservationSweeper(self.dao, **options)
+        self.reservation_sweeper.start()
+        return self.reservation_sweeper
+    def get_reservation_stats(self):
+        if not self.reservation_sweeper:
+            return {"running": False, "reservation_ttl": self.dao.reservation_ttl}
+        return {"running": True, "reservation_ttl": self.dao.reservation_ttl, **self.reservation_sweeper.stats()}
     def send_verification_email(self, data):
         try:
+            errors = []
+            self.validate_email(data['email'], errors)
+            if not isinstance(data['password'], str):
+                errors.append("Password must be a string.")
+            if errors:
+                raise ServiceException("\n".join(errors))
             otp = str(random.randint(100000, 999999))
 
             user = UnverifiedUser(
                 email=data['email'],
                 name=data['name'],
-                password=data['password'],
+                password=self.passwords.hash(data['password']),
                 address=data['address'],
                 contact=data['contact'],
                 otp_code=otp
             )
             self.dao.insert_or_update(user)
 
-            # Send email
-            msg = Message("Verify your email",
-                        sender= app.config['MAIL_USERNAME'],
-                        recipients=[data['email']])
-            msg.body = f"Hello {data['name']},\n\nYour verification code is: {otp}\n\nThanks!"
-            self.mail.send(msg)
+            # Queue the email; the outbox worker delivers it off the request thread.
+            self.outbox_dao.enqueue(
+                data['email'],
+                "Verify your email",
+                f"Hello {data['name']},\n\nYour verification code is: {otp}\n\nThanks!"
+            )
+            if self.email_worker:
+                self.email_worker.notify()
 
             return {"message": "Verification code sent to your email."}
         except Exception as e:
@@ -66,14 +100,15 @@ class CustomerService:
         except Exception as e:
             raise ServiceException("Verification failed: " + str(e))
     def generate_customer_id(self):
-        while True:
-            new_id = random.randint(10000, 99999)
-            if not self.dao.is_customer_id_exists(new_id):
-                return new_id
+        return self.user_ids.next_id()
     def validate_email(self, email, errors):
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        # No whitespace anywhere: a CR/LF would end up in the mail headers.
+        if not isinstance(email, str) or not re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", email):
             errors.append("Invalid email format")
     def validate_password(self, password, errors):
+        if not isinstance(password, str):
+            errors.append("Password must be a string.")
+            return
         if len(password) < 8:
             errors.append("Password must be at least 8 characters long.")
         if not re.search(r"[A-Z]", password):
@@ -109,7 +144,7 @@ class CustomerService:
             if errors:
                 raise ServiceException("\n".join(errors))
             customer_id = self.generate_customer_id()
-            customer = Customer(customer_id, name, email, password, address, contact_number)
+            customer = Customer(customer_id, name, email, self.passwords.hash(password), address, contact_number)
             self.dao.insert_customer(customer)
             print("Customer registered successfully! Your ID:",customer_id)
             return customer_id
@@ -117,17 +152,34 @@ class CustomerService:
             raise ServiceException(str(e))
     def login(self, email, password):
         try:
-            customer_id, name = self.dao.login_customer(email, password)
+            if not isinstance(password, str):
+                raise ServiceException("Invalid email or password.")
+            customer_id, name, stored_password, status = self.dao.get_customer_credentials(email)
+            matches, new_hash = self.passwords.verify(password, stored_password)
+            if not matches:
+                raise ServiceException("Invalid email or password.")
+            if status is None:
+                raise ServiceException("Login record missing for customer.")
+            if status != "Active":
+                raise ServiceException("Account is inactive. Please restore your account before logging in.")
+            if new_hash:
+                self._upgrade_password(customer_id, stored_password, new_hash)
+            if not self.presence.login_if_offline(customer_id, "Customer"):
+                raise ServiceException("This customer is already logged in.")
             return customer_id, name
         except DatabaseException as e:
             raise ServiceException(str(e))
+    def _upgrade_password(self, customer_id, stored_password, new_hash):
+        # Best effort: the login already succeeded, a later one can retry.
+        try:
+            self.dao.upgrade_customer_password(customer_id, stored_password, new_hash)
+        except DatabaseException as e:
+            print("Password upgrade failed for customer", customer_id, ":", e)
     def logout(self, customer_id):
         if not customer_id:
             raise ServiceException("No customer is logged in.")
-        try:
-            self.dao.logout_customer(customer_id)
-        except DatabaseException as e:
-            raise ServiceException(str(e))
+        if not self.presence.logout(customer_id):
+            raise ServiceException("Customer is not logged in.")
     def email_exists(self, email: str) -> bool:
         """
         Service wrapper to check if an email exists.
@@ -139,12 +191,14 @@ class CustomerService:
     def login_with_google(self, email, name, google_id, picture_url=None):
         try:
             customer_id = self.generate_customer_id()
-            return self.dao.login_with_google(customer_id,email, name, google_id, picture_url)
+            customer_id = self.dao.login_with_google(customer_id,email, name, google_id, picture_url)
+            self.presence.login(customer_id, "Customer")
+            return customer_id
         except DatabaseException as e:
             raise ServiceException(str(e))
     def force_logout_everywhere(self, email: str):
         try:
-            self.dao.force_logout_everywhere(email)
+            self.presence.logout(self.dao.get_customer_id_by_email(email))
         except DatabaseException as e:
             raise ServiceException(str(e))
     def get_customer_details(self, customer_id):
@@ -170,7 +224,13 @@ class CustomerService:
             return {"message": f"Unexpected error occurred: {e}", "data": []}
     def get_product_catalog(self):
         try:
-            products = self.dao.view_product_catalog()
+            # Read the version first: if a write lands in between, the payload
+            # is filed under the older version and the next read refreshes it.
+            version = self.dao.get_catalog_version()
+            products = catalog_cache.get(version)
+            if products is None:
+                products = [product.to_dict() for product in self.dao.view_product_catalog()]
+                catalog_cache.put(version, products)
             if not products:
                 return {"message": "No products available at the moment.", "data": []}
             return {"message": "Product catalog fetched successfully.", "data": products}
@@ -178,6 +238,76 @@ class CustomerService:
             return {"message": f"Failed to fetch product catalog: {e}", "data": []}
         except ServiceException as e:
             return {"message": f"Unexpected error occurred: {e}", "data": []}
+    def get_product_catalog_json(self):
+        """The in-stock catalog as pre-serialised product fragments, for the JSON API."""
+        try:
+            version = self.dao.get_catalog_version()
+            fragments = catalog_cache.get_fragments(version)
+            if fragments is None:
+                products = self.dao.view_product_catalog()
+                fragments = [product.to_json() for product in products]
+                catalog_cache.put(version, [product.to_dict() for product in products], fragments)
+            return fragments
+        except DatabaseException as e:
+            raise ServiceException(f"Failed to fetch product catalog: {e}")
+    def encode_catalog_cursor(self, sort, order, product):
+        token = json.dumps([sort, order, product[sort], product["product_id"]])
+        return base64.urlsafe_b64encode(token.encode()).decode()
+    def decode_catalog_cursor(self, cursor, sort, order):
+        try:
+            cursor_sort, cursor_order, value, product_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ServiceException("Invalid catalog cursor.")
+        if (cursor_sort, cursor_order) != (sort, order):
+            raise ServiceException("Cursor does not match the requested sort order.")
+        return value, product_id
+    def get_product_catalog_page(self, limit=20, cursor=None, sort="name", order="asc",
+                                 company_name=None, min_price=None, max_price=None):
+        if sort not in ("name", "price"):
+            raise ServiceException("sort must be 'name' or 'price'.")
+        if order not in ("asc", "desc"):
+            raise ServiceException("order must be 'asc' or 'desc'.")
+        if not 1 <= limit <= 100:
+            raise ServiceException("limit must be between 1 and 100.")
+        after = self.decode_catalog_cursor(cursor, sort, order) if cursor else None
+        try:
+            # Fetch one extra row to learn whether another page exists.
+            products = self.dao.view_product_catalog_page(
+                limit + 1,
+                sort=sort,
+                descending=order == "desc",
+                after=after,
+                company_name=company_name,
+                min_price=min_price,
+                max_price=max_price
+            )
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+        items = [product.to_json() for product in products[:limit]]
+        next_cursor = None
+        if len(products) > limit:
+            next_cursor = self.encode_catalog_cursor(sort, order, products[limit - 1].to_dict())
+        return {"items": items, "next_cursor": next_cursor, "limit": limit}
+    def search_products(self, query, limit=20):
+        if not query or not query.strip():
+            raise ServiceException("Search query is required.")
+        if not 1 <= limit <= 100:
+            raise ServiceException("limit must be between 1 and 100.")
+        try:
+            return [product.to_json() for product in self.dao.search_products(query, limit)]
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+    def autocomplete_products(self, prefix, limit=10):
+        if not prefix or not prefix.strip():
+            return []
+        if not 1 <= limit <= 20:
+            raise ServiceException("limit must be between 1 and 20.")
+        try:
+            return self.dao.autocomplete_product_names(prefix, limit)
+        except DatabaseException as e:
+            raise ServiceException(str(e))
+    def get_catalog_cache_stats(self):
+        return catalog_cache.stats()
     def add_to_cart(self, customer_id, product_name, quantity):
         try:
             message = self.dao.add_product_to_cart(customer_id, product_name, quantity)
@@ -200,6 +330,26 @@ class CustomerService:
             return {"status": "success", "message": message}
         except DatabaseException as e:
             raise ServiceException(str(e))
+    def apply_cart_batch(self, customer_id, operations, max_operations=100):
+        if not isinstance(operations, list) or not operations:
+            return {"status": "error", "message": "operations must be a non-empty list."}
+        if len(operations) > max_operations:
+            return {"status": "error", "message": f"A batch may contain at most {max_operations} operations."}
+        if not all(isinstance(op, dict) for op in operations):
+            return {"status": "error", "message": "Each operation must be an object."}
+        if not all(isinstance(op.get("product_name"), str) and op.get("product_name") for op in operations):
+            return {"status": "error", "message": "Each operation needs a product_name string."}
+        try:
+            results = self.dao.apply_cart_batch(customer_id, operations)
+            failed = sum(1 for result in results if result["status"] == "error")
+            return {
+                "status": "success" if not failed else "partial",
+                "applied": len(results) - failed,
+                "failed": failed,
+                "results": results
+            }
+        except DatabaseException as e:
+            return {"status": "error", "message": str(e)}
     def place_order(self, customer_id):
         try:
             invoice = self.dao.place_order(customer_id)
@@ -208,12 +358,20 @@ class CustomerService:
             return {"status": "error", "message": str(e)}
         except Exception as e:
             return {"status": "error", "message": f"Unexpected error: {str(e)}"}
-    def view_order_history(self, customer_id):
+    def view_order_history(self, customer_id, limit=20, cursor=None):
+        if not 1 <= limit <= 100:
+            return {"status": "error", "message": "limit must be between 1 and 100."}
+        try:
+            before = int(cursor) if cursor else None
+        except ValueError:
+            return {"status": "error", "message": "Invalid order history cursor."}
         try:
-            history = self.dao.view_order_history(customer_id)
+            # One extra header tells us whether an older page exists.
+            history = self.dao.view_order_history(customer_id, limit + 1, before)
             if isinstance(history, str):
                 return {"status": "info", "message": history}
-            return {"status": "success", "orders": history}
+            next_cursor = str(history[limit - 1]["order_header_id"]) if len(history) > limit else None
+            return {"status": "success", "orders": history[:limit], "next_cursor": next_cursor}
         except DatabaseException as e:
             return {"status": "error", "message": str(e)}
         except Exception as e:
@@ -236,7 +394,7 @@ class CustomerService:
                 customer_id,
                 name=name,
                 email=email,
-                password=password,
+                password=self.passwords.hash(password) if password else None,
                 address=address,
                 contact_number=contact_number
             )
@@ -0,0 +1,100 @@
+import smtplib
+import threading
+import time
+from flask_mail import Message
+from backend.utils.exceptions import DatabaseException
+class EmailOutboxWorker:
+    """
+    Background sender for the EmailOutbox table.
+
+    Each pass leases a batch of due messages and sends them over a single
+    ``Mail.connect()`` session. Failed messages are retried with exponential
+    backoff and marked FAILED after ``max_attempts``; a message that cannot
+    be sent at all (a malformed header, no sender configured) is marked
+    FAILED straight away.
+
+    To exercise it locally, point the app at a stub SMTP server, e.g.
+    ``python -m aiosmtpd -n -l localhost:1025`` with MAIL_SERVER=localhost,
+    MAIL_PORT=1025 and MAIL_USE_TLS=false.
+    """
+    def __init__(self, app, mail, dao, batch_size=50, poll_interval=5.0,
+                 max_attempts=5, base_backoff=30.0, max_backoff=3600.0, lease_seconds=300.0):
+        self.app = app
+        self.mail = mail
+        self.dao = dao
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.sent = 0
+        self.failed = 0
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+    def notify(self):
+        """Wake the sender now instead of at the next poll."""
+        self._wake.set()
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                # Drain everything that is due before sleeping again.
+                while not self._stop.is_set() and self.send_batch() == self.batch_size:
+                    pass
+            except DatabaseException as e:
+                print("Email outbox error:", e)
+            except Exception as e:
+                # Never let one bad pass stop the sender for the rest of the process.
+                print("Email outbox error:", type(e).__name__, e)
+    def _retry_at(self, attempts):
+        if attempts >= self.max_attempts:
+            return None
+        return time.time() + min(self.max_backoff, self.base_backoff * 2 ** (attempts - 1))
+    def send_batch(self):
+        """Send one batch of due messages. Returns how many were claimed."""
+        rows = self.dao.claim_due(self.batch_size, self.lease_seconds)
+        if not rows:
+            return 0
+        sent, failures = [], []
+        with self.app.app_context():
+            sender = self.app.config.get("MAIL_DEFAULT_SENDER") or self.app.config.get("MAIL_USERNAME")
+            try:
+                with self.mail.connect() as connection:
+                    for email_id, recipient, subject, body, attempts in rows:
+                        try:
+                            connection.send(Message(subject, recipients=[recipient], body=body, sender=sender))
+                            sent.append(email_id)
+                        except (smtplib.SMTPException, OSError) as e:
+                            failures.append((email_id, str(e), self._retry_at(attempts + 1)))
+                        except Exception as e:
+                            # The message itself is bad (e.g. a header with CR/LF, no sender
+                            # configured): retrying cannot help, so fail it now.
+                            failures.append((email_id, f"{type(e).__name__}: {e}", None))
+            except Exception as e:
+                # The session itself failed (connect, login, quit): everything not yet sent is retried.
+                done = set(sent) | {failure[0] for failure in failures}
+                failures.extend(
+                    (email_id, str(e), self._retry_at(attempts + 1))
+                    for email_id, _, _, _, attempts in rows if email_id not in done
+                )
+        if sent:
+            self.dao.mark_sent(sent)
+        if failures:
+            self.dao.mark_failed(failures)
+        self.sent += len(sent)
+        self.failed += sum(1 for failure in failures if failure[2] is None)
+        return len(rows)
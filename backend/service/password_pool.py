@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from backend.utils.exceptions import ServiceException
+from backend.utils.metrics import metrics
+from backend.utils.passwords import hash_password, needs_rehash, verify_password
+
+
+def _default_workers():
+    # Leave at least half the cores to request threads during a login storm.
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+class PasswordPool:
+    """
+    Runs password hashing and verification on a small dedicated thread pool
+    (hashlib.scrypt releases the GIL while it works).
+
+    At most ``max_pending`` jobs may be running or queued; beyond that new
+    logins are refused straight away instead of piling up behind the pool,
+    so a login spike cannot tie up every request thread. Sizes come from
+    PASSWORD_WORKERS and PASSWORD_QUEUE_LIMIT.
+    """
+    def __init__(self, workers=None, max_pending=None, timeout=10.0):
+        self.workers = workers or int(os.getenv("PASSWORD_WORKERS", 0)) or _default_workers()
+        self.max_pending = max_pending or int(os.getenv("PASSWORD_QUEUE_LIMIT", 64))
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self.pending = 0
+        self.rejected = 0
+
+    def _submit(self, operation, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            metrics.password_rejections.inc(operation)
+            raise ServiceException("Too many sign-ins in progress. Please try again in a moment.")
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="password")
+            self.pending += 1
+        queued = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            metrics.password_wait.observe(started - queued, operation)
+            try:
+                return fn(*args)
+            finally:
+                metrics.password_seconds.observe(time.perf_counter() - started, operation)
+                with self._lock:
+                    self.pending -= 1
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(job)
+        except RuntimeError:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise ServiceException("Password service is shutting down.")
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise ServiceException("Sign-in timed out. Please try again.")
+
+    def hash(self, password):
+        return self._submit("hash", hash_password, password)
+
+    def verify(self, password, stored):
+        """
+        Returns (matches, new_hash). ``new_hash`` is set when the stored value
+        is plaintext or uses outdated parameters and should be replaced.
+        """
+        return self._submit("verify", _verify_and_upgrade, password, stored)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "rejected": self.rejected,
+            }
+
+
+def _verify_and_upgrade(password, stored):
+    if not verify_password(password, stored):
+        return False, None
+    return True, hash_password(password) if needs_rehash(stored) else None
+
+
+password_pool = PasswordPool()
@@ -0,0 +1,246 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from backend.DAO.login_dao import LoginDAO
+from backend.utils.exceptions import DatabaseException
+class PresenceRegistry:
+    """
+    Per-process view of who is logged in, kept in step with the Login table.
+
+    Logouts and "who's online" questions are answered from memory; the
+    Login table is brought up to date by a background thread that writes the
+    changes accumulated since its last pass with one executemany. Every
+    ``refresh_interval`` seconds it also reloads the logged-in set (through
+    the partial index idx_login_online) so changes made by other processes
+    (other gunicorn workers, main_admin.py) show up in those answers.
+    Pending changes are flushed on stop() and at interpreter exit.
+
+    Login and logout do not trust a stale view: unless this process has an
+    unflushed change for the account, a login is refused only while Login
+    has it logged in (one indexed lookup), and a logout of an account this
+    process has not seen is written straight through. A login
+    made by another process is visible once that process has flushed, so for
+    up to ``flush_interval`` seconds two processes can both accept a login
+    for the same account, or one can reject a logout the other just let in.
+
+    Use for_database() so every service on the same database file in this
+    process shares one registry.
+    """
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, dao, flush_interval=1.0, refresh_interval=30.0):
+        self.dao = dao
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._online = {}
+        self._pending = {}
+        # Changes taken by a flush() that is still writing them.
+        self._flushing = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.logins = 0
+        self.logouts = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.refreshes = 0
+        self.refresh()
+        self._start()
+        atexit.register(self.stop)
+
+    @classmethod
+    def for_database(cls, db, flush_interval=1.0, refresh_interval=30.0):
+        key = os.path.abspath(db.db_name)
+        with cls._registry_lock:
+            if key not in cls._registry:
+                cls._registry[key] = cls(LoginDAO(db), flush_interval, refresh_interval)
+            return cls._registry[key]
+
+    def _queue(self, login_id, state, now):
+        # Coalesce per account: the final state wins, but a login and a
+        # logout inside one flush window both keep their timestamps.
+        change = self._pending.setdefault(login_id, {"state": state, "last_login": None, "last_logout": None})
+        change["state"] = state
+        change["last_login" if state == "Y" else "last_logout"] = now
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+    def _local_state(self, login_id):
+        """'Y' or 'N' if this process has a change for ``login_id`` not yet in Login, else None."""
+        change = self._pending.get(login_id) or self._flushing.get(login_id)
+        return change["state"] if change else None
+
+    def _start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="presence-writer", daemon=True)
+        self._thread.start()
+
+    def _login(self, login_id, user_type, now):
+        # Re-inserting moves a repeat login to the back of the login order.
+        self._online.pop(login_id, None)
+        self._online[login_id] = {"user_type": user_type, "login_at": now, "last_seen": now}
+        self._queue(login_id, "Y", now)
+        self.logins += 1
+
+    def login(self, login_id, user_type="Customer"):
+        """Mark ``login_id`` logged in, whether or not it already was."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._login(login_id, user_type, now)
+
+    def login_if_offline(self, login_id, user_type="Customer"):
+        """Mark ``login_id`` logged in unless it already is. Returns whether it was."""
+        with self._lock:
+            state = self._local_state(login_id)
+            was_online = login_id in self._online
+            if state == "Y":
+                return False
+        # Without an unflushed change of ours, Login decides: memory may be a
+        # refresh behind a login or logout made by another process.
+        if state is None and self.dao.is_logged_in(login_id):
+            return False
+        now = datetime.now().isoformat()
+        with self._lock:
+            # Another thread here logged it in meanwhile.
+            if login_id in self._online and (self._local_state(login_id) == "Y" or not was_online):
+                return False
+            self._login(login_id, user_type, now)
+            return True
+
+    def logout(self, login_id):
+        """Mark ``login_id`` logged out. Returns False if it was not logged in."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            if self._online.pop(login_id, None) is not None:
+                self._queue(login_id, "N", now)
+                self.logouts += 1
+                return True
+            if self._local_state(login_id) is not None:
+                return False
+        # Possibly logged in by another process since the last refresh.
+        if self.dao.logout_if_logged_in(login_id, now):
+            with self._lock:
+                self.logouts += 1
+            return True
+        return False
+
+    def logout_all(self, user_type):
+        now = datetime.now().isoformat()
+        with self._lock:
+            leaving = [login_id for login_id, entry in self._online.items() if entry["user_type"] == user_type]
+            for login_id in leaving:
+                del self._online[login_id]
+                self._queue(login_id, "N", now)
+            self.logouts += len(leaving)
+        # Write ours first so the sweep below only counts accounts logged in
+        # by other processes since the last refresh.
+        self.flush()
+        return len(leaving) + self.dao.logout_all(user_type, now)
+
+    def touch(self, login_id):
+        with self._lock:
+            entry = self._online.get(login_id)
+            if entry:
+                entry["last_seen"] = datetime.now().isoformat()
+
+    def is_online(self, login_id):
+        return login_id in self._online
+
+    def online_ids(self, user_type=None):
+        """Logged-in ids, earliest login first."""
+        with self._lock:
+            return [login_id for login_id, entry in self._online.items()
+                    if user_type is None or entry["user_type"] == user_type]
+
+    def last_seen(self, login_id):
+        entry = self._online.get(login_id)
+        return entry["last_seen"] if entry else None
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for entry in self._online.values():
+                counts[entry["user_type"]] = counts.get(entry["user_type"], 0) + 1
+            return counts
+
+    def flush(self):
+        """Write every pending change to Login now. Returns how many rows were written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushing = pending
+        if not pending:
+            return 0
+        changes = [(login_id, c["state"], c["last_login"], c["last_logout"]) for login_id, c in pending.items()]
+        try:
+            self.dao.apply_presence_changes(changes)
+        except DatabaseException:
+            # Put the batch back unless a newer change for the same id arrived meanwhile.
+            with self._lock:
+                for login_id, change in pending.items():
+                    self._pending.setdefault(login_id, change)
+                self._flushing = {}
+            raise
+        with self._lock:
+            self._flushing = {}
+        self.flushes += 1
+        self.rows_written += len(changes)
+        return len(changes)
+
+    def refresh(self):
+        """Reload the logged-in set from Login, keeping this process's unflushed changes."""
+        rows = self.dao.get_logged_in()
+        with self._lock:
+            online = {}
+            for login_id, user_type, last_login in rows:
+                if self._local_state(login_id) is None:
+                    entry = self._online.get(login_id)
+                    online[login_id] = entry or {"user_type": user_type, "login_at": last_login,
+                                                 "last_seen": last_login}
+            for login_id, entry in self._online.items():
+                if self._local_state(login_id) == "Y":
+                    online[login_id] = entry
+            ordered = sorted(online.items(), key=lambda item: (item[1]["login_at"] or "", str(item[0])))
+            self._online = dict(ordered)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.flush()
+                if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+                    self.refresh()
+            except DatabaseException as e:
+                print("Presence writer error:", e)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except DatabaseException as e:
+            print("Presence writer error:", e)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "online": self.counts(),
+            "pending_writes": pending,
+            "logins": self.logins,
+            "logouts": self.logouts,
+            "flushes": self.flushes,
+            "refreshes": self.refreshes,
+            "rows_written": self.rows_written,
+        }
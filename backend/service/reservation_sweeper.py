@@ -0,0 +1,58 @@
+import threading
+import time
+from backend.utils.exceptions import DatabaseException
+class ReservationSweeper:
+    """
+    Background thread that returns stock held by abandoned carts.
+
+    Every ``interval`` seconds it releases expired cart lines through
+    ``CustomerDAO.release_expired_reservations`` in batches of ``batch_size``
+    until none are due, and keeps running totals of what it reclaimed.
+    """
+    def __init__(self, dao, interval=60.0, batch_size=500):
+        self.dao = dao
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+        self.lines_released = 0
+        self.units_released = 0
+        self.last_sweep_at = None
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="reservation-sweeper", daemon=True)
+        self._thread.start()
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                lines, units = self.sweep()
+                if lines:
+                    print(f"Reservation sweeper: released {units} units from {lines} expired cart lines")
+            except DatabaseException as e:
+                print("Reservation sweeper error:", e)
+    def sweep(self, now=None):
+        """Release every reservation due at ``now``. Returns (lines, units) released."""
+        lines = units = 0
+        while not self._stop.is_set():
+            batch_lines, batch_units = self.dao.release_expired_reservations(self.batch_size, now)
+            lines += batch_lines
+            units += batch_units
+            if batch_lines < self.batch_size:
+                break
+        self.lines_released += lines
+        self.units_released += units
+        self.last_sweep_at = time.time()
+        return lines, units
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "lines_released": self.lines_released,
+            "units_released": self.units_released,
+            "last_sweep_at": self.last_sweep_at,
+        }
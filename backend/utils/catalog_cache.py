@@ -0,0 +1,111 @@
+import threading
+from backend.utils.json_provider import raw_json
+class CatalogCache:
+    """
+    Process-wide cache of the ready-to-serve product catalog.
+
+    Entries are tagged with the CatalogVersion counter that the Product
+    triggers bump on every write, so a change made by another process (the
+    admin CLI, another worker) is picked up on the next read. Writers in this
+    process call invalidate() or update_product() right after committing.
+
+    Next to each product dict the cache can hold its serialised fragment,
+    so the JSON catalog is spliced together instead of re-encoded; a patched
+    product's fragment is rebuilt on the next read.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._payload = None
+        self._fragments = None
+        self._positions = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.in_place_updates = 0
+
+    def get(self, version):
+        with self._lock:
+            if self._payload is not None and self._version == version:
+                self.hits += 1
+                return self._payload
+            self.misses += 1
+            return None
+
+    def get_fragments(self, version):
+        """Like get(), but one serialised fragment per product."""
+        with self._lock:
+            if self._payload is None or self._version != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            payload, fragments = self._payload, self._fragments
+        result = list(fragments)
+        missing = [(i, payload[i]) for i, fragment in enumerate(result) if fragment is None]
+        for i, item in missing:
+            result[i] = raw_json(item)
+        if missing:
+            with self._lock:
+                for i, item in missing:
+                    # Keep the fragment unless the row was patched while it was encoded.
+                    if self._fragments is fragments and payload[i] is item:
+                        fragments[i] = result[i]
+        return result
+
+    def put(self, version, payload, fragments=None):
+        with self._lock:
+            # Never let a slow reader overwrite a newer entry.
+            if self._payload is not None and self._version is not None and self._version > version:
+                return
+            self._version = version
+            self._payload = payload
+            self._fragments = list(fragments) if fragments is not None else [None] * len(payload)
+            self._positions = {item["product_id"]: i for i, item in enumerate(payload)}
+
+    def invalidate(self):
+        with self._lock:
+            self._drop()
+
+    def update_product(self, product_id, version, **fields):
+        """
+        Patch one cached product after a single-row write that moved the
+        catalog from ``version - 1`` to ``version``. Anything the patch cannot
+        express exactly (a missed write, a product leaving or entering the
+        in-stock set) drops the entry instead.
+        """
+        with self._lock:
+            if self._payload is None:
+                return
+            position = self._positions.get(product_id)
+            if self._version != version - 1 or position is None or fields.get("quantity", 1) <= 0:
+                self._drop()
+                return
+            # Swap in a new dict so readers serialising the old list never
+            # see a half-updated row.
+            self._payload[position] = {**self._payload[position], **fields}
+            self._fragments[position] = None
+            self._version = version
+            self.in_place_updates += 1
+
+    def _drop(self):
+        if self._payload is not None:
+            self.invalidations += 1
+        self._version = None
+        self._payload = None
+        self._fragments = None
+        self._positions = {}
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "in_place_updates": self.in_place_updates,
+                "cached_products": len(self._payload) if self._payload is not None else 0,
+                "version": self._version,
+            }
+
+catalog_cache = CatalogCache()
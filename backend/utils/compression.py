@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from flask import request
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: gzip alone is still negotiated.
+    brotli = None
+
+# Content type -> {encoding: level}. Brotli 4-5 compresses JSON about as
+# well as gzip 9 at a fraction of the CPU; go higher only for cached bodies.
+DEFAULT_LEVELS = {
+    "application/json": {"br": 5, "gzip": 6},
+    "text/plain": {"br": 4, "gzip": 6},
+    "text/csv": {"br": 4, "gzip": 6},
+    "text/html": {"br": 5, "gzip": 6},
+}
+PREFERENCE = ("br", "gzip")
+_CHUNK = 64 * 1024
+
+
+def _gzip_compressor(level):
+    # wbits=31 writes the gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _brotli_compressor(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+_COMPRESSORS = {"gzip": _gzip_compressor, "br": _brotli_compressor}
+
+
+class ResponseCompressor:
+    """
+    after_request middleware that compresses text responses the client
+    accepts in br or gzip.
+
+    - Bodies under ``min_size`` go out as they are.
+    - Bodies over ``stream_size`` (and streamed responses) are compressed
+      chunk by chunk while they are sent, without Content-Length.
+    - Other bodies are compressed in one go. Unless the response says
+      no-store, the compressed bytes are kept in a small LRU keyed by a
+      digest of the body, so a hot payload such as the catalog is
+      compressed once and then only hashed.
+
+    File responses and anything that already has a Content-Encoding
+    (the precompressed static files) are left alone.
+    """
+    def __init__(self, levels=None, min_size=None, stream_size=1024 * 1024,
+                 cache_bytes=16 * 1024 * 1024, cache_max_body=2 * 1024 * 1024):
+        self.levels = {mimetype: dict(levels) for mimetype, levels in (levels or DEFAULT_LEVELS).items()}
+        self.min_size = min_size if min_size is not None else int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+        self.stream_size = stream_size
+        self.cache_bytes = cache_bytes
+        self.cache_max_body = cache_max_body
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.streamed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def init_app(self, app):
+        app.after_request(self.after_request)
+        return self
+
+    def set_level(self, mimetype, encoding, level):
+        self.levels.setdefault(mimetype, {})[encoding] = level
+
+    def _negotiate(self, mimetype):
+        levels = self.levels.get(mimetype)
+        if not levels:
+            return None, None
+        accepts = parse_accept_header(request.headers.get("Accept-Encoding", ""))
+        for encoding in PREFERENCE:
+            if encoding in levels and accepts[encoding] > 0 and (encoding != "br" or brotli is not None):
+                return encoding, levels[encoding]
+        return None, None
+
+    def _compress(self, body, encoding, level, cacheable):
+        if not cacheable or len(body) > self.cache_max_body:
+            compress, finish = _COMPRESSORS[encoding](level)
+            return compress(body) + finish()
+        key = (encoding, level, hashlib.blake2b(body, digest_size=16).digest())
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return compressed
+            self.misses += 1
+        compress, finish = _COMPRESSORS[encoding](level)
+        compressed = compress(body) + finish()
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = compressed
+                self._cached_bytes += len(compressed)
+                while self._cached_bytes > self.cache_bytes and self._cache:
+                    self._cached_bytes -= len(self._cache.popitem(last=False)[1])
+        return compressed
+
+    def _stream(self, chunks, encoding, level):
+        compress, finish = _COMPRESSORS[encoding](level)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            # Re-slice so one huge chunk does not become one huge write.
+            for start in range(0, len(chunk), _CHUNK):
+                piece = chunk[start:start + _CHUNK]
+                self.bytes_in += len(piece)
+                out = compress(piece)
+                if out:
+                    self.bytes_out += len(out)
+                    yield out
+        out = finish()
+        self.bytes_out += len(out)
+        yield out
+
+    def after_request(self, response):
+        if (response.direct_passthrough or "Content-Encoding" in response.headers
+                or response.mimetype not in self.levels or request.method == "HEAD"
+                or response.status_code < 200 or response.status_code in (204, 206, 304)):
+            return response
+        response.vary.add("Accept-Encoding")
+        if response.cache_control.no_transform:
+            return response
+        encoding, level = self._negotiate(response.mimetype)
+        if encoding is None:
+            return response
+
+        if response.is_streamed or (response.content_length or 0) > self.stream_size:
+            chunks = response.response if response.is_streamed else [response.get_data()]
+            response.response = self._stream(chunks, encoding, level)
+            response.headers.pop("Content-Length", None)
+            self.streamed += 1
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            compressed = self._compress(body, encoding, level, not response.cache_control.no_store)
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+            response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if response.get_etag()[0]:
+            # A compressed body is a different representation of the resource.
+            etag, weak = response.get_etag()
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cache_entries": len(self._cache),
+                "cache_bytes": self._cached_bytes,
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "cache_hit_ratio": self.hits / lookups if lookups else 0.0,
+                "streamed": self.streamed,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "ratio": self.bytes_out / self.bytes_in if self.bytes_in else 0.0,
+            }
+
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,91 @@
+import hashlib
+import io
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional: without it only the original is published.
+    Image = None
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMAGES_DIR = os.getenv("IMAGES_DIR", os.path.join(_ROOT, "images"))
+MEDIA_DIR = os.getenv("MEDIA_DIR", os.path.join(_ROOT, "media"))
+MEDIA_URL = "/media/"
+
+# name -> (maximum width in pixels, Pillow format). "card_jpeg" is the
+# fallback for clients that cannot decode WebP.
+VARIANTS = {
+    "thumb": (160, "WEBP"),
+    "card": (480, "WEBP"),
+    "card_jpeg": (480, "JPEG"),
+}
+_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+_SAVE_OPTIONS = {"WEBP": {"quality": 80, "method": 4}, "JPEG": {"quality": 82, "optimize": True, "progressive": True}}
+
+
+def resolve_source(image_path):
+    """
+    Map a Product.image_path such as ``/images/iphone15.jpg`` to a file in
+    IMAGES_DIR. The stem is matched case-insensitively and the extension is
+    ignored, since catalog CSVs and the files on disk disagree on both.
+    """
+    if not image_path:
+        return None
+    name = os.path.basename(image_path.replace("\\", "/"))
+    candidate = os.path.join(IMAGES_DIR, name)
+    if os.path.isfile(candidate):
+        return candidate
+    stem = os.path.splitext(name)[0].lower()
+    try:
+        for entry in os.listdir(IMAGES_DIR):
+            if os.path.splitext(entry)[0].lower() == stem:
+                return os.path.join(IMAGES_DIR, entry)
+    except OSError:
+        pass
+    return None
+
+
+def _publish(data, extension):
+    """Store ``data`` under its content hash and return its URL; identical content is written once."""
+    name = hashlib.sha256(data).hexdigest()[:20] + "." + extension
+    path = os.path.join(MEDIA_DIR, name)
+    if not os.path.exists(path):
+        os.makedirs(MEDIA_DIR, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as file:
+            file.write(data)
+        os.replace(partial, path)
+    return MEDIA_URL + name
+
+
+def build_variants(source):
+    """Publish the original and every resized variant of ``source``. Returns name -> {url, bytes, ...}."""
+    with open(source, "rb") as file:
+        data = file.read()
+    extension = os.path.splitext(source)[1].lstrip(".").lower() or "bin"
+    variants = {"original": {"url": _publish(data, extension), "bytes": len(data)}}
+    if Image is None:
+        return variants
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        for name, (width, image_format) in VARIANTS.items():
+            resized = image.copy()
+            # thumbnail() only ever shrinks, so small originals keep their size.
+            resized.thumbnail((width, width * 4))
+            if image_format == "JPEG" and resized.mode not in ("RGB", "L"):
+                resized = resized.convert("RGB")
+            buffer = io.BytesIO()
+            resized.save(buffer, image_format, **_SAVE_OPTIONS[image_format])
+            encoded = buffer.getvalue()
+            if (image_format == original.format and resized.size == image.size
+                    and len(encoded) >= len(data)):
+                # Re-encoding a small original at full size would only grow it.
+                variants[name] = {**variants["original"], "width": resized.width, "height": resized.height}
+                continue
+            variants[name] = {
+                "url": _publish(encoded, _EXTENSIONS[image_format]),
+                "width": resized.width,
+                "height": resized.height,
+                "bytes": len(encoded),
+            }
+    return variants
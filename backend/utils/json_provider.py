@@ -0,0 +1,125 @@
+import json
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask.json.provider import DefaultJSONProvider
+from backend.utils.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # orjson is optional: the stdlib encoder is used instead.
+    orjson = None
+
+_default = DefaultJSONProvider.default
+# Fragments are swapped in for this placeholder after encoding, which works
+# with either encoder (orjson only gained native fragments in 3.9).
+_TOKEN = uuid.uuid4().hex
+_PLACEHOLDER = re.compile(b'"' + _TOKEN.encode() + rb':(\d+)"')
+
+
+class RawJSON:
+    """Already-serialised JSON that the encoders below embed verbatim."""
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+
+def dumps_bytes(obj, sort_keys=True, indent=False, ensure_ascii=True):
+    fragments = []
+
+    def default(value):
+        if isinstance(value, RawJSON):
+            fragments.append(value.data)
+            return f"{_TOKEN}:{len(fragments) - 1}"
+        return _default(value)
+
+    if orjson is not None:
+        # Dates go through Flask's default() so both encoders format them alike.
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        out = orjson.dumps(obj, default=default, option=option)
+    else:
+        out = json.dumps(obj, default=default, sort_keys=sort_keys, ensure_ascii=ensure_ascii,
+                         indent=2 if indent else None,
+                         separators=None if indent else (",", ":")).encode("utf-8")
+    if fragments:
+        out = _PLACEHOLDER.sub(lambda match: fragments[int(match.group(1))], out)
+    return out
+
+
+def raw_json(obj):
+    return RawJSON(dumps_bytes(obj))
+
+
+class FragmentCache:
+    """
+    Bounded LRU of serialised fragments. Callers key entries by the values
+    the fragment is built from, so a changed row simply misses and the stale
+    entry ages out.
+    """
+    def __init__(self, max_entries=100_000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = raw_json(build())
+        with self._lock:
+            self._entries[key] = fragment
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson when it is installed (stdlib json
+    otherwise) that embeds RawJSON fragments without re-encoding them.
+    Serialisation time is charged to the current request's metrics.
+    """
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj, sort_keys=kwargs.get("sort_keys", self.sort_keys),
+                           indent=bool(kwargs.get("indent")),
+                           ensure_ascii=kwargs.get("ensure_ascii", self.ensure_ascii)).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        started = time.perf_counter()
+        body = dumps_bytes(obj, sort_keys=self.sort_keys, indent=indent, ensure_ascii=self.ensure_ascii)
+        metrics.record_serialize(time.perf_counter() - started)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,257 @@
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from backend.utils.slow_query_log import is_transaction_control, slow_query_log
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text exposition format.
+
+    HTTP middleware calls begin_request()/end_request() around each request;
+    connections opened by DBConnection report every statement through
+    record_sql(), which is also charged to the request running on the same
+    thread. Gauges are read from callbacks at scrape time.
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._gauges = []
+        self.requests = Counter(
+            "http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+        self.request_sql_time = Histogram(
+            "http_request_sql_seconds", "Time spent in SQL per HTTP request.", ("method", "route"))
+        self.request_serialize_time = Histogram(
+            "http_response_serialize_seconds", "Time spent encoding the JSON body per HTTP request.",
+            ("method", "route"), buckets=SQL_BUCKETS)
+        self.request_sql_queries = Counter(
+            "http_request_sql_queries_total", "SQL statements executed while serving HTTP requests.",
+            ("method", "route"))
+        self.sql_latency = Histogram(
+            "sqlite_statement_duration_seconds", "SQLite statement execution latency (row fetches excluded).",
+            ("operation",), buckets=SQL_BUCKETS)
+        self.password_seconds = Histogram(
+            "password_hash_seconds", "Password hashing and verification time in the worker pool.", ("operation",))
+        self.password_wait = Histogram(
+            "password_queue_wait_seconds", "Time password jobs waited for a worker.", ("operation",))
+        self.password_rejections = Counter(
+            "password_pool_rejections_total", "Password jobs refused because the pool queue was full.",
+            ("operation",))
+
+    def register_gauge(self, name, help_text, callback):
+        """Expose ``callback()`` (a number) as a gauge on every scrape."""
+        self._gauges.append((name, help_text, callback))
+
+    def begin_request(self):
+        self._local.request = [0, 0.0, time.perf_counter(), None]
+
+    def end_request(self, method, route, status):
+        request = getattr(self._local, "request", None)
+        self._local.request = None
+        if request is None:
+            return
+        queries, sql_seconds, started, serialize_seconds = request
+        self.requests.inc(method, route, str(status))
+        self.request_latency.observe(time.perf_counter() - started, method, route)
+        self.request_sql_time.observe(sql_seconds, method, route)
+        if serialize_seconds is not None:
+            self.request_serialize_time.observe(serialize_seconds, method, route)
+        self.request_sql_queries.inc(method, route, amount=queries)
+
+    def record_sql(self, operation, seconds):
+        self.sql_latency.observe(seconds, operation)
+        request = getattr(self._local, "request", None)
+        if request is not None:
+            request[0] += 1
+            request[1] += seconds
+
+    def record_fetch(self, seconds):
+        """Row fetch time only counts towards the current request's SQL time."""
+        request = getattr(self._local, "request", None)
+        if request is not None:
+            request[1] += seconds
+
+    def record_serialize(self, seconds):
+        request = getattr(self._local, "request", None)
+        if request is not None:
+            request[3] = (request[3] or 0.0) + seconds
+
+    def render(self):
+        lines = []
+        for metric in (self.requests, self.request_latency, self.request_sql_time, self.request_serialize_time,
+                       self.request_sql_queries, self.sql_latency, self.password_seconds,
+                       self.password_wait, self.password_rejections):
+            lines.extend(metric.render())
+        for name, help_text, callback in self._gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(callback())}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def _operation(sql):
+    return sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else "OTHER"
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Cursor that reports statement and fetch time to the metrics registry and
+    hands statements slower than the slow-query threshold (execute plus the
+    fetches that follow it) to the slow-query log.
+    """
+    _statement = None
+    _elapsed = 0.0
+
+    def _finish(self, sql, parameters, elapsed, many=False):
+        self._elapsed = elapsed
+        if is_transaction_control(sql):
+            # Lock waits, not query plans: counted by operation in sql_latency only.
+            self._statement = None
+            return
+        self._statement = (sql, parameters, many)
+        if elapsed >= slow_query_log.threshold:
+            self._log_slow()
+
+    def _log_slow(self):
+        sql, parameters, many = self._statement
+        self._statement = None
+        slow_query_log.record(self.connection, sql, parameters, self._elapsed, many)
+
+    def _fetched(self, seconds):
+        metrics.record_fetch(seconds)
+        if self._statement is not None:
+            self._elapsed += seconds
+            if self._elapsed >= slow_query_log.threshold:
+                self._log_slow()
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.record_sql(_operation(sql), elapsed)
+            self._finish(sql, parameters, elapsed)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.record_sql(_operation(sql), elapsed)
+            self._finish(sql, seq_of_parameters, elapsed, many=True)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._fetched(time.perf_counter() - started)
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._fetched(time.perf_counter() - started)
+
+    def fetchall(self):
+        started = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._fetched(time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection factory whose cursors are TimedCursors."""
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
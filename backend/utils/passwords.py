@@ -0,0 +1,64 @@
+import base64
+import hashlib
+import hmac
+import os
+
+# scrypt cost: about 16 MB and 50 ms per hash on a current server core.
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+SCRYPT_DKLEN = 32
+_PREFIX = "scrypt"
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p, dklen):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          dklen=dklen, maxmem=256 * n * r + 1024 * 1024)
+
+
+def hash_password(password):
+    """Encode ``password`` as ``scrypt$n$r$p$salt$hash`` with a fresh random salt."""
+    if not isinstance(password, str):
+        raise TypeError("password must be a string")
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN)
+    return f"{_PREFIX}${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+
+def _parse(stored):
+    parts = stored.split("$") if stored else []
+    if len(parts) != 6 or parts[0] != _PREFIX:
+        return None
+    try:
+        n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+        return n, r, p, base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def is_hashed(stored):
+    return _parse(stored) is not None
+
+
+def verify_password(password, stored):
+    """
+    Check ``password`` against a stored value. Rows written before hashing
+    hold the plaintext, which is compared in constant time.
+    """
+    if not isinstance(password, str) or not stored or not isinstance(stored, str):
+        return False
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    n, r, p, salt, expected = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p, len(expected)), expected)
+
+
+def needs_rehash(stored):
+    """True for plaintext rows and hashes made with other cost parameters."""
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
@@ -0,0 +1,158 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "REPLACE")
+# Their time is waiting for the database lock, not executing a plan.
+_TRANSACTION_CONTROL = {"BEGIN", "COMMIT", "END", "ROLLBACK", "SAVEPOINT", "RELEASE"}
+
+
+def fingerprint(sql):
+    """SQL with literals and IN lists collapsed, so statements that differ only in values group together."""
+    text = _STRING.sub("?", sql)
+    text = _NUMBER.sub("?", text)
+    text = _IN_LIST.sub("(?+)", text)
+    return _SPACE.sub(" ", text).strip()
+
+
+def is_transaction_control(sql):
+    words = sql.split(None, 1) if sql else []
+    return bool(words) and words[0].upper() in _TRANSACTION_CONTROL
+
+
+def parameter_shape(parameters, many=False):
+    """Types of the bound values (never the values themselves)."""
+    if many:
+        first = parameters[0] if isinstance(parameters, (list, tuple)) and parameters else None
+        count = len(parameters) if isinstance(parameters, (list, tuple)) else "?"
+        return f"{count} x {parameter_shape(first) if first is not None else '(...)'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+
+
+def _caller():
+    """Qualified name of the DAO method (or nearest application frame) that issued the statement."""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename.replace("\\", "/")
+        if not filename.endswith(("backend/utils/metrics.py", "backend/utils/slow_query_log.py",
+                                  "backend/DAO/db_connection.py")):
+            name = f"{os.path.basename(filename)}:{frame.f_code.co_qualname}"
+            if "/backend/DAO/" in filename:
+                return frame.f_code.co_qualname
+            fallback = fallback or name
+        frame = frame.f_back
+    return fallback or "unknown"
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than ``threshold_ms`` with their parameter shape,
+    calling DAO method and EXPLAIN QUERY PLAN, and aggregates them by SQL
+    fingerprint for report().
+
+    The threshold defaults to SLOW_QUERY_MS (100 ms); set it to 0 to disable.
+    BEGIN/COMMIT/ROLLBACK are never logged: a slow one is a lock wait, which
+    sqlite_statement_duration_seconds{operation="BEGIN"} etc. already show.
+    """
+    def __init__(self, threshold_ms=None, max_fingerprints=500):
+        if threshold_ms is None:
+            threshold_ms = float(os.getenv("SLOW_QUERY_MS", 100))
+        self.threshold = threshold_ms / 1000 if threshold_ms > 0 else float("inf")
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def configure(self, threshold_ms):
+        self.threshold = threshold_ms / 1000 if threshold_ms > 0 else float("inf")
+
+    def _explain(self, conn, sql, parameters):
+        if not sql.lstrip().upper().startswith(_EXPLAINABLE) or parameters is None:
+            return []
+        try:
+            # The base-class execute opens a fresh cursor: the caller's cursor
+            # and its pending rows are left alone, and this is not timed.
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            return [f"(plan unavailable: {e})"]
+        depth = {0: 0}
+        plan = []
+        for node_id, parent_id, _, detail in rows:
+            depth[node_id] = depth.get(parent_id, 0) + 1
+            plan.append("  " * (depth[node_id] - 1) + detail)
+        return plan
+
+    def record(self, conn, sql, parameters, seconds, many=False):
+        if is_transaction_control(sql):
+            return
+        caller = _caller()
+        shape = parameter_shape(parameters, many)
+        if many:
+            parameters = parameters[0] if isinstance(parameters, (list, tuple)) and parameters else None
+        plan = self._explain(conn, sql, parameters)
+        key = fingerprint(sql)
+        full_scan = any(step.strip().startswith("SCAN") and "COVERING INDEX" not in step for step in plan)
+        print(f"Slow query {seconds * 1000:.1f} ms in {caller} params={shape}: {key}")
+        for step in plan:
+            print("    " + step)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    # Keep the table bounded: forget the cheapest fingerprint.
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k]["total_seconds"])]
+                entry = self._entries[key] = {
+                    "fingerprint": key, "count": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                    "callers": set(), "parameter_shape": shape,
+                }
+            entry["count"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["callers"].add(caller)
+            entry["plan"] = plan
+            entry["full_scan"] = full_scan
+            entry["last_seen"] = time.time()
+
+    def report(self, limit=20):
+        """Slow fingerprints, most total time first."""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e["total_seconds"], reverse=True)[:limit]
+            return [
+                {
+                    "fingerprint": e["fingerprint"],
+                    "count": e["count"],
+                    "total_ms": round(e["total_seconds"] * 1000, 2),
+                    "mean_ms": round(e["total_seconds"] * 1000 / e["count"], 2),
+                    "max_ms": round(e["max_seconds"] * 1000, 2),
+                    "callers": sorted(e["callers"]),
+                    "parameter_shape": e["parameter_shape"],
+                    "full_scan": e["full_scan"],
+                    "plan": e["plan"],
+                }
+                for e in entries
+            ]
+
+    def format_report(self, limit=20):
+        lines = []
+        for rank, e in enumerate(self.report(limit), start=1):
+            lines.append(f"#{rank} {e['total_ms']:.1f} ms total, {e['count']} calls, mean {e['mean_ms']:.1f} ms, "
+                         f"max {e['max_ms']:.1f} ms{' [FULL SCAN]' if e['full_scan'] else ''}")
+            lines.append(f"   {e['fingerprint']}")
+            lines.append(f"   callers: {', '.join(e['callers'])}  params: {e['parameter_shape']}")
+            lines.extend(f"      {step}" for step in e["plan"])
+        return "\n".join(lines) if lines else "No slow queries recorded."
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+slow_query_log = SlowQueryLog()
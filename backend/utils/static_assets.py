@@ -0,0 +1,176 @@
+"""
+Precompressed static files for the built frontend.
+
+    python -m backend.utils.static_assets [dist directory]
+
+writes a .gz (and, with the optional brotli package, a .br) sibling next to
+every compressible file, so requests never compress on the fly. Run it after
+``vite build``; the API also runs it at startup and skips files whose
+siblings are already up to date.
+"""
+import gzip
+import mimetypes
+import os
+import re
+import sys
+from functools import lru_cache
+from flask import request, send_from_directory
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:  # brotli is optional: gzip alone is still served.
+    brotli = None
+
+DIST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                        "frontend", "Online_Grocery_Store", "dist")
+COMPRESSIBLE = {".html", ".js", ".mjs", ".css", ".json", ".svg", ".map", ".txt", ".xml", ".ico", ".webmanifest"}
+# Smaller files gain less than the extra response headers cost.
+MIN_SIZE = 1024
+# Preferred first when the client accepts several.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+# Vite emits assets/<name>-<8 char hash>.<ext>; their content never changes under the same name.
+HASHED_ASSET = re.compile(r"(^|/)assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _stale(source, target):
+    return not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(source)
+
+
+def _write(path, data):
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as file:
+        file.write(data)
+    os.replace(partial, path)
+
+
+def precompress(root=DIST_DIR, min_size=MIN_SIZE):
+    """Create missing or stale .gz/.br siblings under ``root``. Returns counts and byte totals."""
+    summary = {"files": 0, "written": 0, "bytes": 0, "gzip_bytes": 0, "br_bytes": 0}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if os.path.splitext(name)[1].lower() not in COMPRESSIBLE or os.path.getsize(path) < min_size:
+                continue
+            summary["files"] += 1
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == "br" and brotli is None:
+                    continue
+                target = path + suffix
+                if _stale(path, target):
+                    if data is None:
+                        with open(path, "rb") as file:
+                            data = file.read()
+                    if encoding == "br":
+                        encoded = brotli.compress(data, quality=11)
+                    else:
+                        # mtime=0 keeps the output byte-identical across builds.
+                        encoded = gzip.compress(data, compresslevel=9, mtime=0)
+                    if len(encoded) >= len(data):
+                        if os.path.exists(target):
+                            os.remove(target)
+                        continue
+                    _write(target, encoded)
+                    summary["written"] += 1
+                if os.path.exists(target):
+                    summary["gzip_bytes" if encoding == "gzip" else "br_bytes"] += os.path.getsize(target)
+            summary["bytes"] += os.path.getsize(path)
+    return summary
+
+
+class StaticAssets:
+    """
+    Chooses which file answers a static request: the best precompressed
+    sibling the client accepts, or the original. Which siblings exist is
+    scanned once (see rescan()) instead of probed with stat() per request,
+    and the decision for each (file, Accept-Encoding) pair is memoised.
+    """
+    def __init__(self, root=DIST_DIR):
+        self.root = root
+        self._encodings = {}
+        self.plan = lru_cache(maxsize=4096)(self._plan)
+
+    def rescan(self):
+        found = {}
+        suffixes = {suffix: encoding for encoding, suffix in ENCODINGS}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                base, suffix = os.path.splitext(name)
+                if suffix in suffixes and base in names:
+                    relative = os.path.relpath(os.path.join(directory, base), self.root).replace(os.sep, "/")
+                    found.setdefault(relative, set()).add(suffixes[suffix])
+        self._encodings = found
+        self.plan.cache_clear()
+        return len(found)
+
+    def prepare(self, compress=True):
+        """
+        Precompress (unless ``compress`` is false, when the build step already
+        did), then index the siblings. Safe to call when the build is missing.
+        """
+        if not os.path.isdir(self.root):
+            return None
+        summary = precompress(self.root) if compress else None
+        self.rescan()
+        return summary
+
+    def compressible(self, filename):
+        return os.path.splitext(filename)[1].lower() in COMPRESSIBLE
+
+    def choose(self, filename, accepts):
+        """
+        (file to send, Content-Encoding or None). ``accepts(encoding)`` is
+        true when the client accepts that encoding.
+        """
+        available = self._encodings.get(filename)
+        if available:
+            for encoding, suffix in ENCODINGS:
+                if encoding in available and accepts(encoding):
+                    return filename + suffix, encoding
+        return filename, None
+
+    def cache_control(self, filename):
+        return IMMUTABLE if HASHED_ASSET.search(filename) else REVALIDATE
+
+    def _plan(self, filename, accept_encoding):
+        """(file to send, Content-Type, extra headers) for one request."""
+        accepts = parse_accept_header(accept_encoding)
+        served, encoding = self.choose(filename, lambda name: accepts[name] > 0)
+        headers = {"Cache-Control": self.cache_control(filename)}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if self.compressible(filename):
+            headers["Vary"] = "Accept-Encoding"
+        # Content-Type always follows the original file, never the .gz/.br sibling.
+        return served, mimetypes.guess_type(filename)[0] or "application/octet-stream", headers
+
+
+def install_static_assets(app, compress=True):
+    """
+    Replace ``app``'s static view with one that serves precompressed
+    siblings and sets long-lived caching on hashed assets. With
+    ``compress=False`` the siblings already on disk are served as they are.
+    """
+    assets = StaticAssets(app.static_folder)
+    assets.prepare(compress)
+
+    def serve_static(filename):
+        served, mimetype, headers = assets.plan(filename, request.headers.get("Accept-Encoding", ""))
+        response = send_from_directory(assets.root, served, mimetype=mimetype, conditional=True,
+                                       download_name=os.path.basename(filename))
+        response.headers.update(headers)
+        return response
+
+    app.view_functions["static"] = serve_static
+    return assets
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else DIST_DIR
+    result = precompress(target)
+    print(f"{result['files']} files ({result['bytes']:,} bytes): wrote {result['written']} siblings, "
+          f"gzip {result['gzip_bytes']:,} bytes, brotli {result['br_bytes']:,} bytes"
+          + ("" if brotli else " (brotli not installed)"))
@@ -0,0 +1,68 @@
+"""
+Checkout latency against cart size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_checkout
+    python -m benchmarks.bench_checkout --sizes 1 10 100 500 --rounds 30
+
+Each round fills a fresh customer's cart through CustomerDAO.apply_cart_batch
+and then times CustomerDAO.place_order alone, against a throwaway database.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from backend.DAO.admin_dao import AdminDAO
+from backend.DAO.customer_dao import CustomerDAO
+from backend.DAO.db_connection import DBConnection
+from backend.DAO.db_init import DBInitializer
+from entities.product import Product
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def run(sizes, rounds):
+    with tempfile.TemporaryDirectory() as workdir:
+        db = DBConnection(os.path.join(workdir, "bench_checkout.db"))
+        DBInitializer(db).create_tables()
+        customer_dao = CustomerDAO(db)
+        admin_dao = AdminDAO(db)
+
+        product_count = max(sizes)
+        for i in range(product_count):
+            admin_dao.add_product(Product(f"bench-{i}", f"Bench product {i}", "benchmark item",
+                                          "Bench Co", 1.0 + i % 50, 10 ** 9))
+
+        print(f"{'cart size':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10} {'ms/line':>10}")
+        customer_id = 1
+        for size in sizes:
+            operations = [
+                {"op": "add", "product_name": f"Bench product {i}", "quantity": 1}
+                for i in range(size)
+            ]
+            samples = []
+            for _ in range(rounds):
+                customer_dao.apply_cart_batch(customer_id, operations)
+                started = time.perf_counter()
+                customer_dao.place_order(customer_id)
+                samples.append((time.perf_counter() - started) * 1000)
+                customer_id += 1
+            p50 = statistics.median(samples)
+            print(f"{size:>10} {p50:>10.2f} {percentile(samples, 95):>10.2f} "
+                  f"{max(samples):>10.2f} {p50 / size:>10.3f}")
+        db.close_all()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 10, 25, 50, 100, 250])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    run(args.sizes, args.rounds)
@@ -0,0 +1,293 @@
+"""
+Synthetic data generator for scale-testing the store schema.
+
+Run from the repository root:
+
+    python -m benchmarks.generate_data scale.db
+    python -m benchmarks.generate_data scale.db --customers 1000000 --products 100000 --orders 3000000
+    python -m benchmarks.generate_data scale.db --customer-skew 1.2 --product-skew 1.1 --avg-cart-size 5
+
+The database is created with the app's own schema and migrations, then
+filled with referentially consistent rows:
+
+- Customer and Login: one Login row per customer, a share of them inactive.
+- Product: prices, companies and stock, a share of it out of stock.
+- OrderHeader: placed orders spread over --days, oldest first.
+- "Order": PLACED lines with unit_price and order_header_id, plus IN_CART
+  lines for --open-carts of the customers. Product.reserved matches the
+  open carts exactly.
+- Transactions: one ledger row per placed line.
+
+Who buys and what they buy follow Zipf-like distributions. The rank-r
+customer or product is weighted 1 / r**skew, so a skew of 0 is uniform and
+larger values concentrate orders on repeat buyers and hot products. Cart
+sizes are geometric with mean --avg-cart-size, capped at --max-cart-size.
+
+Rows go in with executemany in large transactions. Secondary indexes and
+the Product triggers (catalog version, search index) are dropped during the
+load and recreated afterwards. The search index and the sales aggregates
+are then rebuilt, and the ID sequences are moved past the generated IDs.
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+
+from backend.DAO.db_connection import DBConnection
+from backend.DAO.db_init import DBInitializer, rebuild_sales_aggregates
+from backend.DAO.id_allocator import format_product_id
+from backend.utils.passwords import hash_password
+
+LOADED_TABLES = ("Customer", "Login", "Product", "OrderHeader", "Order", "Transactions")
+FIRST_CUSTOMER_ID = 100000
+PASSWORD = "Password@1"
+WORDS = ["fresh", "organic", "crunchy", "spicy", "classic", "family", "mini", "premium", "light", "whole",
+         "green", "golden", "sweet", "smoked", "roasted", "wild", "farm", "daily", "value", "select"]
+GOODS = ["apple", "banana", "rice", "milk", "bread", "coffee", "tea", "cheese", "yogurt", "pasta", "oats",
+         "honey", "butter", "juice", "lentils", "flour", "sugar", "salt", "chocolate", "almonds", "eggs"]
+COUNTRIES = ["India", "US", "UK", "Canada", "Germany", "Australia"]
+
+
+def zipf_cum_weights(n, skew):
+    """Cumulative 1/rank**skew weights for choosing among n items."""
+    total = 0.0
+    cumulative = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** skew
+        cumulative.append(total)
+    return cumulative
+
+
+def weighted_index(rng, cum_weights):
+    return bisect(cum_weights, rng.random() * cum_weights[-1])
+
+
+def cart_size(rng, mean, cap):
+    # Geometric on 1, 2, 3, ... with the requested mean.
+    if mean <= 1:
+        return 1
+    p = 1.0 / mean
+    return min(cap, 1 + int(math.log(1.0 - rng.random()) / math.log(1.0 - p)))
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Phase:
+    def __init__(self, label):
+        self.label = label
+    def __enter__(self):
+        self.started = time.perf_counter()
+        print(f"{self.label}...", flush=True)
+        return self
+    def __exit__(self, *exc):
+        print(f"{self.label}: {time.perf_counter() - self.started:.1f}s", flush=True)
+
+
+def drop_load_overhead(conn):
+    """Drop secondary indexes and Product triggers; return the SQL to recreate them."""
+    placeholders = ", ".join("?" for _ in LOADED_TABLES)
+    saved = conn.execute(f"""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('index', 'trigger') AND sql IS NOT NULL AND tbl_name IN ({placeholders})
+    """, LOADED_TABLES).fetchall()
+    for kind, name, _ in saved:
+        conn.execute(f'DROP {kind.upper()} "{name}"')
+    conn.commit()
+    return [sql for _, _, sql in saved]
+
+
+def insert(conn, sql, rows, batch=50000):
+    count = 0
+    for chunk in chunks(rows, batch):
+        conn.executemany(sql, chunk)
+        count += len(chunk)
+    conn.commit()
+    return count
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    if os.path.exists(args.database):
+        if not args.overwrite:
+            sys.exit(f"{args.database} already exists; pass --overwrite to replace it")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.database + suffix):
+                os.remove(args.database + suffix)
+
+    started = time.perf_counter()
+    db = DBConnection(args.database)
+    DBInitializer(db).create_tables()
+    db.close_all()
+
+    conn = sqlite3.connect(args.database)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    recreate = drop_load_overhead(conn)
+    totals = {}
+
+    with Phase("customers"):
+        # One hash shared by every synthetic account: hashing millions of rows
+        # would dominate the build, and logins still pay the real verify cost.
+        password_hash = hash_password(PASSWORD)
+        customer_ids = range(FIRST_CUSTOMER_ID, FIRST_CUSTOMER_ID + args.customers)
+        now = datetime.now()
+        inactive = {cid for cid in customer_ids if rng.random() < args.inactive_ratio}
+        totals["Customer"] = insert(conn, """
+            INSERT INTO Customer (customer_id, name, email, password, address, contact_number, is_active)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (cid, f"Customer {cid}", f"customer{cid}@example.com", password_hash,
+             f"{cid % 997} Market Street, {COUNTRIES[cid % len(COUNTRIES)]}",
+             f"9{cid:09d}", 0 if cid in inactive else 1)
+            for cid in customer_ids
+        ))
+        totals["Login"] = insert(conn, "INSERT INTO Login VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+            (cid, (now - timedelta(minutes=rng.randrange(args.days * 1440))).isoformat(), None, None,
+             password_hash, "N", "Customer", "Inactive" if cid in inactive else "Active")
+            for cid in customer_ids
+        ))
+
+    with Phase("products"):
+        product_ids = [format_product_id(i) for i in range(1, args.products + 1)]
+        prices = [round(rng.lognormvariate(1.5, 0.8), 2) + 0.5 for _ in product_ids]
+        quantities = [0 if rng.random() < args.out_of_stock_ratio else rng.randint(1, 1000) for _ in product_ids]
+        totals["Product"] = insert(conn, """
+            INSERT INTO Product (product_id, name, description, company_name, price, quantity, reserved, image_path)
+            VALUES (?, ?, ?, ?, ?, ?, 0, NULL)
+        """, (
+            (pid, f"{rng.choice(WORDS).title()} {rng.choice(GOODS)} {i}",
+             f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(GOODS)} for everyday cooking",
+             f"Company {i % args.companies}", prices[i], quantities[i])
+            for i, pid in enumerate(product_ids)
+        ))
+
+    customer_weights = zipf_cum_weights(args.customers, args.customer_skew)
+    product_weights = zipf_cum_weights(args.products, args.product_skew)
+    # Shuffle ranks so the hottest products and keenest buyers are not simply the lowest IDs.
+    customer_rank = list(customer_ids)
+    product_rank = list(range(args.products))
+    rng.shuffle(customer_rank)
+    rng.shuffle(product_rank)
+
+    def pick_lines():
+        size = min(cart_size(rng, args.avg_cart_size, args.max_cart_size), args.products)
+        chosen = set()
+        while len(chosen) < size:
+            chosen.add(product_rank[weighted_index(rng, product_weights)])
+        return [(i, rng.choices((1, 2, 3, 4, 5), (50, 25, 12, 8, 5))[0]) for i in chosen]
+
+    with Phase("orders"):
+        first_placed = datetime.now() - timedelta(days=args.days)
+        step = timedelta(days=args.days) / max(args.orders, 1)
+        header_rows, line_rows, ledger_rows = [], [], []
+        header_count = line_count = 0
+        for header_id in range(1, args.orders + 1):
+            customer_id = customer_rank[weighted_index(rng, customer_weights)]
+            lines = pick_lines()
+            total_amount = 0.0
+            total_items = 0
+            for product_index, quantity in lines:
+                pid, price = product_ids[product_index], prices[product_index]
+                total_amount += quantity * price
+                total_items += quantity
+                line_rows.append((customer_id, pid, quantity, "PLACED", header_id, price, None))
+                ledger_rows.append((customer_id, pid, quantity * price, quantity, header_id))
+            placed_at = first_placed + step * header_id + timedelta(seconds=rng.random() * 60)
+            header_rows.append((header_id, customer_id, total_amount, total_items, placed_at.isoformat()))
+            if len(header_rows) >= 20000 or header_id == args.orders:
+                conn.executemany("""
+                    INSERT INTO OrderHeader (order_header_id, customer_id, total_amount, no_of_items, placed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, header_rows)
+                conn.executemany("""
+                    INSERT INTO "Order" (customer_id, product_id, quantity, status, order_header_id, unit_price, reserved_until)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, line_rows)
+                conn.executemany("""
+                    INSERT INTO Transactions (customer_id, product_id, total_amount, no_of_items, order_header_id)
+                    VALUES (?, ?, ?, ?, ?)
+                """, ledger_rows)
+                conn.commit()
+                header_count += len(header_rows)
+                line_count += len(line_rows)
+                header_rows, line_rows, ledger_rows = [], [], []
+                if header_count % 200000 == 0:
+                    print(f"  {header_count:,} orders", flush=True)
+        totals["OrderHeader"] = header_count
+        totals["Order (placed)"] = line_count
+        totals["Transactions"] = line_count
+
+    with Phase("open carts"):
+        reserved_until = time.time() + args.cart_ttl
+        cart_rows = []
+        reserved = {}
+        for customer_id in customer_ids:
+            if rng.random() >= args.open_carts:
+                continue
+            for product_index, quantity in pick_lines():
+                cart_rows.append((customer_id, product_ids[product_index], quantity, "IN_CART", None, None, reserved_until))
+                reserved[product_ids[product_index]] = reserved.get(product_ids[product_index], 0) + quantity
+        totals["Order (in cart)"] = insert(conn, """
+            INSERT INTO "Order" (customer_id, product_id, quantity, status, order_header_id, unit_price, reserved_until)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, cart_rows)
+        insert(conn, "UPDATE Product SET reserved = ? WHERE product_id = ?",
+               ((units, pid) for pid, units in reserved.items()))
+
+    with Phase("indexes and triggers"):
+        for sql in recreate:
+            conn.execute(sql)
+        conn.commit()
+
+    with Phase("search index, sales aggregates and sequences"):
+        conn.execute("INSERT INTO ProductSearch(ProductSearch) VALUES ('rebuild')")
+        rebuild_sales_aggregates(conn)
+        conn.execute("UPDATE IdSequence SET next_value = MAX(next_value, ?) WHERE name = 'user'",
+                     (FIRST_CUSTOMER_ID + args.customers,))
+        conn.execute("UPDATE IdSequence SET next_value = MAX(next_value, ?) WHERE name = 'product'",
+                     (args.products + 1,))
+        conn.execute("UPDATE CatalogVersion SET version = version + 1 WHERE id = 1")
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(totals.values())
+    print()
+    for table, count in totals.items():
+        print(f"{table:<18} {count:>12,}")
+    print(f"{'total':<18} {rows:>12,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"{args.database}: {os.path.getsize(args.database) / 2 ** 20:,.0f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database", help="path of the database to create")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing database file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--customers", type=int, default=200000)
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365, help="span of order history")
+    parser.add_argument("--customer-skew", type=float, default=1.0, help="repeat-buyer concentration (0 = uniform)")
+    parser.add_argument("--product-skew", type=float, default=1.0, help="hot-product concentration (0 = uniform)")
+    parser.add_argument("--avg-cart-size", type=float, default=3.0)
+    parser.add_argument("--max-cart-size", type=int, default=25)
+    parser.add_argument("--open-carts", type=float, default=0.05, help="share of customers with an open cart")
+    parser.add_argument("--cart-ttl", type=float, default=1800, help="seconds until open carts expire")
+    parser.add_argument("--inactive-ratio", type=float, default=0.02)
+    parser.add_argument("--out-of-stock-ratio", type=float, default=0.05)
+    generate(parser.parse_args())
@@ -0,0 +1,241 @@
+"""
+End-to-end HTTP benchmark for grocery_api routes.
+
+Run from the repository root:
+
+    python -m benchmarks.http_bench
+    python -m benchmarks.http_bench --users 16 --iterations 50 --products 5000
+    python -m benchmarks.http_bench --save-baseline
+    python -m benchmarks.http_bench --baseline benchmarks/results/http_baseline.json --tolerance 0.2
+
+The app is imported with GROCERY_DB_PATH pointing at a throwaway database,
+which is seeded with products and customers. The background email and
+reservation workers are disabled. Each virtual user gets its own Flask test
+client (and so its own session cookie) and runs on its own thread:
+
+    login, then per iteration:
+        browse a catalog page -> search -> add to cart -> update the cart
+        -> place the order -> read order history
+    logout
+
+The workload is repeated --rounds times and the samples pooled. Per-route
+throughput and p50/p95/p99 latency are written to a JSON results file and
+compared with the committed baseline (benchmarks/results/http_baseline.json,
+or --baseline): routes whose p95 grew or whose throughput fell by more than
+--tolerance are reported as regressions and the exit status is 1. Routes
+with fewer than --min-samples requests are not compared. A baseline
+recorded with a different workload is not compared. Re-record it with
+--save-baseline on the reference machine after intended changes.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "http_baseline.json")
+PASSWORD = "Bench@123"
+SEARCH_TERMS = ["apple", "bench", "milk", "organic", "rice", "fresh"]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def load_app(db_path):
+    # Configure before import: grocery_api builds its services at import time.
+    os.environ["GROCERY_DB_PATH"] = db_path
+    os.environ["EMAIL_OUTBOX_WORKER"] = "false"
+    os.environ["RESERVATION_SWEEPER"] = "false"
+    import grocery_api
+    grocery_api.app.config["TESTING"] = True
+    return grocery_api
+
+
+def seed(api, products, users):
+    from entities.customer import Customer
+    from entities.product import Product
+    admin_dao = api.admin_service.dao
+    for i in range(products):
+        admin_dao.add_product(Product(admin_dao.generate_product_id(), f"Bench product {i}",
+                                      f"{SEARCH_TERMS[i % len(SEARCH_TERMS)]} benchmark item {i}",
+                                      f"Bench Co {i % 20}", round(1.0 + (i % 500) / 10, 2), 10 ** 9))
+    from backend.utils.passwords import hash_password
+    password_hash = hash_password(PASSWORD)
+    accounts = []
+    for i in range(users):
+        customer_id = api.service.generate_customer_id()
+        email = f"bench{i}@example.com"
+        api.service.dao.insert_customer(Customer(customer_id, f"Bench User {i}", email, password_hash,
+                                                 "1 Bench Street", "0000000000"))
+        accounts.append((customer_id, email))
+    return accounts
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, route, send, expected=(200,)):
+        started = time.perf_counter()
+        response = send()
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.samples[route].append(elapsed)
+            if response.status_code not in expected:
+                self.errors[route] += 1
+        return response
+
+
+def virtual_user(api, recorder, customer_id, email, iterations, products, seed_value):
+    rng = random.Random(seed_value)
+    client = api.app.test_client()
+    recorder.call("POST /login", lambda: client.post("/login", json={"email": email, "password": PASSWORD}))
+    for _ in range(iterations):
+        recorder.call("GET /catalog/<id>/", lambda: client.get(
+            f"/catalog/{customer_id}/", query_string={"limit": 20, "sort": rng.choice(["name", "price"])}))
+        recorder.call("GET /search/<id>/", lambda: client.get(
+            f"/search/{customer_id}/", query_string={"q": rng.choice(SEARCH_TERMS), "limit": 20}))
+        name = f"Bench product {rng.randrange(products)}"
+        recorder.call("POST /cart/<id>/add", lambda: client.post(
+            f"/cart/{customer_id}/add", json={"product_name": name, "quantity": 1}))
+        recorder.call("PUT /cart/<id>/update", lambda: client.put(
+            f"/cart/{customer_id}/update", json={"product_name": name, "quantity": rng.randint(2, 4)}))
+        recorder.call("POST /orders/<id>/", lambda: client.post(f"/orders/{customer_id}/"))
+        recorder.call("GET /orders/<id>/history", lambda: client.get(
+            f"/orders/{customer_id}/history", query_string={"limit": 20}))
+    recorder.call("POST /logout", lambda: client.post("/logout"))
+
+
+def summarise(recorder, wall_seconds):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        routes[route] = {
+            "requests": len(samples),
+            "errors": recorder.errors[route],
+            "throughput_rps": round(len(samples) / wall_seconds, 2),
+            "mean_ms": round(statistics.fmean(samples), 3),
+            "p50_ms": round(percentile(samples, 50), 3),
+            "p95_ms": round(percentile(samples, 95), 3),
+            "p99_ms": round(percentile(samples, 99), 3),
+        }
+    return routes
+
+
+def compare(routes, baseline, tolerance, min_samples):
+    regressions = []
+    for route, current in routes.items():
+        previous = baseline.get("routes", {}).get(route)
+        # A p95 over a handful of samples (login, logout) is mostly noise.
+        if not previous or min(current["requests"], previous["requests"]) < min_samples:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {previous['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {previous['throughput_rps']:.1f} -> "
+                               f"{current['throughput_rps']:.1f} req/s")
+    return regressions
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        api = load_app(os.path.join(workdir, "http_bench.db"))
+        accounts = seed(api, args.products, args.users)
+        recorder = Recorder()
+        wall_seconds = 0.0
+        for round_number in range(args.rounds):
+            threads = [
+                threading.Thread(target=virtual_user,
+                                 args=(api, recorder, customer_id, email, args.iterations, args.products,
+                                       round_number * len(accounts) + i))
+                for i, (customer_id, email) in enumerate(accounts)
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_seconds += time.perf_counter() - started
+        # Flush presence while the throwaway database still exists.
+        api.service.presence.stop()
+        api.service.db.close_all()
+        api.admin_service.db.close_all()
+
+    routes = summarise(recorder, wall_seconds)
+    total = sum(route["requests"] for route in routes.values())
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "users": args.users,
+            "iterations": args.iterations,
+            "products": args.products,
+            "rounds": args.rounds,
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_rps": round(total / wall_seconds, 2),
+        },
+        "routes": routes,
+    }
+
+    print(f"{'route':<28} {'req':>6} {'err':>4} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for route, stats in routes.items():
+        print(f"{route:<28} {stats['requests']:>6} {stats['errors']:>4} {stats['throughput_rps']:>9.1f} "
+              f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    print(f"total: {total} requests in {wall_seconds:.2f}s ({total / wall_seconds:,.0f} req/s)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("results written to", args.output)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print("baseline saved to", args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    workload = ("users", "iterations", "products", "rounds")
+    recorded = {key: baseline.get("meta", {}).get(key) for key in workload}
+    if any(recorded[key] != results["meta"][key] for key in workload):
+        print(f"baseline {args.baseline} was recorded with a different workload "
+              f"({', '.join(f'{key}={value}' for key, value in recorded.items())}); not compared")
+        return 0
+    regressions = compare(routes, baseline, args.tolerance, args.min_samples)
+    for regression in regressions:
+        print("REGRESSION:", regression)
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--iterations", type=int, default=25, help="shopping loops per user")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=3,
+                        help="times the whole workload is repeated; samples are pooled so p95 is stable")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "http_latest.json"))
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--min-samples", type=int, default=100,
+                        help="routes with fewer requests than this are not compared")
+    sys.exit(run(parser.parse_args()))
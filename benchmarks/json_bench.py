@@ -0,0 +1,129 @@
+"""
+JSON serialisation time per catalog response.
+
+Run from the repository root:
+
+    python -m benchmarks.json_bench
+    python -m benchmarks.json_bench --sizes 20 1000 10000 --rounds 50
+    python -m benchmarks.json_bench --stdlib      # as if orjson were not installed
+
+For each catalog size the same Product objects are turned into a response
+body five ways, and the median time per response is reported:
+
+    default provider     Flask's stdlib provider over Product.to_dict()
+    fast, to_dict        FastJSONProvider over Product.to_dict()
+    fragments, cold      FastJSONProvider over Product.to_json(), empty fragment cache
+    fragments, warm      the same with every product already cached
+    catalog cache        the full-catalog path: CatalogCache.get_fragments()
+
+Products carry image variants and realistic text, as DAO rows do.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from backend.utils import json_provider
+from backend.utils.catalog_cache import CatalogCache
+from backend.utils.json_provider import FastJSONProvider
+from entities.product import Product, product_fragments
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SCENARIOS = ("default provider", "fast, to_dict", "fragments, cold", "fragments, warm", "catalog cache")
+
+WORDS = ["fresh", "organic", "whole", "grain", "milk", "apple", "rice", "premium", "family", "pack",
+         "crunchy", "low", "fat", "natural", "roasted", "spicy", "sweet", "classic"]
+
+
+def make_products(count, seed=11):
+    rng = random.Random(seed)
+    products = []
+    for i in range(count):
+        variants = {
+            "source": f"/images/product_{i % 50}.jpg",
+            "variants": {
+                name: {"url": f"/media/{rng.getrandbits(80):020x}.{ext}", "width": width, "height": width * 3 // 4}
+                for name, ext, width in (("original", "jpeg", 800), ("thumb", "webp", 160),
+                                         ("card", "webp", 480), ("card_jpeg", "jpg", 480))
+            },
+        }
+        products.append(Product(
+            f"{i + 1:06d}",
+            " ".join(rng.choices(WORDS, k=3)).title() + f" {i}",
+            " ".join(rng.choices(WORDS, k=rng.randint(8, 20))),
+            f"Company {i % 200}",
+            round(rng.uniform(0.5, 150), 2),
+            rng.randint(1, 1000),
+            rng.randint(0, 5),
+            None,
+            variants["source"],
+            json.dumps(variants),
+        ))
+    return products
+
+
+def median_ms(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run(args):
+    if args.stdlib:
+        json_provider.orjson = None
+    encoder = f"orjson {json_provider.orjson.__version__}" if json_provider.orjson else "stdlib json"
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    results = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "encoder": encoder,
+                        "rounds": args.rounds}, "sizes": {}}
+    print(f"encoder: {encoder}; median ms per response over {args.rounds} rounds")
+    print(f"{'products':>9} {'default provider':>17} {'fast, to_dict':>14} {'fragments, cold':>16} "
+          f"{'fragments, warm':>16} {'catalog cache':>14} {'body KB':>8}")
+    with app.app_context():
+        for size in args.sizes:
+            products = make_products(size)
+            cold_rounds = max(3, args.rounds // 5)
+
+            def cold():
+                product_fragments.clear()
+                return fast.response([product.to_json() for product in products])
+
+            cache = CatalogCache()
+            cache.put(1, [product.to_dict() for product in products])
+            cache.get_fragments(1)
+            timings = [
+                median_ms(lambda: default.response([product.to_dict() for product in products]), args.rounds),
+                median_ms(lambda: fast.response([product.to_dict() for product in products]), args.rounds),
+                median_ms(cold, cold_rounds),
+                median_ms(lambda: fast.response([product.to_json() for product in products]), args.rounds),
+                median_ms(lambda: fast.response(cache.get_fragments(1)), args.rounds),
+            ]
+            body = fast.response(cache.get_fragments(1)).get_data()
+            assert json.loads(body) == json.loads(default.response([p.to_dict() for p in products]).get_data())
+            print(f"{size:>9} {timings[0]:>17.3f} {timings[1]:>14.3f} {timings[2]:>16.3f} "
+                  f"{timings[3]:>16.3f} {timings[4]:>14.3f} {len(body) / 1024:>8.1f}")
+            results["sizes"][size] = dict(zip(SCENARIOS, (round(t, 3) for t in timings)), body_bytes=len(body))
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("results written to", args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000, 5000])
+    parser.add_argument("--rounds", type=int, default=30)
+    parser.add_argument("--stdlib", action="store_true", help="use the stdlib encoder even if orjson is installed")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "json_latest.json"))
+    run(parser.parse_args())
@@ -0,0 +1,213 @@
+"""
+Bytes on the wire and request cost for the built frontend, served by Flask's
+default static handler and by the precompressed handler from
+backend.utils.static_assets.
+
+Run from the repository root:
+
+    python -m benchmarks.static_bench
+    python -m benchmarks.static_bench --dist frontend/Online_Grocery_Store/dist --requests 500
+
+Without --dist the real build is used if it exists, otherwise a synthetic
+Vite-like build (index.html, hashed JS/CSS bundles, an SVG) is generated in a
+temporary directory. Both handlers serve the same copy, from its own Flask
+app, through a test client. Three visits are measured per handler:
+
+    first visit   every file, Accept-Encoding: gzip, deflate, br
+    old client    every file, Accept-Encoding: gzip
+    repeat visit  what a browser with a warm cache still asks for: files
+                  not marked immutable are revalidated with If-None-Match
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import string
+import tempfile
+import time
+from datetime import datetime
+
+from flask import Flask
+
+from backend.utils.static_assets import DIST_DIR, IMMUTABLE, install_static_assets
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+VISITS = {
+    "first visit": "gzip, deflate, br",
+    "old client": "gzip",
+}
+
+
+def _identifier(rng):
+    return rng.choice(string.ascii_letters) + "".join(rng.choices(string.ascii_letters + string.digits, k=rng.randint(1, 6)))
+
+
+def synthesize_dist(root, js_kb=300, css_kb=60, seed=7):
+    """Write a build that compresses like minified Vite output: repetitive syntax, short random identifiers."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, "assets"))
+    names = [_identifier(rng) for _ in range(400)]
+    templates = [
+        "function {a}({b},{c}){{return {b}.{d}({c})}}",
+        "const {a}={b}.useState({c});",
+        "if({a}&&{b}.length>{n}){{{c}.push({d})}}",
+        "{a}.createElement(\"div\",{{className:\"{b} {c}\"}},{d});",
+        "export{{{a} as {b}}};",
+        "var {a}=Object.assign({{}},{b},{{{c}:{n}}});",
+    ]
+    parts, size = [], 0
+    while size < js_kb * 1024:
+        part = rng.choice(templates).format(a=rng.choice(names), b=rng.choice(names), c=rng.choice(names),
+                                            d=rng.choice(names), n=rng.randint(0, 999))
+        parts.append(part)
+        size += len(part)
+    js_name = f"assets/index-{''.join(rng.choices(string.ascii_letters + string.digits, k=8))}.js"
+    with open(os.path.join(root, js_name), "w") as file:
+        file.write("".join(parts))
+    properties = ["margin", "padding", "color", "display", "font-size", "border-radius", "background"]
+    rules, size = [], 0
+    while size < css_kb * 1024:
+        rule = f".{rng.choice(names)}-{rng.randint(1, 9)}{{{rng.choice(properties)}:{rng.randint(0, 64)}px}}"
+        rules.append(rule)
+        size += len(rule)
+    css_name = f"assets/index-{''.join(rng.choices(string.ascii_letters + string.digits, k=8))}.css"
+    with open(os.path.join(root, css_name), "w") as file:
+        file.write("".join(rules))
+    with open(os.path.join(root, "vite.svg"), "w") as file:
+        file.write('<svg xmlns="http://www.w3.org/2000/svg" width="32" height="32">'
+                   + "".join(f'<path d="M{i} {i * 2}L{i + 3} {i}Z" fill="#646cff"/>' for i in range(40)) + "</svg>")
+    with open(os.path.join(root, "index.html"), "w") as file:
+        file.write(f"""<!doctype html>
+<html lang="en">
+  <head>
+    <meta charset="UTF-8" />
+    <link rel="icon" type="image/svg+xml" href="/vite.svg" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <title>Online Grocery Store</title>
+    <script type="module" crossorigin src="/{js_name}"></script>
+    <link rel="stylesheet" crossorigin href="/{css_name}">
+  </head>
+  <body>
+    <div id="root"></div>
+    {"<!-- " + "x" * 900 + " -->"}
+  </body>
+</html>
+""")
+
+
+def list_files(root):
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if not name.endswith((".gz", ".br")):
+                files.append(os.path.relpath(os.path.join(directory, name), root).replace(os.sep, "/"))
+    return sorted(files)
+
+
+def wire_bytes(response):
+    # Status line and headers as they would be sent, plus the body.
+    head = sum(len(name) + len(value) + 4 for name, value in response.headers.items()) + 17
+    return head + len(response.get_data())
+
+
+def measure(client, files, accept, requests, etags=None):
+    """Per-visit bytes and the mean cost of one request, in microseconds."""
+    total_bytes, responses = 0, {}
+    for name in files:
+        headers = {"Accept-Encoding": accept}
+        if etags is not None:
+            if name not in etags:
+                continue
+            headers["If-None-Match"] = etags[name]
+        response = client.get("/" + name, headers=headers)
+        responses[name] = response
+        total_bytes += wire_bytes(response)
+    timings = []
+    paths = list(responses)
+    for i in range(requests):
+        name = paths[i % len(paths)] if paths else None
+        if name is None:
+            break
+        headers = {"Accept-Encoding": accept}
+        if etags is not None:
+            headers["If-None-Match"] = etags[name]
+        started = time.perf_counter()
+        client.get("/" + name, headers=headers).close()
+        timings.append((time.perf_counter() - started) * 1e6)
+    return {
+        "requests_per_visit": len(responses),
+        "bytes": total_bytes,
+        "mean_us": round(statistics.fmean(timings), 1) if timings else 0.0,
+        "statuses": sorted({r.status_code for r in responses.values()}),
+    }, responses
+
+
+def bench(app, files, requests):
+    client = app.test_client()
+    results = {}
+    for visit, accept in VISITS.items():
+        results[visit], responses = measure(client, files, accept, requests)
+        if visit == "first visit":
+            # A warm browser cache skips immutable files and revalidates the rest.
+            etags = {path: r.headers["ETag"] for path, r in responses.items()
+                     if r.headers.get("Cache-Control") != IMMUTABLE and r.headers.get("ETag")}
+    results["repeat visit"], _ = measure(client, files, VISITS["first visit"], requests, etags)
+    return results
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        dist = os.path.join(workdir, "dist")
+        source = args.dist or (DIST_DIR if os.path.isdir(DIST_DIR) else None)
+        if source:
+            shutil.copytree(source, dist, ignore=shutil.ignore_patterns("*.gz", "*.br"))
+        else:
+            synthesize_dist(dist)
+        files = list_files(dist)
+        raw_bytes = sum(os.path.getsize(os.path.join(dist, f)) for f in files)
+        print(f"{len(files)} files, {raw_bytes:,} bytes ({'copied from ' + source if source else 'synthetic build'})")
+
+        baseline = Flask("baseline", static_folder=dist, static_url_path="")
+        optimized = Flask("optimized", static_folder=dist, static_url_path="")
+        started = time.perf_counter()
+        install_static_assets(optimized)
+        precompress_seconds = time.perf_counter() - started
+        print(f"precompressed in {precompress_seconds:.2f}s")
+
+        results = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "files": len(files),
+                "raw_bytes": raw_bytes,
+                "precompress_seconds": round(precompress_seconds, 3),
+                "requests": args.requests,
+            },
+            "default handler": bench(baseline, files, args.requests),
+            "precompressed": bench(optimized, files, args.requests),
+        }
+
+    print(f"{'handler':<16} {'visit':<13} {'requests':>8} {'bytes':>11} {'mean us/req':>12}")
+    for handler in ("default handler", "precompressed"):
+        for visit, stats in results[handler].items():
+            print(f"{handler:<16} {visit:<13} {stats['requests_per_visit']:>8} {stats['bytes']:>11,} "
+                  f"{stats['mean_us']:>12.1f}")
+    for visit in results["default handler"]:
+        before = results["default handler"][visit]["bytes"]
+        after = results["precompressed"][visit]["bytes"]
+        if before:
+            print(f"{visit}: {before:,} -> {after:,} bytes ({1 - after / before:.0%} less)")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print("results written to", args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dist", help="built frontend to copy (default: the repository build, else synthetic)")
+    parser.add_argument("--requests", type=int, default=300, help="timed requests per visit")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "static_latest.json"))
+    run(parser.parse_args())
@@ -0,0 +1,143 @@
+"""
+Concurrent oversell stress test for one hot product.
+
+Run from the repository root:
+
+    python -m benchmarks.stress_oversell
+    python -m benchmarks.stress_oversell --threads 16 --seconds 20 --stock 500
+    python -m benchmarks.stress_oversell --sweeper --stock 100000 --customers 20000
+
+Worker threads share one DBConnection pool and hammer a single product with
+random cart adds, updates, deletes and checkouts (and, with --sweeper, a
+reservation sweeper expiring carts underneath them). At the end the harness
+asserts that stock is conserved:
+
+    quantity + reserved + sold == initial stock
+
+with quantity and reserved never negative, reserved equal to the units in
+live carts, and sold equal to the units in Transactions. Exits non-zero if
+any invariant is broken.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from backend.DAO.admin_dao import AdminDAO
+from backend.DAO.customer_dao import CustomerDAO
+from backend.DAO.db_connection import DBConnection
+from backend.DAO.db_init import DBInitializer
+from backend.service.reservation_sweeper import ReservationSweeper
+from backend.utils.exceptions import DatabaseException
+from entities.product import Product
+
+PRODUCT = "Hot product"
+
+
+def worker(dao, customer_ids, deadline, counts, lock, seed):
+    rng = random.Random(seed)
+    local = {"ok": 0, "rejected": 0}
+    while time.monotonic() < deadline:
+        customer_id = rng.choice(customer_ids)
+        action = rng.choices(["add", "update", "delete", "checkout"], weights=[5, 3, 1, 1])[0]
+        try:
+            if action == "add":
+                dao.add_product_to_cart(customer_id, PRODUCT, rng.randint(1, 3))
+            elif action == "update":
+                dao.update_cart_item(customer_id, PRODUCT, rng.randint(1, 5))
+            elif action == "delete":
+                dao.delete_cart_item(customer_id, PRODUCT)
+            else:
+                dao.place_order(customer_id)
+            local["ok"] += 1
+        except DatabaseException:
+            # Out of stock, not in cart, empty cart, lost race: all expected.
+            local["rejected"] += 1
+    with lock:
+        counts["ok"] += local["ok"]
+        counts["rejected"] += local["rejected"]
+
+
+def check_invariants(db, stock):
+    with db.connection() as conn:
+        product_id, quantity, reserved = conn.execute(
+            "SELECT product_id, quantity, reserved FROM Product WHERE name = ?", (PRODUCT,)
+        ).fetchone()
+        in_carts = conn.execute(
+            "SELECT COALESCE(SUM(quantity), 0) FROM \"Order\" WHERE product_id = ? AND status = 'IN_CART'",
+            (product_id,)
+        ).fetchone()[0]
+        sold = conn.execute(
+            "SELECT COALESCE(SUM(no_of_items), 0) FROM Transactions WHERE product_id = ?", (product_id,)
+        ).fetchone()[0]
+    print(f"quantity={quantity} reserved={reserved} in_carts={in_carts} sold={sold} "
+          f"total={quantity + reserved + sold} (initial {stock})")
+    failures = []
+    if quantity + reserved + sold != stock:
+        failures.append("quantity + reserved + sold is not conserved")
+    if quantity < 0 or reserved < 0:
+        failures.append("negative stock")
+    if reserved != in_carts:
+        failures.append("reserved does not match units in live carts")
+    return failures
+
+
+def run(threads, seconds, stock, customers, sweeper):
+    with tempfile.TemporaryDirectory() as workdir:
+        db = DBConnection(os.path.join(workdir, "stress_oversell.db"), pool_size=threads + 1)
+        DBInitializer(db).create_tables()
+        admin_dao = AdminDAO(db)
+        admin_dao.add_product(Product(admin_dao.generate_product_id(), PRODUCT, "contended item",
+                                      "Stress Co", 2.5, stock))
+        dao = CustomerDAO(db, reservation_ttl=0.2 if sweeper else 3600)
+
+        reservation_sweeper = None
+        if sweeper:
+            reservation_sweeper = ReservationSweeper(dao, interval=0.05, batch_size=50)
+            reservation_sweeper.start()
+
+        counts = {"ok": 0, "rejected": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        customer_ids = list(range(1, customers + 1))
+        pool = [
+            threading.Thread(target=worker, args=(dao, customer_ids, deadline, counts, lock, seed))
+            for seed in range(threads)
+        ]
+        started = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if reservation_sweeper:
+            reservation_sweeper.stop()
+
+        total = counts["ok"] + counts["rejected"]
+        print(f"{threads} threads, {seconds}s: {total} operations ({total / elapsed:,.0f} ops/s), "
+              f"{counts['ok']} applied, {counts['rejected']} rejected")
+        if reservation_sweeper:
+            print(f"sweeper released {reservation_sweeper.units_released} units "
+                  f"from {reservation_sweeper.lines_released} lines")
+        print("pool:", db.stats())
+        failures = check_invariants(db, stock)
+        db.close_all()
+    for failure in failures:
+        print("FAIL:", failure)
+    if not failures:
+        print("OK: stock conserved")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--sweeper", action="store_true", help="expire carts concurrently with a short TTL")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.threads, args.seconds, args.stock, args.customers, args.sweeper) else 1)
@@ -1,5 +1,9 @@
+import json
+from backend.utils.json_provider import FragmentCache
+# Serialised products keyed by every column, shared by all catalog responses.
+product_fragments = FragmentCache()
 class Product:
-    def __init__(self, product_id, name, description, company_name, price, quantity, reserved="N", customer_id=None, image_path=None):
+    def __init__(self, product_id, name, description, company_name, price, quantity, reserved="N", customer_id=None, image_path=None, image_variants=None):
         self.product_id = product_id
         self.name = name
         self.description = description
@@ -9,8 +13,23 @@ class Product:
         self.reserved = reserved   
         self.customer_id = customer_id
         self.image_path = image_path
+        self.image_variants = image_variants
+
+    def image_urls(self):
+        """Variant name -> content-hashed URL, empty until the images have been generated."""
+        if not self.image_variants:
+            return {}
+        variants = json.loads(self.image_variants).get("variants", {})
+        return {name: variant["url"] for name, variant in variants.items()}
+
+    def to_json(self):
+        """to_dict() as a pre-serialised fragment, reused until any column of the row changes."""
+        key = (self.product_id, self.name, self.description, self.company_name, self.price,
+               self.quantity, self.reserved, self.customer_id, self.image_path, self.image_variants)
+        return product_fragments.get(key, self.to_dict)
 
     def to_dict(self):
+        images = self.image_urls()
         return {
             "product_id": self.product_id,
             "name": self.name,
@@ -20,5 +39,7 @@ class Product:
             "quantity": self.quantity,
             "reserved": self.reserved,
             "customer_id": self.customer_id,
-            "image_path": self.image_path
+            "image_path": self.image_path,
+            "image_url": images.get("card") or images.get("original") or self.image_path,
+            "images": images
         }
\ No newline at end of file
@@ -1,22 +1,37 @@
+import hmac
 import os
 import secrets
 from datetime import timedelta
-from flask import Flask, request, jsonify, session,url_for
+from flask import Flask, request, jsonify, session,url_for, Response, send_from_directory
 from flask_mail import Mail
 from flask_cors import CORS
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
 from backend.service.cust_service import CustomerService
+from backend.service.admin_service import AdminService
 from backend.utils.exceptions import ServiceException
+from backend.utils.metrics import metrics
+from backend.utils.slow_query_log import slow_query_log
+from backend.utils.catalog_cache import catalog_cache
+from backend.utils.images import MEDIA_DIR
+from backend.utils.static_assets import install_static_assets
+from backend.utils.compression import response_compressor
+from backend.utils.json_provider import FastJSONProvider
+from entities.product import product_fragments
 # Load environment variables
 load_dotenv()
 # ------------------ Flask App ------------------
 app = Flask(__name__, static_folder='frontend/Online_Grocery_Store/dist', static_url_path='')
 app.secret_key = "super-secret-key-change-me"
+# orjson when installed; cached product fragments are embedded without re-encoding.
+app.json = FastJSONProvider(app)
+# Writes .gz/.br siblings for the built frontend (only missing or stale ones);
+# set PRECOMPRESS_STATIC=false when the build step already ran it (the siblings are still served).
+static_assets = install_static_assets(app, compress=os.getenv("PRECOMPRESS_STATIC", "true").lower() != "false")
 # ------------------ Mail ------------------
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
+app.config['MAIL_SERVER'] = os.getenv("MAIL_SERVER", 'smtp.gmail.com')
+app.config['MAIL_PORT'] = int(os.getenv("MAIL_PORT", 587))
+app.config['MAIL_USE_TLS'] = os.getenv("MAIL_USE_TLS", "true").lower() == "true"
 app.config['MAIL_USERNAME'] = os.getenv("MAIL_USERNAME")  # Your email here
 app.config['MAIL_PASSWORD'] = os.getenv("MAIL_PASSWORD")
 mail = Mail(app)
@@ -32,7 +47,74 @@ CORS(
     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"]
 )
 # ------------------ Service ------------------
-service = CustomerService(mail)
+# Cart reservations expire after CART_RESERVATION_TTL seconds without a cart change.
+service = CustomerService(mail, reservation_ttl=float(os.getenv("CART_RESERVATION_TTL", 30 * 60)))
+admin_service = AdminService()
+if os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() == "true":
+    service.start_email_worker(app)
+if os.getenv("RESERVATION_SWEEPER", "true").lower() == "true":
+    service.start_reservation_sweeper(interval=float(os.getenv("RESERVATION_SWEEP_INTERVAL", 60)))
+# ------------------ Metrics ------------------
+metrics.register_gauge("db_pool_in_use", "Connections checked out of the customer pool.",
+                       lambda: service.db.stats()["in_use"])
+metrics.register_gauge("db_pool_waits_total", "Checkouts that had to wait for a free connection.",
+                       lambda: service.db.stats()["waits"])
+metrics.register_gauge("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.",
+                       lambda: service.db.stats()["timeouts"])
+metrics.register_gauge("presence_pending_writes", "Login state changes not yet written to the database.",
+                       lambda: service.presence.stats()["pending_writes"])
+metrics.register_gauge("password_pool_pending", "Password jobs running or queued.",
+                       lambda: service.passwords.stats()["pending"])
+metrics.register_gauge("response_compression_ratio", "Compressed bytes sent per uncompressed byte.",
+                       lambda: response_compressor.stats()["ratio"])
+metrics.register_gauge("response_compression_cache_hit_ratio", "Share of compressions served from the body cache.",
+                       lambda: response_compressor.stats()["cache_hit_ratio"])
+metrics.register_gauge("product_fragment_cache_hit_ratio", "Share of product serialisations served from cache.",
+                       lambda: product_fragments.stats()["hit_ratio"])
+metrics.register_gauge("catalog_cache_hit_ratio", "Share of catalog reads served from the cache.",
+                       lambda: catalog_cache.stats()["hit_ratio"])
+
+@app.before_request
+def start_request_metrics():
+    metrics.begin_request()
+    if 'customer_id' in session:
+        service.presence.touch(session['customer_id'])
+
+@app.after_request
+def record_request_metrics(response):
+    # Label by URL rule, not path, so /orders/<id>/ is one series for every customer.
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.end_request(request.method, route, response.status_code)
+    return response
+
+# br/gzip for JSON and text responses; static files are already compressed.
+# Registered after the metrics hook because Flask runs after_request hooks in
+# reverse order: compression happens first and counts towards request latency.
+response_compressor.init_app(app)
+
+# Media filenames are content hashes, so a URL never changes meaning and
+# clients may cache it for a year without revalidating.
+MEDIA_MAX_AGE = 365 * 24 * 3600
+
+@app.route('/media/<path:filename>', methods=['GET'])
+def media(filename):
+    # conditional=True answers If-None-Match and Range requests (206).
+    response = send_from_directory(MEDIA_DIR, filename, conditional=True,
+                                   etag=os.path.splitext(filename)[0], max_age=MEDIA_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={MEDIA_MAX_AGE}, immutable"
+    return response
+
+# Scrapers cannot hold an admin session: they send "Authorization: Bearer
+# $METRICS_TOKEN" instead. Without METRICS_TOKEN only admins can read /metrics.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    authorization = request.headers.get("Authorization", "")
+    token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else ""
+    if 'admin_id' not in session and not (METRICS_TOKEN and hmac.compare_digest(token, METRICS_TOKEN)):
+        return jsonify({"error": "Admin is not logged in"}), 401
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 # ------------------ Session ------------------
 app.config.update(
     SESSION_COOKIE_NAME="session",
@@ -210,12 +292,60 @@ def product_catalog(customer_id):
     if 'customer_id' not in session:
         return jsonify({"error": "User is not logged in"}), 401
     try:
-        products = service.get_product_catalog()
-        product_list = [product.to_dict() for product in products["data"]]
-        return jsonify(product_list)
+        return jsonify(service.get_product_catalog_json())
     except ServiceException as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/catalog/<int:customer_id>/', methods=['GET'])
+def product_catalog_page(customer_id):
+    if 'customer_id' not in session:
+        return jsonify({"error": "User is not logged in"}), 401
+    try:
+        result = service.get_product_catalog_page(
+            limit=request.args.get('limit', 20, type=int),
+            cursor=request.args.get('cursor'),
+            sort=request.args.get('sort', 'name'),
+            order=request.args.get('order', 'asc'),
+            company_name=request.args.get('company_name'),
+            min_price=request.args.get('min_price', type=float),
+            max_price=request.args.get('max_price', type=float)
+        )
+        return jsonify(result)
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/search/<int:customer_id>/', methods=['GET'])
+def search_products(customer_id):
+    if 'customer_id' not in session:
+        return jsonify({"error": "User is not logged in"}), 401
+    try:
+        results = service.search_products(
+            request.args.get('q', ''),
+            limit=request.args.get('limit', 20, type=int)
+        )
+        return jsonify(results)
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/search/<int:customer_id>/autocomplete', methods=['GET'])
+def autocomplete_products(customer_id):
+    if 'customer_id' not in session:
+        return jsonify({"error": "User is not logged in"}), 401
+    try:
+        names = service.autocomplete_products(
+            request.args.get('q', ''),
+            limit=request.args.get('limit', 10, type=int)
+        )
+        return jsonify(names)
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/products/cache/stats', methods=['GET'])
+def catalog_cache_stats():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    return jsonify(service.get_catalog_cache_stats())
+
 @app.route('/cart/<int:customer_id>/add', methods=['POST'])
 def add_to_cart(customer_id):
     data = request.json
@@ -249,6 +379,17 @@ def delete_cart_item(customer_id):
     except ServiceException as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/cart/<int:customer_id>/batch', methods=['POST'])
+def apply_cart_batch(customer_id):
+    data = request.json
+    if 'customer_id' not in session:
+        return jsonify({"error": "User is not logged in"}), 401
+    try:
+        result = service.apply_cart_batch(customer_id, data.get('operations'))
+        return jsonify(result)
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
 @app.route('/orders/<int:customer_id>/', methods=['POST'])
 def place_order(customer_id):
     if 'customer_id' not in session:
@@ -264,7 +405,11 @@ def view_order_history(customer_id):
     if 'customer_id' not in session:
         return jsonify({"error": "User is not logged in"}), 401
     try:
-        result = service.view_order_history(customer_id)
+        result = service.view_order_history(
+            customer_id,
+            limit=request.args.get('limit', 20, type=int),
+            cursor=request.args.get('cursor')
+        )
         return jsonify(result)
     except ServiceException as e:
         return jsonify({"error": str(e)}), 404
@@ -324,6 +469,68 @@ def logout():
         return jsonify({"message": "Logged out successfully!"})
     except ServiceException as e:
         return jsonify({"error": str(e)}), 500
+@app.route('/admin/login', methods=['POST'])
+def admin_login():
+    data = request.json
+    try:
+        admin_id = admin_service.login_admin(data['email'], data['password'])
+        session['admin_id'] = admin_id
+        session.permanent = True
+        return jsonify({"message": "Admin login successful.", "admin_id": admin_id}), 200
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 401
+
+@app.route('/admin/logout', methods=['POST'])
+def admin_logout():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    try:
+        admin_service.logout_admin(session.pop('admin_id'))
+        return jsonify({"message": "Admin logged out successfully!"})
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/admin/reservations', methods=['GET'])
+def reservation_stats():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    return jsonify(service.get_reservation_stats())
+
+@app.route('/admin/presence', methods=['GET'])
+def presence_stats():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    return jsonify(service.presence.stats())
+
+@app.route('/admin/product-images', methods=['POST'])
+def generate_product_images():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    try:
+        force = bool((request.get_json(silent=True) or {}).get('force'))
+        return jsonify(admin_service.generate_product_images(force=force))
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/admin/slow-queries', methods=['GET'])
+def slow_query_report():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    return jsonify({
+        "threshold_ms": slow_query_log.threshold * 1000,
+        "queries": slow_query_log.report(limit=request.args.get('limit', 20, type=int))
+    })
+
+@app.route('/admin/dashboard', methods=['GET'])
+def admin_dashboard():
+    if 'admin_id' not in session:
+        return jsonify({"error": "Admin is not logged in"}), 401
+    try:
+        result = admin_service.get_sales_dashboard(top=request.args.get('top', 5, type=int))
+        return jsonify(result)
+    except ServiceException as e:
+        return jsonify({"error": str(e)}), 400
+
 # ------------------ Run ------------------
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
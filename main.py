@@ -77,8 +77,8 @@ def main():
                         if products:
                             print("\n--- Product Catalog ---")
                             for p in products:
-                                print(f"{p.product_id} | {p.name} | {p.description} | "
-                                    f"{p.company_name} | ${p.price:.2f} | Stock: {p.quantity}")
+                                print(f"{p['product_id']} | {p['name']} | {p['description']} | "
+                                    f"{p['company_name']} | ${p['price']:.2f} | Stock: {p['quantity']}")
                     except ServiceException as e:
                         print(e)
                 elif choice == 2:
@@ -128,7 +128,7 @@ def main():
                         result = service.view_order_history()
                         if result["status"] == "success":
                             for txn in result["orders"]:
-                                print(f"\n=== Transaction {txn['transaction_id']} | Total: ${txn['total_amount']} | Items: {txn['no_of_items']} ===")
+                                print(f"\n=== Order {txn['order_header_id']} | Total: ${txn['total_amount']} | Items: {txn['no_of_items']} ===")
                                 for order in txn["orders"]:
                                     print(f"Order {order['order_id']} | {order['product_name']} | Qty: {order['quantity']} | Price: ${order['price']} | Status: {order['status']} | Line Total: ${order['line_total']}")
                                 print("--------------------------------------------------")
@@ -53,9 +53,14 @@ def main():
             print("9. View Highest Priced Product")
             print("10. View All Transactions")
             print("11. View Second Highest Transaction")
-            print("12. View Successful Orders with Transactions")
-            print("13. Logout Admin")
-            print("14. Exit")
+            print("12. View Top Transactions")
+            print("13. View Top Transactions per Customer")
+            print("14. View Successful Orders with Transactions")
+            print("15. View Sales Dashboard")
+            print("16. Rebuild Sales Aggregates")
+            print("17. Generate Product Image Variants")
+            print("18. Logout Admin")
+            print("19. Exit")
             try:
                 choice = int(input("Enter choice: "))
                 if choice == 1:
@@ -202,6 +207,36 @@ def main():
                     except ServiceException as e:
                         print(e)
                 elif choice == 12:
+                    try:
+                        limit = int(input("How many transactions: ") or 10)
+                        transactions = service.view_top_transactions(limit)
+                        if not transactions:
+                            print("No transactions found.")
+                        else:
+                            print(f"\n--- Top {limit} Transactions ---")
+                            for rank, t in enumerate(transactions, start=1):
+                                print(f"#{rank} Transaction {t['transaction_id']} | Customer {t['customer_id']} "
+                                    f"({t['customer_name']}) | Product {t['product_id']} "
+                                    f"| Items: {t['no_of_items']} → Total: {t['total_amount']}")
+                    except ServiceException as e:
+                        print(e)
+                elif choice == 13:
+                    try:
+                        per_customer = int(input("Transactions per customer: ") or 3)
+                        customer_id = input("Customer ID (blank for all): ").strip()
+                        transactions = service.view_top_transactions_per_customer(
+                            per_customer, int(customer_id) if customer_id else None)
+                        if not transactions:
+                            print("No transactions found.")
+                        else:
+                            print("\n--- Top Transactions per Customer ---")
+                            for t in transactions:
+                                print(f"Customer {t['customer_id']} ({t['customer_name']}) #{t['rank']} | "
+                                    f"Transaction {t['transaction_id']} | Product {t['product_id']} "
+                                    f"| Items: {t['no_of_items']} → Total: {t['total_amount']}")
+                    except ServiceException as e:
+                        print(e)
+                elif choice == 14:
                     try:
                         results = service.get_successful_orders_with_transactions()
                         if isinstance(results, str):
@@ -218,14 +253,43 @@ def main():
                                 )
                     except ServiceException as e:
                         print(e)
-                elif choice == 13:
+                elif choice == 15:
+                    try:
+                        dashboard = service.get_sales_dashboard()
+                        totals = dashboard["totals"]
+                        print("\n--- Sales Dashboard ---")
+                        print(f"Orders: {totals['order_count']} | Units: {totals['units_sold']} "
+                              f"| Revenue: {totals['revenue']}")
+                        print("Top products:")
+                        for p in dashboard["top_products"]:
+                            print(f"  {p['name']} ({p['product_id']}) | Units: {p['units_sold']} "
+                                  f"| Orders: {p['order_count']} | Revenue: {p['revenue']}")
+                        print("Top customers:")
+                        for c in dashboard["top_customers"]:
+                            print(f"  {c['name']} ({c['customer_id']}) | Orders: {c['order_count']} "
+                                  f"| Units: {c['units_bought']} | Revenue: {c['revenue']}")
+                    except ServiceException as e:
+                        print(e)
+                elif choice == 16:
+                    try:
+                        print(service.rebuild_sales_aggregates())
+                    except ServiceException as e:
+                        print(e)
+                elif choice == 17:
+                    try:
+                        summary = service.generate_product_images(force=input("Rebuild all? (y/n): ").lower() == "y")
+                        print(f"Products updated: {summary['products']} | Images built: {summary['built']} "
+                              f"| Missing: {summary['missing']} | Failed: {summary['failed']}")
+                    except ServiceException as e:
+                        print(e)
+                elif choice == 18:
                     try:
                         service.logout_admin()
                         print("Logged out successfully.")
                         logged_in = False
                     except ServiceException as e:
                         print(e)
-                elif choice == 14:
+                elif choice == 19:
                     print("Exiting Admin UI...")
                     break
                 else:
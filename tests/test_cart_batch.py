@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from flask_mail import Mail
+
+from backend.DAO.admin_dao import AdminDAO
+from backend.DAO.customer_dao import CustomerDAO
+from backend.DAO.db_connection import DBConnection
+from backend.DAO.db_init import DBInitializer
+from backend.service.cust_service import CustomerService
+from backend.utils.exceptions import DatabaseException
+from entities.product import Product
+
+PRODUCT = "Batch product"
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBConnection(os.path.join(tmp_path, "cart_batch.db"))
+    DBInitializer(db).create_tables()
+    admin_dao = AdminDAO(db)
+    admin_dao.add_product(Product(admin_dao.generate_product_id(), PRODUCT, "batch item", "Batch Co", 1.5, 10))
+    yield db
+    db.close_all()
+
+
+def stock(db):
+    with db.connection() as conn:
+        return conn.execute("SELECT quantity, reserved FROM Product WHERE name = ?", (PRODUCT,)).fetchone()
+
+
+def test_boolean_quantity_is_rejected(db):
+    results = CustomerDAO(db).apply_cart_batch(1, [{"op": "add", "product_name": PRODUCT, "quantity": True}])
+    assert results[0]["status"] == "error"
+    assert results[0]["message"] == "Quantity must be a positive integer."
+    assert stock(db) == (10, 0)
+
+
+def test_batch_release_cannot_push_reserved_below_zero(db):
+    dao = CustomerDAO(db)
+    dao.apply_cart_batch(1, [{"op": "add", "product_name": PRODUCT, "quantity": 4}])
+    assert stock(db) == (6, 4)
+    # Some of the reservation has already gone back to stock underneath the cart.
+    with db.connection() as conn:
+        conn.execute("UPDATE Product SET quantity = quantity + 3, reserved = reserved - 3 WHERE name = ?", (PRODUCT,))
+        conn.commit()
+
+    with pytest.raises(DatabaseException):
+        dao.apply_cart_batch(1, [{"op": "delete", "product_name": PRODUCT}])
+    assert stock(db) == (9, 1)
+
+
+def test_non_string_product_name_is_rejected(db):
+    results = CustomerDAO(db).apply_cart_batch(1, [
+        {"op": "add", "product_name": ["list"], "quantity": 1},
+        {"op": "add", "product_name": {"an": "object"}, "quantity": 1},
+        {"op": "add", "product_name": PRODUCT, "quantity": 2},
+    ])
+    assert [result["status"] for result in results] == ["error", "error", "success"]
+    assert results[0]["message"] == "product_name must be a non-empty string."
+    assert stock(db) == (8, 2)
+
+
+def test_service_rejects_non_string_product_name(db, monkeypatch):
+    monkeypatch.setenv("GROCERY_DB_PATH", db.db_name)
+    service = CustomerService(Mail())
+    result = service.apply_cart_batch(1, [{"op": "delete", "product_name": ["list"]}])
+    service.presence.stop()
+    assert result == {"status": "error", "message": "Each operation needs a product_name string."}
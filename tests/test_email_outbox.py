@@ -0,0 +1,133 @@
+import os
+import socketserver
+import threading
+import time
+
+import pytest
+from flask import Flask
+from flask_mail import Mail
+
+from backend.DAO.db_connection import DBConnection
+from backend.DAO.db_init import DBInitializer
+from backend.DAO.email_outbox_dao import EmailOutboxDAO
+from backend.service.email_outbox import EmailOutboxWorker
+
+
+class StubSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message unless its recipient is in ``server.refused``."""
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        self.reply("220 stub ready")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line.split(" ", 1)[0].upper()
+            if not line or command == "QUIT":
+                self.reply("221 bye")
+                return
+            if command == "RCPT":
+                address = line.split(":", 1)[1].strip().strip("<>")
+                if address in self.server.refused:
+                    self.reply("550 mailbox unavailable")
+                    continue
+                recipients.append(address)
+                self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 end with .")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.delivered.extend(recipients)
+                recipients = []
+                self.reply("250 queued")
+            elif command in ("RSET", "MAIL"):
+                if command == "RSET":
+                    recipients = []
+                self.reply("250 ok")
+            else:
+                self.reply("250 stub")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StubSMTPHandler)
+    server.daemon_threads = True
+    server.refused = set()
+    server.delivered = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def outbox(tmp_path, smtp_server):
+    db = DBConnection(os.path.join(tmp_path, "outbox.db"))
+    DBInitializer(db).create_tables()
+    app = Flask(__name__)
+    app.config.update(MAIL_SERVER="127.0.0.1", MAIL_PORT=smtp_server.server_address[1], MAIL_USE_TLS=False,
+                      MAIL_DEFAULT_SENDER="shop@example.com")
+    dao = EmailOutboxDAO(db)
+    worker = EmailOutboxWorker(app, Mail(app), dao, max_attempts=2, base_backoff=30.0)
+    yield dao, worker
+    worker.stop()
+    db.close_all()
+
+
+def rows(dao):
+    with dao.db.connection() as conn:
+        return {recipient: (status, attempts, next_attempt_at, last_error)
+                for recipient, status, attempts, next_attempt_at, last_error in conn.execute(
+                    "SELECT recipient, status, attempts, next_attempt_at, last_error FROM EmailOutbox")}
+
+
+def make_due(dao):
+    with dao.db.connection() as conn:
+        conn.execute("UPDATE EmailOutbox SET next_attempt_at = 0 WHERE status = 'PENDING'")
+        conn.commit()
+
+
+def test_sent_retried_and_failed(outbox, smtp_server):
+    dao, worker = outbox
+    smtp_server.refused.add("bounce@example.com")
+    dao.enqueue("ok@example.com", "Hi", "body")
+    dao.enqueue("bounce@example.com", "Hi", "body")
+
+    started = time.time()
+    assert worker.send_batch() == 2
+    state = rows(dao)
+    assert smtp_server.delivered == ["ok@example.com"]
+    assert state["ok@example.com"][:2] == ("SENT", 1)
+    status, attempts, next_attempt_at, last_error = state["bounce@example.com"]
+    assert (status, attempts) == ("PENDING", 1)
+    assert next_attempt_at >= started + 30.0
+    assert "550" in last_error
+
+    # Not due yet: the backoff keeps it out of the next batch.
+    assert worker.send_batch() == 0
+    make_due(dao)
+    assert worker.send_batch() == 1
+    assert rows(dao)["bounce@example.com"][:2] == ("FAILED", 2)
+    assert worker.sent == 1 and worker.failed == 1
+
+
+def test_unsendable_message_fails_at_once_and_worker_survives(outbox, smtp_server):
+    dao, worker = outbox
+    dao.enqueue("bad@example.com\r\nBcc: victim@example.com", "Hi", "body")
+    worker.poll_interval = 0.05
+    worker.start()
+    worker.notify()
+    deadline = time.time() + 5
+    while rows(dao)["bad@example.com\r\nBcc: victim@example.com"][0] == "PENDING" and time.time() < deadline:
+        time.sleep(0.02)
+    assert rows(dao)["bad@example.com\r\nBcc: victim@example.com"][:2] == ("FAILED", 1)
+
+    dao.enqueue("later@example.com", "Hi", "body")
+    worker.notify()
+    while rows(dao)["later@example.com"][0] == "PENDING" and time.time() < deadline:
+        time.sleep(0.02)
+    assert worker._thread.is_alive()
+    assert rows(dao)["later@example.com"][0] == "SENT"
+    assert smtp_server.delivered == ["later@example.com"]